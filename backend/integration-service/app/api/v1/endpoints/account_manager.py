@@ -18,7 +18,7 @@ from ....models.account_manager_types import (
 )
 from ....services.account_manager import AccountManagerService
 from ....services.flood_ban_manager import FloodBanManager
-from ....services.rate_limiting_service import RateLimitingService
+from ....services.rate_limiting_service import RateLimitingService, RESERVATION_TTL_SECONDS
 from ....models.telegram_sessions import TelegramSession
 
 logger = logging.getLogger(__name__)
@@ -70,6 +70,17 @@ class RateLimitRecordRequest(BaseModel):
     target_channel_id: Optional[str] = Field(None, description="ID целевого канала")
     success: bool = Field(True, description="Успешность действия")
 
+class RateLimitReserveRequest(BaseModel):
+    """Запрос на проверку лимитов с резервом слота под действие"""
+    action_type: ActionType = Field(..., description="Тип действия")
+    target_channel_id: Optional[str] = Field(None, description="ID целевого канала")
+    allow_locked: Optional[bool] = Field(False, description="Не считать lock причиной недоступности (вызов после allocate)")
+    ttl_seconds: int = Field(RESERVATION_TTL_SECONDS, ge=10, le=3600, description="Время жизни резерва, секунды")
+
+class RateLimitCommitRequest(BaseModel):
+    """Запрос на закрытие резерва выполненным действием"""
+    success: bool = Field(True, description="Успешность действия")
+
 class ReleaseAllRequest(BaseModel):
     """Запрос на освобождение всех аккаунтов сервиса"""
     service_name: str = Field(..., description="Имя сервиса")
@@ -572,6 +583,86 @@ async def record_action(
         logger.error(f"❌ Error recording action for {account_id}: {e}")
         raise HTTPException(status_code=500, detail=f"Error recording action: {str(e)}")
 
+@router.post("/rate-limit/reserve/{account_id}")
+async def reserve_action(
+    account_id: UUID,
+    request: RateLimitReserveRequest,
+    session: AsyncSession = Depends(get_async_session),
+    rate_limiting: RateLimitingService = Depends(get_rate_limiting_service)
+):
+    """
+    Проверить лимиты и зарезервировать слот под действие (check + reserve одним вызовом).
+    Резерв закрывается /rate-limit/commit или /rate-limit/rollback, либо передаётся
+    как reservation_token в invite - тогда его закрывает сам endpoint приглашения.
+    """
+    try:
+        token, details = await rate_limiting.reserve_action(
+            session=session,
+            account_id=account_id,
+            action_type=request.action_type,
+            target_channel_id=request.target_channel_id,
+            allow_locked=request.allow_locked or False,
+            ttl_seconds=request.ttl_seconds
+        )
+        
+        return {
+            "success": True,
+            "allowed": token is not None,
+            "reservation_token": token,
+            "expires_in": request.ttl_seconds if token else None,
+            "reason": details.get("error") if isinstance(details, dict) else None,
+            "details": details
+        }
+        
+    except Exception as e:
+        logger.error(f"❌ Error reserving action for {account_id}: {e}")
+        raise HTTPException(status_code=500, detail=f"Error reserving action: {str(e)}")
+
+@router.post("/rate-limit/commit/{reservation_token}")
+async def commit_reservation(
+    reservation_token: str,
+    request: RateLimitCommitRequest,
+    session: AsyncSession = Depends(get_async_session),
+    rate_limiting: RateLimitingService = Depends(get_rate_limiting_service)
+):
+    """
+    Закрыть резерв: записать действие и обновить лимиты
+    """
+    try:
+        committed = await rate_limiting.commit_reservation(
+            session=session,
+            token=reservation_token,
+            success=request.success
+        )
+        
+        return {
+            "success": True,
+            "committed": committed,
+            "recorded_at": datetime.utcnow().isoformat() if committed else None
+        }
+        
+    except Exception as e:
+        logger.error(f"❌ Error committing reservation {reservation_token}: {e}")
+        raise HTTPException(status_code=500, detail=f"Error committing reservation: {str(e)}")
+
+@router.post("/rate-limit/rollback/{reservation_token}")
+async def rollback_reservation(
+    reservation_token: str,
+    rate_limiting: RateLimitingService = Depends(get_rate_limiting_service)
+):
+    """
+    Отменить резерв без записи действия
+    """
+    try:
+        return {
+            "success": True,
+            "rolled_back": rate_limiting.rollback_reservation(reservation_token)
+        }
+        
+    except Exception as e:
+        logger.error(f"❌ Error rolling back reservation {reservation_token}: {e}")
+        raise HTTPException(status_code=500, detail=f"Error rolling back reservation: {str(e)}")
+
 @router.get("/rate-limit/status/{account_id}")
 async def get_rate_limit_status(
     account_id: UUID,
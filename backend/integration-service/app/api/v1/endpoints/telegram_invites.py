@@ -31,6 +31,7 @@ from ....schemas.telegram_invites import (
 )
 from ....services.telegram_service import TelegramService
 from ....services.account_manager import AccountManagerService
+from ....services.rate_limiting_service import RateLimitingService
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -270,8 +271,26 @@ async def send_telegram_invite_by_account(
     session: AsyncSession = Depends(get_async_session),
     telegram_service: TelegramService = Depends(get_telegram_service)
 ):
-    """Отправка приглашения через конкретный Telegram аккаунт - совместимость с Invite Service"""
-    
+    """
+    Отправка приглашения через конкретный Telegram аккаунт - совместимость с Invite Service.
+    С reservation_token (резерв /rate-limit/reserve) успешное приглашение записывается
+    здесь же - отдельный вызов record из Invite Service не нужен. При ошибке резерв
+    остаётся открытым: клиент повторяет запрос на 5xx с тем же токеном, а после
+    окончательной ошибки вызывает /rate-limit/rollback.
+    """
+    response = await _send_telegram_invite_by_account(account_id, invite_data, request, session, telegram_service)
+    if invite_data.reservation_token and response.status == "success":
+        await RateLimitingService().commit_reservation(session, invite_data.reservation_token, success=True)
+    return response
+
+
+async def _send_telegram_invite_by_account(
+    account_id: UUID,
+    invite_data: TelegramInviteRequest,
+    request: Request,
+    session: AsyncSession,
+    telegram_service: TelegramService
+) -> TelegramInviteResponse:
     # Логирование входящих данных для диагностики
     logger.info(f"🔍 DIAGNOSTIC: Получены данные для приглашения: account_id={account_id}, invite_data={invite_data.dict()}")
     
@@ -34,6 +34,9 @@ class TelegramInviteRequest(BaseModel):
     parse_mode: Optional[str] = Field("text", description="Режим парсинга (text, html)")
     silent: bool = Field(False, description="Отправить без уведомления")
     
+    # Резерв /rate-limit/reserve: действие записывается по результату приглашения
+    reservation_token: Optional[str] = Field(None, description="Токен резерва rate limit")
+    
     @model_validator(mode='after')
     def validate_target_provided(self):
         """Проверка что указан хотя бы один способ идентификации цели"""
@@ -11,12 +11,16 @@ Rate Limiting System
 
 Данные хранятся в Redis: db = REDIS_DB + 3 (при REDIS_DB=0 это DB 3).
 Очистка только rate-limit: redis-cli -n 3 FLUSHDB (если REDIS_DB=0).
+
+Резерв действия (reserve_action → commit_reservation / rollback_reservation):
+проверка лимитов и занятие слота одним вызовом, запись - после выполнения.
+Ключи: reservation:slot:<account>:<action> = токен, reservation:token:<токен> = параметры.
 """
 import logging
 import asyncio
 from typing import Dict, List, Optional, Tuple, Any
 from datetime import datetime, timedelta, timezone
-from uuid import UUID
+from uuid import UUID, uuid4
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, update, and_, func
 import redis
@@ -31,6 +35,18 @@ from .integration_log_service import IntegrationLogService
 
 logger = logging.getLogger(__name__)
 
+# Резерв слота (reserve_action) держится, пока действие выполняется; данные токена - ещё GRACE
+RESERVATION_TTL_SECONDS = 600
+RESERVATION_GRACE_SECONDS = 3600
+
+# Удалить слот, только если он ещё принадлежит токену (не истёк и не занят заново)
+RELEASE_SLOT_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
 class RateLimitingService:
     """Система управления лимитами Telegram API"""
     
@@ -142,7 +158,8 @@ class RateLimitingService:
         account_id: UUID,
         action_type: ActionType,
         target_channel_id: Optional[str] = None,
-        allow_locked: bool = False
+        allow_locked: bool = False,
+        reservation_token: Optional[str] = None
     ) -> Tuple[bool, Dict[str, Any]]:
         """
         Проверить можно ли выполнить действие с учетом лимитов
@@ -153,6 +170,7 @@ class RateLimitingService:
             action_type: Тип действия
             target_channel_id: ID целевого канала (для приглашений)
             allow_locked: Если True, не считать аккаунт недоступным из-за lock (вызов после allocate)
+            reservation_token: Свой резерв (reserve_action) - он не считается чужим занятым слотом
         
         Returns:
             Tuple[bool, Dict]: (разрешено, детали лимитов)
@@ -194,6 +212,15 @@ class RateLimitingService:
                     # Никогда не ломаем основную логику rate limiting из‑за диагностики частоты
                     logger.debug(f"RATE_LIMIT check_rate_limit frequency guard error for account {account_id}: {freq_err}")
 
+            # 🎫 Слот уже зарезервирован под действие, которое ещё не записано (reserve_action)
+            slot_token, slot_ttl = self._reservation_slot(account_id, action_type)
+            if slot_token and slot_token != reservation_token:
+                return False, {
+                    "error": "Action reserved",
+                    "cooldown_remaining": max(slot_ttl, 1),
+                    "next_allowed_at": (datetime.now(timezone.utc) + timedelta(seconds=max(slot_ttl, 1))).isoformat()
+                }
+
             # Получаем аккаунт
             result = await session.execute(
                 select(TelegramSession).where(TelegramSession.id == account_id)
@@ -628,6 +655,134 @@ class RateLimitingService:
             logger.error(f"❌ Error recording action for account {account_id}: {e}")
             return False
     
+    @staticmethod
+    def _reservation_slot_key(account_id, action_type: ActionType) -> str:
+        return f"reservation:slot:{account_id}:{action_type}"
+
+    def _reservation_slot(self, account_id: UUID, action_type: ActionType) -> Tuple[Optional[str], int]:
+        """Токен активного резерва (account, action) и его оставшийся TTL."""
+        try:
+            slot_key = self._reservation_slot_key(account_id, action_type)
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.get(slot_key)
+            pipe.ttl(slot_key)
+            token, ttl = pipe.execute()
+            return token, int(ttl or 0)
+        except Exception as e:
+            logger.debug(f"RATE_LIMIT reservation slot read error for account {account_id}: {e}")
+            return None, 0
+
+    def _release_reservation(self, token: str) -> Optional[Dict[str, Any]]:
+        """Снять резерв: удалить данные токена и слот, если слот всё ещё принадлежит токену."""
+        token_key = f"reservation:token:{token}"
+        raw = self.redis_client.get(token_key)
+        if not raw:
+            return None
+        reservation = json.loads(raw)
+        slot_key = self._reservation_slot_key(reservation['account_id'], ActionType(reservation['action_type']))
+        self.redis_client.eval(RELEASE_SLOT_SCRIPT, 1, slot_key, token)
+        self.redis_client.delete(token_key)
+        return reservation
+
+    async def reserve_action(
+        self,
+        session: AsyncSession,
+        account_id: UUID,
+        action_type: ActionType,
+        target_channel_id: Optional[str] = None,
+        allow_locked: bool = False,
+        ttl_seconds: int = RESERVATION_TTL_SECONDS
+    ) -> Tuple[Optional[str], Dict[str, Any]]:
+        """
+        Проверить лимиты и зарезервировать слот под одно действие.
+        
+        На пару (аккаунт, действие) держится не больше одного резерва: слот
+        занимается SET NX до проверки лимитов, поэтому два параллельных запроса
+        не могут оба получить разрешение до записи первого действия.
+        Резерв закрывается commit_reservation (действие выполнено/не выполнено)
+        или rollback_reservation; незакрытый истекает через ttl_seconds.
+        
+        Returns:
+            Tuple[Optional[str], Dict]: (токен резерва или None, детали лимитов)
+        """
+        token = uuid4().hex
+        slot_key = self._reservation_slot_key(account_id, action_type)
+        try:
+            if not self.redis_client.set(slot_key, token, nx=True, ex=ttl_seconds):
+                slot_ttl = max(int(self.redis_client.ttl(slot_key) or 0), 1)
+                return None, {
+                    "error": "Action reserved",
+                    "cooldown_remaining": slot_ttl,
+                    "next_allowed_at": (datetime.now(timezone.utc) + timedelta(seconds=slot_ttl)).isoformat()
+                }
+        except Exception as e:
+            logger.error(f"❌ Error reserving {action_type} for account {account_id}: {e}")
+            return None, {"error": f"Reservation error: {str(e)}"}
+
+        allowed, details = await self.check_rate_limit(
+            session, account_id, action_type, target_channel_id, allow_locked, reservation_token=token
+        )
+        try:
+            if not allowed:
+                self.redis_client.eval(RELEASE_SLOT_SCRIPT, 1, slot_key, token)
+                return None, details
+            # Данные токена живут дольше слота: поздний commit всё равно запишет действие
+            self.redis_client.setex(
+                f"reservation:token:{token}",
+                ttl_seconds + RESERVATION_GRACE_SECONDS,
+                json.dumps({
+                    "account_id": str(account_id),
+                    "action_type": action_type.value if isinstance(action_type, ActionType) else str(action_type),
+                    "target_channel_id": target_channel_id,
+                    "reserved_at": datetime.utcnow().isoformat()
+                })
+            )
+        except Exception as e:
+            logger.error(f"❌ Error storing reservation for account {account_id}: {e}")
+            return None, {"error": f"Reservation error: {str(e)}"}
+
+        logger.debug(f"🎫 Reserved {action_type} for account {account_id}: {token}")
+        return token, {**details, "expires_in": ttl_seconds}
+
+    async def commit_reservation(
+        self,
+        session: AsyncSession,
+        token: str,
+        success: bool = True
+    ) -> bool:
+        """
+        Закрыть резерв выполненным действием: record_action с параметрами резерва.
+        
+        Returns:
+            bool: False - резерв не найден (уже закрыт или истёк)
+        """
+        try:
+            reservation = self._release_reservation(token)
+        except Exception as e:
+            logger.error(f"❌ Error committing reservation {token}: {e}")
+            return False
+        if not reservation:
+            logger.warning(f"⚠️ Reservation {token} not found on commit (closed or expired)")
+            return False
+        return await self.record_action(
+            session,
+            UUID(reservation["account_id"]),
+            ActionType(reservation["action_type"]),
+            reservation.get("target_channel_id"),
+            success
+        )
+
+    def rollback_reservation(self, token: str) -> bool:
+        """Отменить резерв без записи действия (действие не выполнялось). False - резерв не найден."""
+        try:
+            reservation = self._release_reservation(token)
+        except Exception as e:
+            logger.error(f"❌ Error rolling back reservation {token}: {e}")
+            return False
+        if reservation:
+            logger.debug(f"🎫 Reservation {token} rolled back for account {reservation['account_id']}")
+        return reservation is not None
+
     async def get_account_limits_status(
         self,
         session: AsyncSession,
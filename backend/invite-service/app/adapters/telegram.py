@@ -244,6 +244,9 @@ class TelegramInviteAdapter(InvitePlatformAdapter):
                 "parse_mode": invite_data.get("parse_mode", "text"),
                 "silent": invite_data.get("silent", False)
             }
+            if invite_data.get("reservation_token"):
+                # Integration Service запишет успешный invite по резерву rate limit
+                telegram_invite_data["reservation_token"] = invite_data["reservation_token"]
             
             # ДИАГНОСТИКА: логируем данные, отправляемые в Integration Service
             logger.info(f"🔍 DIAGNOSTIC: Данные для Integration Service:")
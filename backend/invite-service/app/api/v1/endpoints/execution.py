@@ -13,6 +13,7 @@ import asyncio
 from app.core.database import get_db
 from app.core.auth import get_current_user_id
 from app.models import InviteTask, InviteTarget, TaskStatus, TargetStatus
+from app.services.task_control import send_task_signal, clear_task_signal, SIGNAL_PAUSE, SIGNAL_CANCEL
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -59,6 +60,9 @@ async def execute_invite_task(
         # Импорт Celery задачи
         from workers.invite_worker import execute_invite_task as celery_execute_task
 
+        # Снимаем pause/cancel до постановки в очередь, чтобы воркер не остановился сразу
+        clear_task_signal(task_id)
+
         # Запуск асинхронной задачи через Celery
         result = celery_execute_task.delay(task_id)
 
@@ -115,7 +119,8 @@ async def pause_invite_task(
         task.updated_at = datetime.utcnow()
         db.commit()
 
-        # TODO: Интеграция с Celery для остановки активных задач
+        # Воркер проверяет сигнал перед каждым приглашением
+        send_task_signal(task_id, SIGNAL_PAUSE)
 
         return {
             "message": f"Задача {task_id} приостановлена",
@@ -160,6 +165,9 @@ async def resume_invite_task(
         # Импорт Celery задачи
         from workers.invite_worker import execute_invite_task as celery_execute_task
 
+        # Снимаем сигнал паузы до постановки в очередь, чтобы воркер не остановился сразу
+        clear_task_signal(task_id)
+
         # Перезапуск задачи
         result = celery_execute_task.delay(task_id)
 
@@ -218,7 +226,8 @@ async def cancel_invite_task(
         task.updated_at = datetime.utcnow()
         db.commit()
 
-        # TODO: Интеграция с Celery для отмены активных задач
+        # Воркер проверяет сигнал перед каждым приглашением
+        send_task_signal(task_id, SIGNAL_CANCEL)
 
         return {
             "message": f"Задача {task_id} отменена",
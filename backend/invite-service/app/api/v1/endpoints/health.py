@@ -3,10 +3,10 @@ Health check endpoints для Invite Service
 """
 
 from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
 
-from app.core.database import get_db
+from app.core.database import get_async_db
 
 router = APIRouter()
 
@@ -22,7 +22,7 @@ async def health_check():
 
 
 @router.get("/detailed")
-async def detailed_health_check(db: Session = Depends(get_db)):
+async def detailed_health_check(db: AsyncSession = Depends(get_async_db)):
     """Детальный health check с проверкой компонентов"""
     health_data = {
         "status": "healthy",
@@ -33,7 +33,7 @@ async def detailed_health_check(db: Session = Depends(get_db)):
     
     # Проверка базы данных
     try:
-        db.execute(text("SELECT 1"))
+        await db.execute(text("SELECT 1"))
         health_data["components"]["database"] = {"status": "healthy"}
     except Exception as e:
         health_data["components"]["database"] = {
@@ -60,6 +60,10 @@ async def detailed_health_check(db: Session = Depends(get_db)):
         }
         health_data["status"] = "unhealthy"
     
+    # Пулы HTTP соединений к Account Manager / Integration Service
+    from app.core.http_clients import http_client_stats
+    health_data["http_clients"] = http_client_stats()
+    
     # TODO: Добавить проверки Redis, Integration Service и других компонентов
     
     return health_data 
\ No newline at end of file
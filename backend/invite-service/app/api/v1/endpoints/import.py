@@ -14,6 +14,7 @@ from app.models.invite_task import InviteTask
 from app.models.invite_target import InviteTarget
 from app.schemas.target import InviteTargetCreate
 from app.core.auth import get_current_user_id
+from app.services.user_profile_cache import get_cached_profiles
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -282,6 +283,13 @@ async def import_targets_from_parsing(
                     "imported_count": 0
                 }
             
+            # Недостающие username/телефон берём из общего кэша профилей Parsing Service
+            cached_profiles = await get_cached_profiles(
+                (r.get('platform_specific_data') or {}).get('user_id') or r.get('author_id')
+                for r in parsing_results
+            )
+            enriched_from_cache = 0
+            
             # Конвертируем результаты парсинга в формат InviteTarget
             imported_targets = []
             errors = []
@@ -313,6 +321,12 @@ async def import_targets_from_parsing(
                         ),
                     }
                     
+                    profile = cached_profiles.get(str(target_data["user_id_platform"]))
+                    if profile and not (target_data["username"] and target_data["phone_number"]):
+                        target_data["username"] = target_data["username"] or profile.get("username") or ''
+                        target_data["phone_number"] = target_data["phone_number"] or profile.get("phone") or ''
+                        enriched_from_cache += 1
+                    
                     # ДИАГНОСТИКА: логируем исходные данные
                     logger.debug(f"🔍 DIAGNOSTIC: Исходные данные результата парсинга {i}: {result}")
                     
@@ -405,6 +419,8 @@ async def import_targets_from_parsing(
             logger.info(f"🔍 DIAGNOSTIC: Parsing import completed, task.target_count: {task.target_count}")
             
             logger.info(f"Импортировано {len(imported_targets)} целей из задачи парсинга {parsing_task_id} для задачи {task_id}")
+            if enriched_from_cache:
+                logger.info(f"🗂️ Дополнено из кэша профилей: {enriched_from_cache} целей")
             
             # АВТОМАТИЧЕСКИЙ ЗАПУСК ЗАДАЧИ ПОСЛЕ ИМПОРТА
             celery_task_id = None
@@ -9,11 +9,12 @@ from typing import List, Optional
 from datetime import datetime
 import math
 import logging
-import redis
 
 from app.core.database import get_db
-from app.core.config import get_settings
 from app.models import InviteTask, TaskStatus, TaskPriority, InviteTarget, TargetStatus
+from app.services.task_control import (
+    send_task_signal, clear_task_signal, SIGNAL_PAUSE, SIGNAL_CANCEL, SIGNAL_DELETE
+)
 from app.schemas.invite_task import (
     InviteTaskCreate, 
     InviteTaskResponse, 
@@ -353,6 +354,7 @@ async def bulk_task_operations(
         affected_count = 0
         
         deleted_task_ids = []
+        signals = {}
         if bulk_request.action == TaskBulkAction.DELETE:
             # Удаление задач
             deleted_task_ids = [t.id for t in tasks]
@@ -365,6 +367,7 @@ async def bulk_task_operations(
             for task in tasks:
                 if task.status in [TaskStatus.RUNNING, TaskStatus.PENDING]:
                     task.status = TaskStatus.PAUSED
+                    signals[task.id] = SIGNAL_PAUSE
                     affected_count += 1
                     
         elif bulk_request.action == TaskBulkAction.RESUME:
@@ -372,6 +375,7 @@ async def bulk_task_operations(
             for task in tasks:
                 if task.status == TaskStatus.PAUSED:
                     task.status = TaskStatus.PENDING
+                    signals[task.id] = None
                     affected_count += 1
                     
         elif bulk_request.action == TaskBulkAction.CANCEL:
@@ -379,6 +383,7 @@ async def bulk_task_operations(
             for task in tasks:
                 if task.status in [TaskStatus.RUNNING, TaskStatus.PENDING, TaskStatus.PAUSED]:
                     task.status = TaskStatus.CANCELLED
+                    signals[task.id] = SIGNAL_CANCEL
                     affected_count += 1
                     
         elif bulk_request.action == TaskBulkAction.SET_PRIORITY:
@@ -401,14 +406,15 @@ async def bulk_task_operations(
         
         db.commit()
         
-        # Помечаем удалённые задачи в Redis (воркеры пропустят уже поставленные батчи)
-        if deleted_task_ids:
-            try:
-                r = redis.Redis.from_url(get_settings().REDIS_URL, decode_responses=True)
-                for tid in deleted_task_ids:
-                    r.setex(f"invite:deleted_task:{tid}", 7200, "1")
-            except Exception as e:
-                logger.warning("Не удалось пометить удалённые задачи в Redis: %s", e)
+        # Сигналы воркерам: удалённые задачи пропускают уже поставленные батчи, pause/cancel
+        # останавливают полосы перед следующим приглашением
+        for tid in deleted_task_ids:
+            send_task_signal(tid, SIGNAL_DELETE)
+        for tid, signal in signals.items():
+            if signal:
+                send_task_signal(tid, signal)
+            else:
+                clear_task_signal(tid)
         
         return {
             "message": f"Операция '{bulk_request.action}' выполнена",
@@ -447,11 +453,7 @@ async def delete_invite_task(
         db.delete(task)
         db.commit()
         # Помечаем задачу как удалённую в Redis: воркеры пропустят уже поставленные в очередь батчи (TTL 2 ч)
-        try:
-            r = redis.Redis.from_url(get_settings().REDIS_URL, decode_responses=True)
-            r.setex(f"invite:deleted_task:{task_id}", 7200, "1")
-        except Exception as e:
-            logger.warning("Не удалось пометить задачу как удалённую в Redis: %s", e)
+        send_task_signal(task_id, SIGNAL_DELETE)
         return {"message": f"Задача {task_id} успешно удалена"}
     except Exception as e:
         db.rollback()
@@ -504,6 +506,9 @@ async def execute_invite_task(
         # Импорт Celery задачи
         from workers.invite_worker import execute_invite_task as celery_execute_task
         
+        # Снимаем pause/cancel до постановки в очередь, чтобы воркер не остановился сразу
+        clear_task_signal(task_id)
+        
         logger.info(f"🔍 DIAGNOSTIC: About to queue Celery task for task_id={task_id}")
         
         # Запуск асинхронной задачи через Celery
@@ -566,7 +571,8 @@ async def pause_invite_task(
         task.updated_at = datetime.utcnow()
         db.commit()
         
-        # TODO: Интеграция с Celery для остановки активных задач
+        # Воркер проверяет сигнал перед каждым приглашением
+        send_task_signal(task_id, SIGNAL_PAUSE)
         
         return {
             "message": f"Задача {task_id} приостановлена",
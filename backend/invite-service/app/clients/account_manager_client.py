@@ -7,11 +7,11 @@
 - Все паузы и ограничения определяются Account Manager
 - Строгое соблюдение ТЗ: 15 инвайтов/день на паблик, 30/день на аккаунт, 200 на паблик НАВСЕГДА, паузы 10-15 минут
 """
-import httpx
 import logging
 from typing import Optional, Dict, Any, List
 from datetime import datetime
 from ..core.config import get_settings
+from ..core.http_clients import get_http_client, ACCOUNT_MANAGER_CLIENT
 
 logger = logging.getLogger(__name__)
 
@@ -21,7 +21,6 @@ class AccountManagerClient:
     def __init__(self):
         self.settings = get_settings()
         self.base_url = "http://integration-service:8000/api/v1/account-manager"
-        self.timeout = 30.0
         
     async def allocate_account(
         self, 
@@ -53,35 +52,35 @@ class AccountManagerClient:
         try:
             logger.info(f"🔍 AccountManager: Requesting account allocation for user {user_id}, purpose: {purpose} (все лимиты управляются Account Manager согласно ТЗ)")
             
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                payload: Dict[str, Any] = {
-                    "user_id": user_id,
-                    "purpose": purpose,
-                    "service_name": "invite-service",
-                    "preferred_account_id": preferred_account_id,
-                    "timeout_minutes": timeout_minutes,
-                }
-                if target_channel_id:
-                    payload["target_channel_id"] = target_channel_id
-                response = await client.post(
-                    f"{self.base_url}/allocate",
-                    json=payload
-                )
+            client = get_http_client(ACCOUNT_MANAGER_CLIENT)
+            payload: Dict[str, Any] = {
+                "user_id": user_id,
+                "purpose": purpose,
+                "service_name": "invite-service",
+                "preferred_account_id": preferred_account_id,
+                "timeout_minutes": timeout_minutes,
+            }
+            if target_channel_id:
+                payload["target_channel_id"] = target_channel_id
+            response = await client.post(
+                f"{self.base_url}/allocate",
+                json=payload
+            )
                 
-                if response.status_code == 200:
-                    data = response.json()
-                    allocation = data.get("allocation", data)
-                    logger.info(
-                        f"✅ AccountManager: Account allocated: {allocation.get('account_id')}"
-                        f", phone: {allocation.get('phone')} (лимиты проверены Account Manager)"
-                    )
-                    return allocation
-                elif response.status_code == 404:
-                    logger.warning(f"❌ No available accounts for user {user_id}")
-                    return None
-                else:
-                    logger.error(f"❌ Account allocation failed: {response.status_code} - {response.text}")
-                    response.raise_for_status()
+            if response.status_code == 200:
+                data = response.json()
+                allocation = data.get("allocation", data)
+                logger.info(
+                    f"✅ AccountManager: Account allocated: {allocation.get('account_id')}"
+                    f", phone: {allocation.get('phone')} (лимиты проверены Account Manager)"
+                )
+                return allocation
+            elif response.status_code == 404:
+                logger.warning(f"❌ No available accounts for user {user_id}")
+                return None
+            else:
+                logger.error(f"❌ Account allocation failed: {response.status_code} - {response.text}")
+                response.raise_for_status()
                     
         except Exception as e:
             logger.error(f"❌ Error allocating account: {e}")
@@ -105,21 +104,21 @@ class AccountManagerClient:
         try:
             logger.info(f"🔓 AccountManager: Releasing account {account_id} (обновление лимитов в Account Manager)")
             
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.post(
-                    f"{self.base_url}/release/{account_id}",
-                    json={
-                        "service_name": "invite-service",
-                        "usage_stats": usage_stats
-                    }
-                )
+            client = get_http_client(ACCOUNT_MANAGER_CLIENT)
+            response = await client.post(
+                f"{self.base_url}/release/{account_id}",
+                json={
+                    "service_name": "invite-service",
+                    "usage_stats": usage_stats
+                }
+            )
                 
-                if response.status_code == 200:
-                    logger.info(f"✅ Account {account_id} released successfully")
-                    return True
-                else:
-                    logger.error(f"❌ Failed to release account {account_id}: {response.status_code}")
-                    return False
+            if response.status_code == 200:
+                logger.info(f"✅ Account {account_id} released successfully")
+                return True
+            else:
+                logger.error(f"❌ Failed to release account {account_id}: {response.status_code}")
+                return False
                     
         except Exception as e:
             logger.error(f"❌ Error releasing account {account_id}: {e}")
@@ -152,23 +151,23 @@ class AccountManagerClient:
         try:
             logger.warning(f"⚠️ AccountManager: Handling error for account {account_id}: {error_type} (согласно ТЗ Account Manager)")
             
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.post(
-                    f"{self.base_url}/handle-error/{account_id}",
-                    json={
-                        "error_type": error_type,
-                        "error_message": error_message,
-                        "context": context or {"service": "invite-service"}
-                    }
-                )
+            client = get_http_client(ACCOUNT_MANAGER_CLIENT)
+            response = await client.post(
+                f"{self.base_url}/handle-error/{account_id}",
+                json={
+                    "error_type": error_type,
+                    "error_message": error_message,
+                    "context": context or {"service": "invite-service"}
+                }
+            )
                 
-                if response.status_code == 200:
-                    result = response.json()
-                    logger.info(f"✅ Error handled: {result.get('action_taken', 'Unknown action')}")
-                    return True
-                else:
-                    logger.error(f"❌ Failed to handle error: {response.status_code}")
-                    return False
+            if response.status_code == 200:
+                result = response.json()
+                logger.info(f"✅ Error handled: {result.get('action_taken', 'Unknown action')}")
+                return True
+            else:
+                logger.error(f"❌ Failed to handle error: {response.status_code}")
+                return False
                     
         except Exception as e:
             logger.error(f"❌ Error handling account error: {e}")
@@ -201,21 +200,21 @@ class AccountManagerClient:
             Dict со статусом лимитов и необходимыми паузами
         """
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.post(
-                    f"{self.base_url}/rate-limit/check/{account_id}",
-                    json={
-                        "action_type": action_type,
-                        "target_channel_id": target_channel_id,
-                        "allow_locked": allow_locked
-                    }
-                )
+            client = get_http_client(ACCOUNT_MANAGER_CLIENT)
+            response = await client.post(
+                f"{self.base_url}/rate-limit/check/{account_id}",
+                json={
+                    "action_type": action_type,
+                    "target_channel_id": target_channel_id,
+                    "allow_locked": allow_locked
+                }
+            )
                 
-                if response.status_code == 200:
-                    return response.json()
-                else:
-                    logger.error(f"❌ Failed to check rate limits: {response.status_code}")
-                    return {"allowed": False, "reason": "Rate limit check failed"}
+            if response.status_code == 200:
+                return response.json()
+            else:
+                logger.error(f"❌ Failed to check rate limits: {response.status_code}")
+                return {"allowed": False, "reason": "Rate limit check failed"}
                     
         except Exception as e:
             logger.error(f"❌ Error checking rate limits: {e}")
@@ -241,22 +240,85 @@ class AccountManagerClient:
             bool: Успешность записи
         """
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.post(
-                    f"{self.base_url}/rate-limit/record/{account_id}",
-                    json={
-                        "action_type": action_type,
-                        "target_channel_id": target_channel_id,
-                        "success": success
-                    }
-                )
+            client = get_http_client(ACCOUNT_MANAGER_CLIENT)
+            response = await client.post(
+                f"{self.base_url}/rate-limit/record/{account_id}",
+                json={
+                    "action_type": action_type,
+                    "target_channel_id": target_channel_id,
+                    "success": success
+                }
+            )
                 
-                return response.status_code == 200
+            return response.status_code == 200
                     
         except Exception as e:
             logger.error(f"❌ Error recording action: {e}")
             return False
     
+    async def reserve_action(
+        self,
+        account_id: str,
+        action_type: str = "invite",
+        target_channel_id: Optional[str] = None,
+        allow_locked: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Проверить rate limits и зарезервировать слот под действие одним вызовом
+        
+        Ответ как у check_rate_limit плюс reservation_token. Токен передаётся в invite
+        (invite_data['reservation_token']) - Integration Service сам запишет успешное
+        действие; при ошибке приглашения резерв снимается rollback_reservation.
+        
+        Returns:
+            Dict: allowed, reservation_token, reason, details
+        """
+        try:
+            client = get_http_client(ACCOUNT_MANAGER_CLIENT)
+            response = await client.post(
+                f"{self.base_url}/rate-limit/reserve/{account_id}",
+                json={
+                    "action_type": action_type,
+                    "target_channel_id": target_channel_id,
+                    "allow_locked": allow_locked
+                }
+            )
+                
+            if response.status_code == 200:
+                return response.json()
+            else:
+                logger.error(f"❌ Failed to reserve action: {response.status_code}")
+                return {"allowed": False, "reason": "Rate limit reservation failed"}
+                    
+        except Exception as e:
+            logger.error(f"❌ Error reserving action: {e}")
+            return {"allowed": False, "reason": f"Error: {e}"}
+    
+    async def commit_reservation(self, reservation_token: str, success: bool = True) -> bool:
+        """Закрыть резерв выполненным действием (если токен не передавался в invite)"""
+        try:
+            client = get_http_client(ACCOUNT_MANAGER_CLIENT)
+            response = await client.post(
+                f"{self.base_url}/rate-limit/commit/{reservation_token}",
+                json={"success": success}
+            )
+            return response.status_code == 200 and bool(response.json().get("committed"))
+                    
+        except Exception as e:
+            logger.error(f"❌ Error committing reservation: {e}")
+            return False
+    
+    async def rollback_reservation(self, reservation_token: str) -> bool:
+        """Снять резерв без записи действия"""
+        try:
+            client = get_http_client(ACCOUNT_MANAGER_CLIENT)
+            response = await client.post(f"{self.base_url}/rate-limit/rollback/{reservation_token}")
+            return response.status_code == 200
+                    
+        except Exception as e:
+            logger.error(f"❌ Error rolling back reservation: {e}")
+            return False
+    
     async def get_account_health(self, account_id: str) -> Optional[Dict[str, Any]]:
         """
         Проверить здоровье аккаунта
@@ -268,14 +330,14 @@ class AccountManagerClient:
             Dict со статусом здоровья или None при ошибке
         """
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(f"{self.base_url}/health/{account_id}")
+            client = get_http_client(ACCOUNT_MANAGER_CLIENT)
+            response = await client.get(f"{self.base_url}/health/{account_id}")
                 
-                if response.status_code == 200:
-                    return response.json()
-                else:
-                    logger.error(f"❌ Failed to check account health: {response.status_code}")
-                    return None
+            if response.status_code == 200:
+                return response.json()
+            else:
+                logger.error(f"❌ Failed to check account health: {response.status_code}")
+                return None
                     
         except Exception as e:
             logger.error(f"❌ Error checking account health: {e}")
@@ -289,14 +351,14 @@ class AccountManagerClient:
             Dict со статистикой или None при ошибке
         """
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(f"{self.base_url}/stats/recovery")
+            client = get_http_client(ACCOUNT_MANAGER_CLIENT)
+            response = await client.get(f"{self.base_url}/stats/recovery")
                 
-                if response.status_code == 200:
-                    return response.json()
-                else:
-                    logger.error(f"❌ Failed to get recovery stats: {response.status_code}")
-                    return None
+            if response.status_code == 200:
+                return response.json()
+            else:
+                logger.error(f"❌ Failed to get recovery stats: {response.status_code}")
+                return None
                     
         except Exception as e:
             logger.error(f"❌ Error getting recovery stats: {e}")
@@ -308,15 +370,15 @@ class AccountManagerClient:
             params = {}
             if purpose:
                 params["purpose"] = purpose
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(
-                    f"{self.base_url}/available-accounts/{user_id}", params=params
-                )
-                if response.status_code == 200:
-                    return response.json()
-                else:
-                    logger.error(f"❌ Failed to get available accounts for user {user_id}: {response.status_code} - {response.text}")
-                    return None
+            client = get_http_client(ACCOUNT_MANAGER_CLIENT)
+            response = await client.get(
+                f"{self.base_url}/available-accounts/{user_id}", params=params
+            )
+            if response.status_code == 200:
+                return response.json()
+            else:
+                logger.error(f"❌ Failed to get available accounts for user {user_id}: {response.status_code} - {response.text}")
+                return None
         except Exception as e:
             logger.error(f"❌ Error getting available accounts: {e}")
             return None
@@ -337,15 +399,15 @@ class AccountManagerClient:
             if target_channel_id:
                 params["target_channel_id"] = target_channel_id
 
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(f"{self.base_url}/accounts/summary", params=params)
-                if response.status_code == 200:
-                    return response.json()
-                else:
-                    logger.error(
-                        f"❌ Failed to get accounts summary for user {user_id}: {response.status_code} - {response.text}"
-                    )
-                    return None
+            client = get_http_client(ACCOUNT_MANAGER_CLIENT)
+            response = await client.get(f"{self.base_url}/accounts/summary", params=params)
+            if response.status_code == 200:
+                return response.json()
+            else:
+                logger.error(
+                    f"❌ Failed to get accounts summary for user {user_id}: {response.status_code} - {response.text}"
+                )
+                return None
         except Exception as e:
             logger.error(f"❌ Error getting accounts summary: {e}")
             return None
@@ -360,22 +422,22 @@ class AccountManagerClient:
         try:
             logger.info(f"🔓 Releasing all accounts locked by invite-service")
             
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.post(
-                    f"{self.base_url}/release-all",
-                    json={
-                        "service_name": "invite-service",
-                        "force": True
-                    }
-                )
+            client = get_http_client(ACCOUNT_MANAGER_CLIENT)
+            response = await client.post(
+                f"{self.base_url}/release-all",
+                json={
+                    "service_name": "invite-service",
+                    "force": True
+                }
+            )
                 
-                if response.status_code == 200:
-                    result = response.json()
-                    logger.info(f"✅ Released {result.get('released_count', 0)} accounts")
-                    return result
-                else:
-                    logger.error(f"❌ Failed to release all accounts: {response.status_code} - {response.text}")
-                    return {"error": f"HTTP {response.status_code}", "details": response.text}
+            if response.status_code == 200:
+                result = response.json()
+                logger.info(f"✅ Released {result.get('released_count', 0)} accounts")
+                return result
+            else:
+                logger.error(f"❌ Failed to release all accounts: {response.status_code} - {response.text}")
+                return {"error": f"HTTP {response.status_code}", "details": response.text}
                     
         except Exception as e:
             logger.error(f"❌ Error releasing all accounts: {e}")
@@ -30,6 +30,11 @@ class Settings(BaseSettings):
             f"@{self.POSTGRES_SERVER}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
         )
     
+    @property
+    def ASYNC_DATABASE_URL(self) -> str:
+        """URL подключения к базе данных через asyncpg"""
+        return self.DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://", 1)
+    
     # Redis для очередей
     REDIS_HOST: str = os.getenv("REDIS_HOST", "redis")
     REDIS_PORT: int = int(os.getenv("REDIS_PORT", "6379"))
@@ -42,6 +47,9 @@ class Settings(BaseSettings):
         auth = f":{self.REDIS_PASSWORD}@" if self.REDIS_PASSWORD else ""
         return f"redis://{auth}{self.REDIS_HOST}:{self.REDIS_PORT}/{self.REDIS_DB}"
     
+    # Кэш профилей Telegram пользователей, который наполняет Parsing Service
+    USER_PROFILE_CACHE_URL: str = os.getenv("USER_PROFILE_CACHE_URL", "redis://redis:6379/0")
+    
     # Celery настройки
     CELERY_BROKER_URL: str = os.getenv("CELERY_BROKER_URL", "redis://redis:6379/5")
     CELERY_RESULT_BACKEND: str = os.getenv("CELERY_RESULT_BACKEND", "redis://redis:6379/5")
@@ -3,10 +3,12 @@
 """
 
 import logging
-from contextlib import contextmanager
+from contextlib import contextmanager, asynccontextmanager
 from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 
 from .config import settings
 
@@ -23,6 +25,36 @@ engine = create_engine(
 # Создание фабрики сессий
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Асинхронный движок (asyncpg) для FastAPI endpoints - не блокирует event loop
+async_engine = create_async_engine(
+    settings.ASYNC_DATABASE_URL,
+    pool_pre_ping=True,
+    pool_recycle=300,
+    echo=settings.DEBUG
+)
+
+AsyncSessionLocal = sessionmaker(
+    async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
+# Соединения asyncpg привязаны к своему event loop и не переживают fork процесса
+# воркера Celery - поэтому для воркеров пул не используется
+worker_async_engine = create_async_engine(
+    settings.ASYNC_DATABASE_URL,
+    poolclass=NullPool,
+    echo=settings.DEBUG
+)
+
+WorkerAsyncSessionLocal = sessionmaker(
+    worker_async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
 # Базовый класс для моделей
 Base = declarative_base()
 
@@ -146,6 +178,23 @@ def get_db():
         db.close()
 
 
+async def get_async_db():
+    """Получение асинхронной сессии базы данных (для FastAPI dependency injection)"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+@asynccontextmanager
+async def get_async_db_session():
+    """Получение асинхронной сессии базы данных (для async кода Celery воркеров)"""
+    async with WorkerAsyncSessionLocal() as db:
+        try:
+            yield db
+        except Exception:
+            await db.rollback()
+            raise
+
+
 @contextmanager
 def get_db_session():
     """Получение сессии базы данных (для Celery воркеров)"""
@@ -0,0 +1,123 @@
+"""
+Общие HTTP клиенты Invite Service с пулом соединений.
+
+Раньше каждый вызов Account Manager / Integration Service открывал новый
+httpx.AsyncClient - на каждый invite приходилось 4-5 TCP подключений.
+Теперь клиенты долгоживущие: один на имя сервиса в процессе, keep-alive,
+HTTP/2 - если установлен пакет h2 (по http:// соединение остаётся HTTP/1.1).
+
+Соединения httpx привязаны к event loop, в котором открыты, поэтому клиент
+хранится отдельно для каждого loop: в FastAPI это один loop процесса,
+в Celery - loop процесса воркера (workers.celery_app.run_async).
+
+Жизненный цикл: close_http_clients() в lifespan FastAPI и при остановке
+процесса воркера, reset_http_clients() после fork воркера Celery.
+"""
+
+import asyncio
+import importlib.util
+import logging
+import time
+import weakref
+from typing import Any, Dict, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+ACCOUNT_MANAGER_CLIENT = "account-manager"
+INTEGRATION_SERVICE_CLIENT = "integration-service"
+
+POOL_LIMITS = httpx.Limits(
+    max_connections=100,
+    max_keepalive_connections=20,
+    keepalive_expiry=30.0
+)
+DEFAULT_TIMEOUT = httpx.Timeout(30.0, connect=5.0)
+
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# event loop -> {имя клиента: клиент}
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, httpx.AsyncClient]]" = weakref.WeakKeyDictionary()
+_stats: Dict[str, Dict[str, Any]] = {}
+
+
+def _client_stats(name: str) -> Dict[str, Any]:
+    if name not in _stats:
+        _stats[name] = {"clients_created": 0, "requests": 0, "responses": 0, "errors": 0, "last_created_at": None}
+    return _stats[name]
+
+
+def get_http_client(name: str, timeout: Optional[httpx.Timeout] = None) -> httpx.AsyncClient:
+    """Общий клиент `name` для текущего event loop (создаётся при первом обращении)."""
+    loop = asyncio.get_running_loop()
+    loop_clients = _clients.setdefault(loop, {})
+    client = loop_clients.get(name)
+    if client is None or client.is_closed:
+        stats = _client_stats(name)
+
+        async def on_request(request: httpx.Request):
+            stats["requests"] += 1
+
+        async def on_response(response: httpx.Response):
+            stats["responses"] += 1
+            if response.status_code >= 500:
+                stats["errors"] += 1
+
+        client = httpx.AsyncClient(
+            timeout=timeout or DEFAULT_TIMEOUT,
+            limits=POOL_LIMITS,
+            http2=HTTP2_AVAILABLE,
+            event_hooks={"request": [on_request], "response": [on_response]}
+        )
+        loop_clients[name] = client
+        stats["clients_created"] += 1
+        stats["last_created_at"] = time.time()
+        logger.info(f"🔌 HTTP клиент {name}: пул {POOL_LIMITS.max_connections} соединений, http2={HTTP2_AVAILABLE}")
+    return client
+
+
+async def close_http_clients():
+    """Закрыть клиенты текущего event loop (shutdown FastAPI / воркера)."""
+    loop = asyncio.get_running_loop()
+    loop_clients = _clients.pop(loop, {})
+    for name, client in loop_clients.items():
+        try:
+            await client.aclose()
+        except Exception as e:
+            logger.warning(f"⚠️ Ошибка закрытия HTTP клиента {name}: {e}")
+    if loop_clients:
+        logger.info(f"🔌 Закрыты HTTP клиенты: {', '.join(loop_clients)}")
+
+
+def reset_http_clients():
+    """Забыть клиенты без закрытия - после fork процесса соединения родителя не используются."""
+    _clients.clear()
+
+
+def _open_connections(client: httpx.AsyncClient) -> Optional[int]:
+    # httpx не публикует состояние пула; httpcore хранит соединения в transport._pool
+    pool = getattr(getattr(client, "_transport", None), "_pool", None)
+    connections = getattr(pool, "connections", None)
+    return len(connections) if connections is not None else None
+
+
+def http_client_stats() -> Dict[str, Any]:
+    """Метрики пулов: созданные клиенты, запросы/ответы/5xx и открытые соединения по имени клиента."""
+    result = {}
+    for name, stats in _stats.items():
+        open_connections = 0
+        active_clients = 0
+        for loop_clients in list(_clients.values()):
+            client = loop_clients.get(name)
+            if client is None or client.is_closed:
+                continue
+            active_clients += 1
+            open_connections += _open_connections(client) or 0
+        result[name] = {
+            **stats,
+            "active_clients": active_clients,
+            "open_connections": open_connections,
+            "http2": HTTP2_AVAILABLE
+        }
+    return result
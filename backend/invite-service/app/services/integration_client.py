@@ -12,6 +12,7 @@ import jwt
 from dataclasses import dataclass
 
 from app.core.vault import get_vault_client
+from app.core.http_clients import get_http_client, INTEGRATION_SERVICE_CLIENT
 
 logger = logging.getLogger(__name__)
 
@@ -119,41 +120,42 @@ class IntegrationServiceClient:
         
         for attempt in range(self.retry_config.max_retries + 1):
             try:
-                async with httpx.AsyncClient(timeout=self.timeout) as client:
-                    response = await client.request(
-                        method=method,
-                        url=url,
-                        json=json_data,
-                        params=params,
-                        headers=headers
-                    )
+                client = get_http_client(INTEGRATION_SERVICE_CLIENT)
+                response = await client.request(
+                    method=method,
+                    url=url,
+                    json=json_data,
+                    params=params,
+                    headers=headers,
+                    timeout=self.timeout
+                )
                     
-                    # Логирование запроса
-                    logger.debug(
-                        f"Integration Service {method} {endpoint}: "
-                        f"status={response.status_code}, "
-                        f"attempt={attempt + 1}"
-                    )
+                # Логирование запроса
+                logger.debug(
+                    f"Integration Service {method} {endpoint}: "
+                    f"status={response.status_code}, "
+                    f"attempt={attempt + 1}"
+                )
                     
-                    # Проверка статуса ответа
-                    if response.status_code < 400:
-                        return response.json()
+                # Проверка статуса ответа
+                if response.status_code < 400:
+                    return response.json()
                     
-                    # Обработка ошибок
-                    if response.status_code in [401, 403]:
-                        # Проблемы с аутентификацией - обновляем токен
-                        self._jwt_token = None
-                        self._jwt_expires_at = None
+                # Обработка ошибок
+                if response.status_code in [401, 403]:
+                    # Проблемы с аутентификацией - обновляем токен
+                    self._jwt_token = None
+                    self._jwt_expires_at = None
                     
-                    # Если это последняя попытка или не ретрайбл ошибка
-                    if attempt == self.retry_config.max_retries or response.status_code < 500:
-                        response.raise_for_status()
+                # Если это последняя попытка или не ретрайбл ошибка
+                if attempt == self.retry_config.max_retries or response.status_code < 500:
+                    response.raise_for_status()
                     
-                    # Логирование ошибки для retry
-                    logger.warning(
-                        f"Integration Service ошибка (retry {attempt + 1}): "
-                        f"{response.status_code} - {response.text[:200]}"
-                    )
+                # Логирование ошибки для retry
+                logger.warning(
+                    f"Integration Service ошибка (retry {attempt + 1}): "
+                    f"{response.status_code} - {response.text[:200]}"
+                )
                     
             except httpx.TimeoutException as e:
                 last_exception = e
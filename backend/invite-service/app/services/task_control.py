@@ -0,0 +1,107 @@
+"""
+Управляющие сигналы задач приглашений через Redis.
+
+Endpoints pause/cancel/delete ставят сигнал задачи, execute/resume снимают его.
+Воркеры проверяют сигнал перед каждым invite одним GET в Redis, без запроса
+к БД: отмена срабатывает в пределах одного приглашения. Асинхронные полосы
+читают сигнал через redis.asyncio (get_task_signal_async), не блокируя event loop.
+
+Ключи:
+- invite:task_control:<task_id> = pause | cancel
+- invite:deleted_task:<task_id> - задача удалена (TTL 2 ч, уже поставленные батчи пропускаются)
+"""
+
+import logging
+from typing import Optional
+
+import redis
+import redis.asyncio as aioredis
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+CONTROL_KEY_PREFIX = "invite:task_control:"
+DELETED_KEY_PREFIX = "invite:deleted_task:"
+
+SIGNAL_PAUSE = "pause"
+SIGNAL_CANCEL = "cancel"
+SIGNAL_DELETE = "delete"
+
+# Сигнал живёт, пока его может прочитать хоть один запуск воркера; статус в БД остаётся источником истины
+CONTROL_TTL_SECONDS = 7 * 24 * 3600
+DELETED_TTL_SECONDS = 7200
+
+_redis = None
+
+
+def _client() -> redis.Redis:
+    global _redis
+    if _redis is None:
+        _redis = redis.Redis.from_url(
+            get_settings().REDIS_URL,
+            decode_responses=True,
+            socket_timeout=2,
+            socket_connect_timeout=2
+        )
+    return _redis
+
+
+def async_client() -> aioredis.Redis:
+    """Асинхронный клиент для чтения сигналов из event loop; закрывает вызывающий (aclose)."""
+    return aioredis.from_url(
+        get_settings().REDIS_URL,
+        decode_responses=True,
+        socket_timeout=2,
+        socket_connect_timeout=2
+    )
+
+
+def send_task_signal(task_id: int, signal: str) -> bool:
+    """Поставить сигнал задаче (pause / cancel / delete). Ошибки Redis не пробрасываются."""
+    try:
+        if signal == SIGNAL_DELETE:
+            pipe = _client().pipeline(transaction=False)
+            pipe.setex(f"{DELETED_KEY_PREFIX}{task_id}", DELETED_TTL_SECONDS, "1")
+            pipe.setex(f"{CONTROL_KEY_PREFIX}{task_id}", DELETED_TTL_SECONDS, SIGNAL_CANCEL)
+            pipe.execute()
+        else:
+            _client().setex(f"{CONTROL_KEY_PREFIX}{task_id}", CONTROL_TTL_SECONDS, signal)
+        return True
+    except Exception as e:
+        logger.warning("Не удалось поставить сигнал %s задаче %s в Redis: %s", signal, task_id, e)
+        return False
+
+
+def clear_task_signal(task_id: int):
+    """Снять сигнал pause/cancel (запуск / возобновление задачи)."""
+    try:
+        _client().delete(f"{CONTROL_KEY_PREFIX}{task_id}")
+    except Exception as e:
+        logger.warning("Не удалось снять сигнал задачи %s в Redis: %s", task_id, e)
+
+
+def get_task_signal(task_id: int) -> Optional[str]:
+    """Текущий сигнал задачи или None; при недоступном Redis - None (воркер продолжает работу)."""
+    try:
+        return _client().get(f"{CONTROL_KEY_PREFIX}{task_id}")
+    except Exception as e:
+        logger.debug("Чтение сигнала задачи %s: %s", task_id, e)
+        return None
+
+
+async def get_task_signal_async(task_id: int, client: aioredis.Redis) -> Optional[str]:
+    """get_task_signal для асинхронного кода: клиент из async_client()."""
+    try:
+        return await client.get(f"{CONTROL_KEY_PREFIX}{task_id}")
+    except Exception as e:
+        logger.debug("Чтение сигнала задачи %s: %s", task_id, e)
+        return None
+
+
+def is_task_deleted(task_id: int) -> bool:
+    try:
+        return bool(_client().get(f"{DELETED_KEY_PREFIX}{task_id}"))
+    except Exception as e:
+        logger.debug("Проверка Redis deleted_task: %s", e)
+        return False
@@ -0,0 +1,53 @@
+"""
+Чтение общего кэша профилей Telegram пользователей.
+
+Parsing Service сохраняет профили (username, имя, телефон или "телефон скрыт",
+premium/verified) в Redis под ключами `tg:user_profile:<user_id>` с TTL.
+При импорте целей из парсинга недостающие поля берутся из этого кэша.
+"""
+
+import json
+import logging
+from typing import Any, Dict, Iterable
+
+import redis.asyncio as aioredis
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "tg:user_profile:"
+
+_redis = None
+
+
+def _client():
+    global _redis
+    if _redis is None:
+        _redis = aioredis.from_url(get_settings().USER_PROFILE_CACHE_URL, decode_responses=True)
+    return _redis
+
+
+async def get_cached_profiles(user_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Профили из кэша одним MGET: user_id (строкой) -> профиль.
+    Ошибки Redis не прерывают импорт - возвращается то, что удалось прочитать.
+    """
+    user_ids = [str(user_id) for user_id in dict.fromkeys(user_ids) if user_id]
+    if not user_ids:
+        return {}
+    try:
+        values = await _client().mget([f"{KEY_PREFIX}{user_id}" for user_id in user_ids])
+    except Exception as e:
+        logger.warning(f"⚠️ Кэш профилей недоступен: {e}")
+        return {}
+
+    profiles = {}
+    for user_id, value in zip(user_ids, values):
+        if not value:
+            continue
+        try:
+            profiles[user_id] = json.loads(value)
+        except ValueError:
+            continue
+    return profiles
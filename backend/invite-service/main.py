@@ -13,6 +13,7 @@ from starlette.exceptions import HTTPException as StarletteHTTPException
 
 from app.core.config import settings
 from app.core.database import create_tables
+from app.core.http_clients import close_http_clients
 from app.api.v1.router import api_router
 
 # Настройка логирования
@@ -35,6 +36,7 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     logger.info("🛑 Shutting down Invite Service...")
+    await close_http_clients()
 
 
 # Создание FastAPI приложения
@@ -125,12 +127,18 @@ async def clear_all_tasks():
                 db.query(InviteTarget).delete()
                 logger.info(f"🗑️ Cleared {targets_count} invite targets")
             
+            task_ids = [row[0] for row in db.query(InviteTask.id).all()] if tasks_count > 0 else []
             if tasks_count > 0:
                 db.query(InviteTask).delete()
                 logger.info(f"🗑️ Cleared {tasks_count} invite tasks")
             
             db.commit()
         
+        # Running workers stop before their next invite
+        from app.services.task_control import send_task_signal, SIGNAL_DELETE
+        for task_id in task_ids:
+            send_task_signal(task_id, SIGNAL_DELETE)
+        
         # Release all locked accounts
         try:
             release_result = await account_manager.release_all_accounts()
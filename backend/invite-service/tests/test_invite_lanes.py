@@ -0,0 +1,90 @@
+"""Tests for the multi-account invite lanes."""
+
+import asyncio
+import time
+from types import SimpleNamespace
+
+from workers.invite_lanes import (
+    InviteLaneEngine, invite_delay_seconds, _cooldown_from,
+    DEFAULT_INVITE_DELAY_SECONDS, MIN_INVITE_DELAY_SECONDS, MAX_COOLDOWN_SECONDS, LAST_INVITE_KEY_PREFIX
+)
+from app.services.task_control import CONTROL_KEY_PREFIX, SIGNAL_PAUSE
+
+
+def _task(settings=None):
+    return SimpleNamespace(id=7, user_id=1, settings=settings)
+
+
+def test_invite_delay_seconds():
+    assert invite_delay_seconds(_task()) == DEFAULT_INVITE_DELAY_SECONDS
+    assert invite_delay_seconds(_task({'delay_between_invites': 0})) == DEFAULT_INVITE_DELAY_SECONDS
+    assert invite_delay_seconds(_task({'delay_between_invites': 'fast'})) == DEFAULT_INVITE_DELAY_SECONDS
+    assert invite_delay_seconds(_task({'delay_between_invites': 3})) == MIN_INVITE_DELAY_SECONDS
+    assert invite_delay_seconds(_task({'delay_between_invites': 45.5})) == 45
+
+
+def test_cooldown_from():
+    assert _cooldown_from({'details': {'cooldown_remaining': 120}}) == 120
+    assert _cooldown_from({'details': {'cooldown_remaining': '30'}}) == 30
+    assert _cooldown_from({'details': {'cooldown_remaining': 10 ** 6}}) == MAX_COOLDOWN_SECONDS
+    assert _cooldown_from({'details': None}) == MAX_COOLDOWN_SECONDS
+    assert _cooldown_from({}) == MAX_COOLDOWN_SECONDS
+
+
+class _FakeAsyncRedis:
+    def __init__(self, values=None):
+        self.values = dict(values or {})
+        self.closed = False
+
+    async def get(self, key):
+        await asyncio.sleep(0)
+        return self.values.get(key)
+
+    async def set(self, key, value, ex=None):
+        await asyncio.sleep(0)
+        self.values[key] = str(value)
+
+    async def aclose(self):
+        self.closed = True
+
+
+def _engine(pacing=None, control=None):
+    engine = InviteLaneEngine(_task({'group_id': '@group'}), adapter=None, db=None, account_manager=SimpleNamespace())
+    engine.redis = pacing if pacing is not None else _FakeAsyncRedis()
+    engine.control_redis = control if control is not None else _FakeAsyncRedis()
+    return engine
+
+
+def test_lane_pacing_is_stored_through_async_redis():
+    engine = _engine()
+
+    async def scenario():
+        assert await engine._last_invite_at('acc') == 0.0
+        assert await engine._mark_invite('acc') is True
+        return await engine._last_invite_at('acc')
+
+    before = time.time()
+    assert asyncio.run(scenario()) >= before
+    assert f"{LAST_INVITE_KEY_PREFIX}acc" in engine.redis.values
+
+
+def test_pause_signal_stops_lanes():
+    control = _FakeAsyncRedis()
+    engine = _engine(control=control)
+
+    assert asyncio.run(engine._is_stopped()) is False
+    control.values[f"{CONTROL_KEY_PREFIX}7"] = SIGNAL_PAUSE
+    assert asyncio.run(engine._is_stopped()) is True
+
+
+def test_run_closes_redis_clients():
+    engine = _engine()
+
+    async def no_lanes():
+        return []
+
+    engine._allocate_lanes = no_lanes
+    summary = asyncio.run(engine.run())
+
+    assert summary['lanes'] == 0
+    assert engine.redis.closed and engine.control_redis.closed
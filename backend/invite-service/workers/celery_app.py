@@ -2,10 +2,14 @@
 Конфигурация Celery для Invite Service
 """
 
+import asyncio
 import os
 from celery import Celery
+from celery.signals import worker_process_init, worker_process_shutdown
 from kombu import Queue
 
+from app.core.http_clients import close_http_clients, reset_http_clients
+
 # Конфигурация Celery
 celery_app = Celery(
     'invite-service',
@@ -35,6 +39,7 @@ celery_app.conf.update(
     task_routes={
         'workers.invite_worker.execute_invite_task': {'queue': 'invite-high'},
         'workers.invite_worker.process_target_batch': {'queue': 'invite-normal'},
+        'workers.invite_worker.process_invite_lanes': {'queue': 'invite-normal'},
         'workers.invite_worker.single_invite_operation': {'queue': 'invite-normal'},
         'workers.maintenance_worker.cleanup_expired_tasks': {'queue': 'invite-low'},
         'workers.maintenance_worker.update_rate_limits': {'queue': 'invite-low'},
@@ -81,5 +86,41 @@ celery_app.conf.update(
 import logging
 logging.basicConfig(level=logging.INFO)
 
+
+# Event loop процесса воркера: общий для всех задач процесса, чтобы пулы
+# HTTP соединений (app.core.http_clients) жили дольше одной задачи
+_worker_loop = None
+
+
+def get_worker_loop() -> asyncio.AbstractEventLoop:
+    global _worker_loop
+    if _worker_loop is None or _worker_loop.is_closed():
+        _worker_loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(_worker_loop)
+    return _worker_loop
+
+
+def run_async(coro):
+    """Выполнить корутину в event loop процесса воркера"""
+    return get_worker_loop().run_until_complete(coro)
+
+
+@worker_process_init.connect
+def _init_worker_process(**kwargs):
+    # После fork loop и соединения родителя не используются
+    global _worker_loop
+    _worker_loop = None
+    reset_http_clients()
+
+
+@worker_process_shutdown.connect
+def _shutdown_worker_process(**kwargs):
+    if _worker_loop is not None and not _worker_loop.is_closed():
+        try:
+            _worker_loop.run_until_complete(close_http_clients())
+        finally:
+            _worker_loop.close()
+
+
 # Экспорт приложения
-__all__ = ['celery_app'] 
\ No newline at end of file
+__all__ = ['celery_app', 'run_async', 'get_worker_loop'] 
\ No newline at end of file
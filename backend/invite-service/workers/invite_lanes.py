@@ -0,0 +1,517 @@
+"""
+Многоаккаунтная рассылка приглашений одной кампании ("полосы").
+
+Каждый выделенный Account Manager аккаунт получает свою асинхронную полосу;
+все полосы берут цели из общей очереди PENDING-целей задачи. Темп каждой
+полосы задаётся только её аккаунтом:
+- не чаще одного invite в delay_between_invites (минимум 10 с) на аккаунт -
+  время последнего invite хранится в Redis, поэтому пауза соблюдается и между
+  запусками движка (Redis читается через redis.asyncio - полосы делят один
+  event loop, и синхронный вызов остановил бы их все);
+- резерв rate limit Account Manager (reserve_action) перед каждым invite; при
+  cooldown полоса ждёт (если успевает до конца запуска) или отдаёт цель другим
+  полосам и освобождает аккаунт. Токен резерва уходит вместе с invite: успешное
+  приглашение записывает Integration Service (2 вызова на invite вместо
+  check + invite + record), после ошибки резерв снимается rollback.
+
+Пропускная способность кампании растёт линейно с числом проверенных аккаунтов.
+Один запуск длится не дольше LANE_RUN_SECONDS (лимит времени Celery-задачи),
+следующий планирует process_invite_lanes.
+
+БД - через AsyncSession (не блокирует event loop полос). Цели очереди читаются
+одним запросом; у каждой полосы своя сессия. Результат цели записывается сразу
+после её invite, а логи выполнения и атомарное приращение счётчиков задачи
+копятся и коммитятся пачкой раз в FLUSH_EVERY_TARGETS целей / FLUSH_INTERVAL_SECONDS.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import redis.asyncio as aioredis
+from sqlalchemy import select, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import get_async_db_session
+from app.models import InviteTask, InviteTarget, TaskStatus, TargetStatus
+from app.services import task_control
+from app.services.task_control import get_task_signal_async, SIGNAL_PAUSE, SIGNAL_CANCEL
+from app.adapters.base import InviteResultStatus
+from app.clients.account_manager_client import AccountManagerClient
+from workers.invite_worker_account_manager import _send_single_invite_via_account_manager
+
+logger = logging.getLogger(__name__)
+
+# Длительность одного запуска движка (task_soft_time_limit = 25 мин)
+LANE_RUN_SECONDS = 10 * 60
+
+# Минимальная пауза между invite одного аккаунта (ТЗ), и дефолт, если delay_between_invites не задан
+MIN_INVITE_DELAY_SECONDS = 10
+DEFAULT_INVITE_DELAY_SECONDS = 60
+
+# Cooldown Account Manager не бывает длиннее
+MAX_COOLDOWN_SECONDS = 900
+
+LAST_INVITE_KEY_PREFIX = "invite:account:last_invite:"
+
+# Логи выполнения и счётчики задачи коммитятся не реже
+FLUSH_EVERY_TARGETS = 25
+FLUSH_INTERVAL_SECONDS = 30
+
+# Попытки записи результата цели / пачки
+WRITE_ATTEMPTS = 3
+
+# Поля цели, которые меняет обработка invite
+TARGET_RESULT_FIELDS = (
+    'status', 'error_message', 'error_code', 'attempt_count', 'last_attempt_at',
+    'invite_sent_at', 'sent_from_account_id', 'updated_at'
+)
+
+
+def _redis_client() -> Optional[aioredis.Redis]:
+    try:
+        redis_url = os.getenv("REDIS_URL") or os.getenv("CELERY_RESULT_BACKEND") or "redis://redis:6379/5"
+        return aioredis.from_url(redis_url, decode_responses=True, socket_timeout=2, socket_connect_timeout=2)
+    except Exception as e:
+        logger.debug("Redis недоступен для темпа полос: %s", e)
+        return None
+
+
+def invite_delay_seconds(task: InviteTask) -> int:
+    """Пауза между invite одного аккаунта: delay_between_invites задачи, но не меньше 10 с."""
+    delay = None
+    try:
+        if task.settings and isinstance(task.settings.get("delay_between_invites"), (int, float)):
+            delay = int(task.settings.get("delay_between_invites") or 0)
+    except Exception:
+        delay = None
+    if not delay or delay <= 0:
+        delay = DEFAULT_INVITE_DELAY_SECONDS
+    return max(delay, MIN_INVITE_DELAY_SECONDS)
+
+
+def _cooldown_from(rate_limit_check: Dict[str, Any]) -> int:
+    details = rate_limit_check.get('details') or {}
+    try:
+        return min(int(details.get('cooldown_remaining')), MAX_COOLDOWN_SECONDS)
+    except (TypeError, ValueError):
+        return MAX_COOLDOWN_SECONDS
+
+
+async def account_candidates(task: InviteTask, account_manager: AccountManagerClient) -> Tuple[List[str], bool]:
+    """
+    Очередь аккаунтов кампании: только прошедшие check-admin-rights (allowed_account_ids),
+    иначе - из summary AM под конкретный паблик. Возвращает (account_ids, restrict_to_verified).
+    """
+    if task.settings and isinstance(task.settings.get("allowed_account_ids"), list):
+        allowed_ids = [str(aid).strip() for aid in task.settings["allowed_account_ids"] if aid]
+        logger.info(f"🔒 Кампания ограничена аккаунтами, прошедшими проверку прав: {allowed_ids}")
+        return allowed_ids, True
+
+    preferred_queue: List[str] = []
+    try:
+        group_id = task.settings.get('group_id') if task.settings else None
+        summary = await account_manager.get_accounts_summary(
+            user_id=task.user_id,
+            purpose="invite_campaign",
+            target_channel_id=group_id,
+            limit=1000,
+            include_unavailable=False,
+        )
+        if summary and isinstance(summary.get("accounts", []), list):
+            seen = set()
+            for acc in summary["accounts"]:
+                acc_id = acc.get("account_id")
+                if acc_id and acc_id not in seen:
+                    seen.add(acc_id)
+                    preferred_queue.append(acc_id)
+    except Exception as e:
+        logger.warning(f"⚠️ Не удалось получить accounts summary из Account Manager: {e}")
+    return preferred_queue, False
+
+
+class _LaneBatch:
+    """
+    Результаты полосы: статус цели пишется сразу после её invite (приглашённая цель
+    не вернётся в PENDING ни при ошибке коммита пачки, ни при падении воркера),
+    пачкой коммитятся только логи выполнения и счётчики задачи.
+    """
+
+    def __init__(self, task_id: int, db: AsyncSession):
+        self.task_id = task_id
+        self.db = db
+        self.logs: List[Any] = []
+        self.unflushed = 0
+        self.sent = 0
+        self.failed = 0
+        self.last_flush = time.monotonic()
+        self.commits = 0
+
+    async def _write_target(self, target: InviteTarget):
+        # Цель не в сессии полосы: одно UPDATE по её результату, с повторами; не записали - полоса падает
+        values = {field: getattr(target, field) for field in TARGET_RESULT_FIELDS if hasattr(target, field)}
+        for attempt in range(1, WRITE_ATTEMPTS + 1):
+            try:
+                await self.db.execute(update(InviteTarget).where(InviteTarget.id == target.id).values(**values))
+                await self.db.commit()
+                self.commits += 1
+                return
+            except Exception as e:
+                await self.db.rollback()
+                if attempt == WRITE_ATTEMPTS:
+                    logger.error(f"❌ Не удалось сохранить результат цели {target.id} задачи {self.task_id}: {e}")
+                    raise
+                logger.warning(f"⚠️ Ошибка сохранения цели {target.id} (попытка {attempt}): {e}")
+                await asyncio.sleep(attempt)
+
+    async def done(self, target: InviteTarget, success: Optional[bool] = None):
+        """Цель обработана (success=None - без изменения счётчиков задачи): результат цели - сразу, логи и счётчики - пачкой."""
+        # Логи, добавленные _send_single_invite_via_account_manager, ждут коммита пачки
+        for obj in list(self.db.new):
+            self.db.expunge(obj)
+            self.logs.append(obj)
+        await self._write_target(target)
+        self.unflushed += 1
+        if success is True:
+            self.sent += 1
+        elif success is False:
+            self.failed += 1
+        if self.unflushed >= FLUSH_EVERY_TARGETS or time.monotonic() - self.last_flush >= FLUSH_INTERVAL_SECONDS:
+            await self.flush()
+
+    async def flush(self):
+        if not self.unflushed:
+            return
+        for attempt in range(1, WRITE_ATTEMPTS + 1):
+            try:
+                self.db.add_all(self.logs)
+                if self.sent or self.failed:
+                    # Приращение, а не запись значения: полосы коммитят независимо друг от друга
+                    await self.db.execute(
+                        update(InviteTask).where(InviteTask.id == self.task_id).values(
+                            completed_count=InviteTask.completed_count + self.sent,
+                            failed_count=InviteTask.failed_count + self.failed,
+                            updated_at=datetime.utcnow()
+                        )
+                    )
+                await self.db.commit()
+                self.commits += 1
+                break
+            except Exception as e:
+                # Откат возвращает добавленные логи в transient - их можно добавить снова
+                await self.db.rollback()
+                if attempt == WRITE_ATTEMPTS:
+                    # Статусы целей уже сохранены, теряются только логи и приращения счётчиков
+                    logger.error(f"❌ Ошибка сохранения пачки из {self.unflushed} целей задачи {self.task_id}: {e}")
+                    break
+                await asyncio.sleep(attempt)
+        self.logs = []
+        self.unflushed = self.sent = self.failed = 0
+        self.last_flush = time.monotonic()
+
+
+class InviteLaneEngine:
+    """Один запуск полос кампании: выделение аккаунтов, общая очередь целей, освобождение."""
+
+    def __init__(self, task: InviteTask, adapter, db: AsyncSession, account_manager: Optional[AccountManagerClient] = None):
+        self.task = task
+        self.adapter = adapter
+        self.db = db
+        self.account_manager = account_manager or AccountManagerClient()
+        self.group_id = task.settings.get('group_id') if task.settings else None
+        self.delay = invite_delay_seconds(task)
+        self.queue: Deque[InviteTarget] = deque()
+        self.redis = _redis_client()
+        self.control_redis = task_control.async_client()
+        self.deadline = 0.0
+        self.cancelled = False
+        self.commits = 0
+
+    async def _allocate_lanes(self) -> List[Dict[str, Any]]:
+        candidates, restrict_to_verified = await account_candidates(self.task, self.account_manager)
+        max_lanes = None
+        if self.task.settings and isinstance(self.task.settings.get("max_parallel_accounts"), int):
+            max_lanes = max(1, self.task.settings["max_parallel_accounts"])
+
+        allocations: List[Dict[str, Any]] = []
+        allocated_ids = set()
+        for pid in candidates:
+            if max_lanes and len(allocations) >= max_lanes:
+                break
+            allocation = await self.account_manager.allocate_account(
+                user_id=self.task.user_id,
+                purpose="invite_campaign",
+                preferred_account_id=pid,
+                timeout_minutes=60,
+                target_channel_id=self.group_id,
+            )
+            if allocation and allocation['account_id'] not in allocated_ids:
+                allocated_ids.add(allocation['account_id'])
+                allocations.append(allocation)
+
+        # Fallback только если кампания НЕ ограничена проверенными аккаунтами - одна полоса
+        if not allocations and not restrict_to_verified:
+            for purpose in ("invite_campaign", "general"):
+                allocation = await self.account_manager.allocate_account(
+                    user_id=self.task.user_id,
+                    purpose=purpose,
+                    timeout_minutes=60,
+                    target_channel_id=self.group_id,
+                )
+                if allocation:
+                    allocations.append(allocation)
+                    break
+
+        if not allocations:
+            if restrict_to_verified:
+                logger.error(f"❌ AccountManager: Нет доступного аккаунта с правами приглашения для задачи {self.task.id} (кампания ограничена проверенными аккаунтами)")
+            else:
+                logger.error(f"❌ AccountManager: Нет доступных аккаунтов для задачи {self.task.id}")
+        return allocations
+
+    async def _load_queue(self, lanes: int):
+        # Больше целей, чем полосы успеют за запуск, не берём; цели загружаются целиком одним запросом
+        limit = lanes * (LANE_RUN_SECONDS // self.delay + 1)
+        result = await self.db.execute(
+            select(InviteTarget).where(
+                InviteTarget.task_id == self.task.id,
+                InviteTarget.status == TargetStatus.PENDING
+            ).order_by(InviteTarget.id).limit(limit)
+        )
+        targets = result.scalars().all()
+        # Цели вне сессий: результат каждой пишет полоса отдельным UPDATE
+        for target in targets:
+            self.db.expunge(target)
+        self.queue = deque(targets)
+
+    async def _last_invite_at(self, account_id: str) -> float:
+        if not self.redis:
+            return 0.0
+        try:
+            value = await self.redis.get(f"{LAST_INVITE_KEY_PREFIX}{account_id}")
+            return float(value) if value else 0.0
+        except Exception as e:
+            logger.debug("Чтение темпа аккаунта %s: %s", account_id, e)
+            return 0.0
+
+    async def _mark_invite(self, account_id: str) -> bool:
+        """Запомнить время invite аккаунта; False - темп не сохранён (нужна локальная пауза)."""
+        if not self.redis:
+            return False
+        try:
+            await self.redis.set(f"{LAST_INVITE_KEY_PREFIX}{account_id}", time.time(), ex=MAX_COOLDOWN_SECONDS * 4)
+            return True
+        except Exception as e:
+            logger.debug("Запись темпа аккаунта %s: %s", account_id, e)
+            return False
+
+    async def _is_stopped(self) -> bool:
+        # Сигнал pause/cancel из API - один GET в Redis перед каждым invite, без запроса к БД
+        if not self.cancelled:
+            signal = await get_task_signal_async(self.task.id, self.control_redis)
+            self.cancelled = signal in (SIGNAL_PAUSE, SIGNAL_CANCEL)
+            if self.cancelled:
+                logger.info(f"📛 Задача {self.task.id}: сигнал {signal}, полосы останавливаются")
+        return self.cancelled
+
+    async def _run_lane(self, allocation: Dict[str, Any]) -> Dict[str, Any]:
+        async with get_async_db_session() as lane_db:
+            batch = _LaneBatch(self.task.id, lane_db)
+            try:
+                return await self._lane_loop(allocation, batch)
+            finally:
+                await batch.flush()
+                self.commits += batch.commits
+
+    async def _lane_loop(self, allocation: Dict[str, Any], batch: _LaneBatch) -> Dict[str, Any]:
+        account_id = allocation['account_id']
+        lane = {
+            'account_id': account_id, 'processed': 0, 'sent': 0, 'failed': 0,
+            'cooldown': None, 'rate_limit_reason': None, 'keep_locked': False
+        }
+        loop = asyncio.get_running_loop()
+
+        while self.queue and not await self._is_stopped():
+            # Темп аккаунта: не чаще одного invite в self.delay, в том числе между запусками
+            wait = await self._last_invite_at(account_id) + self.delay - time.time()
+            if wait > 0:
+                if loop.time() + wait > self.deadline:
+                    break
+                await asyncio.sleep(wait)
+                if not self.queue or await self._is_stopped():
+                    break
+            if loop.time() > self.deadline:
+                break
+
+            target = self.queue.popleft()
+            if target.status != TargetStatus.PENDING:
+                continue
+
+            if not any([target.username, target.phone_number, target.user_id_platform]):
+                logger.warning(f"⚠️ Цель {target.id} не содержит идентификаторов, пропускаем")
+                target.status = TargetStatus.FAILED
+                target.error_message = "Цель не содержит идентификаторов для приглашения"
+                target.attempt_count += 1
+                target.updated_at = datetime.utcnow()
+                await batch.done(target)
+                continue
+
+            reservation_token = None
+            try:
+                rate_limit_check = await self.account_manager.reserve_action(
+                    account_id,
+                    action_type="invite",
+                    target_channel_id=self.group_id,
+                    allow_locked=True
+                )
+                if not rate_limit_check.get('allowed', False):
+                    details = rate_limit_check.get('details') or {}
+                    cooldown = _cooldown_from(rate_limit_check)
+                    lane['rate_limit_reason'] = rate_limit_check.get('reason') or details.get('error', 'unknown')
+                    logger.warning(
+                        f"⚠️ AccountManager: Полоса аккаунта {account_id} упёрлась в лимит: {lane['rate_limit_reason']} | "
+                        f"hourly_used={details.get('hourly_used')}, hourly_limit={details.get('hourly_limit')}, "
+                        f"cooldown_remaining={details.get('cooldown_remaining')}, daily_used={details.get('daily_used')}, "
+                        f"status={details.get('status')}, flood_wait_until={details.get('flood_wait_until')}"
+                    )
+                    # Попытки не было - цель остаётся PENDING и возвращается в общую очередь
+                    target.error_message = "rate_limited"
+                    target.updated_at = datetime.utcnow()
+                    self.queue.appendleft(target)
+                    if details.get('cooldown_remaining') is not None and loop.time() + cooldown < self.deadline:
+                        await asyncio.sleep(cooldown + 1)
+                        continue
+                    lane['cooldown'] = cooldown
+                    break
+
+                reservation_token = rate_limit_check.get('reservation_token')
+                result = await _send_single_invite_via_account_manager(
+                    self.task, target, allocation, self.account_manager, self.adapter, batch.db,
+                    commit=False, reservation_token=reservation_token
+                )
+                paced = await self._mark_invite(account_id)
+                if reservation_token and not result.is_success:
+                    # Неуспешный invite не расходует лимиты - слот освобождается сразу, а не по TTL
+                    await self.account_manager.rollback_reservation(reservation_token)
+
+                msg_low = (result.error_message or "").lower()
+                is_in_progress_soft = (
+                    result.status == InviteResultStatus.RATE_LIMITED and (
+                        (getattr(result, 'error_code', None) == 'in_progress') or
+                        ('in_progress' in msg_low) or ('in progress' in msg_low)
+                    )
+                )
+                if is_in_progress_soft:
+                    # Аккаунт остаётся залочен за задачей до завершения операции, полоса на этот запуск закрывается
+                    logger.info(f"⏳ AccountManager: Цель {target.id} в in_progress, аккаунт {account_id} остаётся заблокированным")
+                    lane['keep_locked'] = True
+                    await batch.done(target)
+                    break
+
+                lane['processed'] += 1
+                if result.is_success:
+                    lane['sent'] += 1
+                else:
+                    lane['failed'] += 1
+                await batch.done(target, result.is_success)
+
+                if not reservation_token:
+                    # Account Manager без резервов - запись отдельным вызовом
+                    await self.account_manager.record_action(
+                        account_id,
+                        action_type="invite",
+                        target_channel_id=self.group_id,
+                        success=result.is_success
+                    )
+                if not paced:
+                    # Без Redis темп держим локально
+                    await asyncio.sleep(self.delay)
+
+            except SQLAlchemyError:
+                # Результат цели не сохранён (_LaneBatch._write_target) - полоса останавливается
+                if reservation_token:
+                    await self.account_manager.rollback_reservation(reservation_token)
+                raise
+            except Exception as e:
+                logger.error(f"Ошибка обработки цели {target.id} в полосе {account_id}: {str(e)}")
+                if reservation_token:
+                    await self.account_manager.rollback_reservation(reservation_token)
+                lane['processed'] += 1
+                lane['failed'] += 1
+                target.status = TargetStatus.FAILED
+                target.error_message = str(e)
+                target.attempt_count += 1
+                target.updated_at = datetime.utcnow()
+                await batch.done(target, False)
+
+        return lane
+
+    async def _release(self, allocation: Dict[str, Any], lane: Dict[str, Any]):
+        account_id = allocation['account_id']
+        if lane.get('keep_locked'):
+            logger.info(
+                f"🔒 AccountManager: Сохраняем блокировку аккаунта {account_id} (есть in_progress), "
+                "чтобы другие сервисы/задачи не перехватили аккаунт до завершения операции"
+            )
+            return
+        if lane.get('rate_limit_reason') and lane.get('cooldown') is not None:
+            usage = {'invites_sent': lane.get('sent', 0), 'success': False, 'rate_limit_block': lane['rate_limit_reason']}
+        else:
+            usage = {'invites_sent': lane.get('sent', 0), 'success': True, 'batch_completed': True}
+        try:
+            await self.account_manager.release_account(account_id, usage)
+            logger.info(f"🔓 AccountManager: Освобождён аккаунт {account_id} после полосы")
+        except Exception as release_err:
+            logger.error(f"❌ Ошибка освобождения аккаунта {account_id}: {release_err}")
+
+    async def run(self) -> Dict[str, Any]:
+        """Один запуск: все полосы параллельно до исчерпания очереди, лимитов или LANE_RUN_SECONDS."""
+        try:
+            return await self._run_lanes()
+        finally:
+            # Клиенты Redis привязаны к loop запуска - закрываем вместе с ним
+            for client in (self.redis, self.control_redis):
+                if client is not None:
+                    try:
+                        await client.aclose()
+                    except Exception as e:
+                        logger.debug("Закрытие клиента Redis полос: %s", e)
+
+    async def _run_lanes(self) -> Dict[str, Any]:
+        allocations = await self._allocate_lanes()
+        summary = {'lanes': len(allocations), 'processed': 0, 'sent': 0, 'failed': 0, 'cooldown': None}
+        if not allocations:
+            return summary
+
+        await self._load_queue(len(allocations))
+        self.deadline = asyncio.get_running_loop().time() + LANE_RUN_SECONDS
+        logger.info(
+            f"🛣️ Задача {self.task.id}: {len(allocations)} полос, {len(self.queue)} целей в очереди, "
+            f"пауза {self.delay} с на аккаунт"
+        )
+
+        lanes = await asyncio.gather(
+            *(self._run_lane(allocation) for allocation in allocations),
+            return_exceptions=True
+        )
+        for allocation, lane in zip(allocations, lanes):
+            if isinstance(lane, Exception):
+                logger.error(f"❌ Полоса аккаунта {allocation['account_id']} упала: {lane}")
+                lane = {}
+            await self._release(allocation, lane)
+            for key in ('processed', 'sent', 'failed'):
+                summary[key] += lane.get(key, 0)
+            if lane.get('cooldown') is not None:
+                summary['cooldown'] = min(summary['cooldown'] or lane['cooldown'], lane['cooldown'])
+
+        logger.info(
+            f"✅ Задача {self.task.id}: запуск полос завершён - {summary['lanes']} полос, "
+            f"обработано {summary['processed']}, успешно {summary['sent']}, ошибок {summary['failed']}, "
+            f"коммитов {self.commits}"
+        )
+        return summary
@@ -11,15 +11,19 @@ from datetime import datetime, timedelta
 from typing import List, Dict, Any, Optional
 from celery import current_task
 from celery.exceptions import Retry, WorkerLostError
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from workers.celery_app import celery_app
-from app.core.database import get_db_session
+from workers.celery_app import celery_app, run_async
+from app.core.database import get_db_session, get_async_db_session
 from app.models import InviteTask, InviteTarget, InviteExecutionLog, TaskStatus, TargetStatus
 from app.adapters.factory import get_platform_adapter
 from app.adapters.base import InviteResult, InviteResultStatus
 from app.clients.account_manager_client import AccountManagerClient
+from app.services.task_control import get_task_signal, is_task_deleted, SIGNAL_PAUSE, SIGNAL_CANCEL
 from workers.invite_worker_account_manager import _send_single_invite_via_account_manager
+from workers.invite_lanes import InviteLaneEngine, account_candidates, LANE_RUN_SECONDS, MAX_COOLDOWN_SECONDS
 
 logger = logging.getLogger(__name__)
 
@@ -220,15 +224,8 @@ def _check_account_admin_rights(account_id: str, group_id: str, user_id: int) ->
     Возвращает True если аккаунт является администратором с правами приглашать пользователей
     """
     try:
-        # Создаем новый event loop если его нет
-        try:
-            loop = asyncio.get_event_loop()
-        except RuntimeError:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-        
-        # Выполняем асинхронную проверку
-        return loop.run_until_complete(
+        # Выполняем асинхронную проверку в event loop процесса воркера
+        return run_async(
             _check_account_admin_rights_async(account_id, group_id, user_id)
         )
         
@@ -282,15 +279,7 @@ def execute_invite_task(self, task_id: int):
                 raise
             
             # Асинхронное выполнение задачи
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            
-            try:
-                result = loop.run_until_complete(_execute_task_async(task, adapter, db))
-                return result
-                
-            finally:
-                loop.close()
+            return run_async(_execute_task_async(task, adapter, db))
                 
     except Exception as e:
         logger.error(f"Ошибка выполнения задачи {task_id}: {str(e)}")
@@ -336,27 +325,121 @@ async def _execute_task_async(task: InviteTask, adapter, db: Session) -> str:
         
         logger.info(f"📊 Найдено {len(targets)} целей для обработки")
         
-        # ✅ ПЕРЕРАБОТАНО: Обработка через Account Manager - все лимиты управляются Account Manager
-        # Разбиение на батчи - размер определяется настройками задачи, не лимитами Invite Service
-        # Жёстко соблюдаем ТЗ AM: batch_size = 1
-        batch_size = 1
-        total_batches = (len(targets) + batch_size - 1) // batch_size
-        
-        logger.info(f"📦 Разбиваем {len(targets)} целей на {total_batches} батчей по {batch_size} целей (строгая очередь с паузой между батчами)")
+        # ✅ Полосы: по одной на каждый выделенный аккаунт, общая очередь целей,
+        # темп и лимиты - отдельно для каждого аккаунта (см. workers/invite_lanes.py).
+        # Следующие запуски полос планируются по цепочке, пока есть PENDING цели.
+        process_invite_lanes.delay(task.id, 1)
+        logger.info(f"🚀 Запущены полосы приглашений для {len(targets)} целей задачи {task.id}")
         
-        # Запускаем только первый батч. Следующие батчи планируются по цепочке после завершения предыдущего + пауза.
-        first_batch_targets = targets[0:batch_size]
-        first_target_ids = [t.id for t in first_batch_targets]
-        process_target_batch.delay(task.id, first_target_ids, 1)
-        logger.info(f"🚀 Запущен батч 1/{total_batches}; следующие батчи пойдут по очереди с паузой после каждого")
-        
-        return f"Запущено 1-й батч из {total_batches} для {len(targets)} целей (очередь с паузой между батчами)"
+        return f"Запущены полосы приглашений для {len(targets)} целей (по одной на аккаунт)"
         
     except Exception as e:
         logger.error(f"Ошибка в _execute_task_async для задачи {task.id}: {str(e)}")
         raise
 
 
+def _redis_client() -> redis.Redis:
+    redis_url = os.getenv("REDIS_URL") or os.getenv("CELERY_RESULT_BACKEND") or "redis://redis:6379/5"
+    return redis.Redis.from_url(redis_url, decode_responses=True)
+
+
+# Подряд идущие запуски полос без единого аккаунта, после которых цепочка останавливается
+MAX_IDLE_LANE_RUNS = 12
+NO_ACCOUNT_RETRY_SECONDS = 300
+LANE_RESCHEDULE_SECONDS = 5
+
+
+@celery_app.task(bind=True, max_retries=5)
+def process_invite_lanes(self, task_id: int, run_number: int = 1, idle_runs: int = 0):
+    """
+    Запуск полос приглашений кампании: по одной асинхронной полосе на каждый
+    выделенный аккаунт, общая очередь PENDING-целей. Пока цели остаются,
+    планирует следующий запуск.
+    
+    Args:
+        task_id: ID задачи
+        run_number: Номер запуска для логирования
+        idle_runs: Сколько запусков подряд не удалось выделить ни одного аккаунта
+    """
+    if is_task_deleted(task_id):
+        logger.info("Задача %s удалена, полосы не запускаются", task_id)
+        return
+    
+    # Одновременно работает только одна цепочка полос задачи
+    lock_key = f"invite:lanes:{task_id}"
+    try:
+        lock = _redis_client()
+        if not lock.set(lock_key, self.request.id or "1", nx=True, ex=LANE_RUN_SECONDS * 3):
+            logger.info("Полосы задачи %s уже работают, запуск %s пропущен", task_id, run_number)
+            return
+    except Exception as e:
+        logger.debug("Redis lock полос недоступен: %s", e)
+        lock = None
+    
+    try:
+        return run_async(_run_invite_lanes_async(task_id, run_number, idle_runs))
+    except Exception as e:
+        logger.error(f"Ошибка запуска полос {run_number} задачи {task_id}: {str(e)}")
+        if self.request.retries < self.max_retries and _is_retryable_error(e):
+            countdown = 2 ** self.request.retries * 60
+            if lock:
+                lock.delete(lock_key)
+                lock = None
+            raise self.retry(countdown=countdown, exc=e)
+        raise
+    finally:
+        if lock:
+            try:
+                lock.delete(lock_key)
+            except Exception as e:
+                logger.debug("Снятие Redis lock полос: %s", e)
+
+
+async def _run_invite_lanes_async(task_id: int, run_number: int, idle_runs: int) -> Optional[str]:
+    """Один запуск полос на AsyncSession и планирование следующего."""
+    async with get_async_db_session() as db:
+        task = await db.get(InviteTask, task_id)
+        if not task:
+            logger.error(f"Задача {task_id} не найдена")
+            return None
+        if task.status in [TaskStatus.CANCELLED, TaskStatus.FAILED, TaskStatus.COMPLETED, TaskStatus.PAUSED]:
+            logger.info(f"Задача {task_id} в статусе {task.status}, полосы не запускаются")
+            return None
+        
+        adapter = get_platform_adapter(task.platform)
+        summary = await InviteLaneEngine(task, adapter, db).run()
+        
+        # Счётчики и статус задачи изменены полосами / через API
+        await db.refresh(task)
+        await _check_task_completion_async(task, db)
+        if task.status in [TaskStatus.CANCELLED, TaskStatus.FAILED, TaskStatus.COMPLETED, TaskStatus.PAUSED]:
+            return f"Запуск {run_number}: успешно {summary['sent']}, задача {task.status}"
+        
+        # Следующий запуск: полосы уже выдержали темп своих аккаунтов, кроме случаев cooldown / нет аккаунтов
+        if summary['lanes'] == 0:
+            idle_runs += 1
+            if idle_runs >= MAX_IDLE_LANE_RUNS:
+                task.error_message = "Нет доступных аккаунтов через Account Manager"
+                task.updated_at = datetime.utcnow()
+                await db.commit()
+                logger.error(f"❌ Задача {task_id}: {idle_runs} запусков без аккаунтов, цепочка полос остановлена")
+                return f"Запуск {run_number}: нет доступных аккаунтов"
+            countdown = NO_ACCOUNT_RETRY_SECONDS
+        elif summary['processed'] == 0 and summary['cooldown']:
+            idle_runs = 0
+            countdown = min(int(summary['cooldown']) + 1, MAX_COOLDOWN_SECONDS + 1)
+        else:
+            idle_runs = 0
+            countdown = LANE_RESCHEDULE_SECONDS
+        
+        process_invite_lanes.apply_async((task_id, run_number + 1, idle_runs), countdown=countdown)
+        logger.info(f"⏱️ Задача {task_id}: запуск полос {run_number + 1} через {countdown} с")
+        return (
+            f"Запуск {run_number}: {summary['lanes']} полос, обработано {summary['processed']}, "
+            f"успешно {summary['sent']}"
+        )
+
+
 @celery_app.task(bind=True, max_retries=5)
 def process_target_batch(self, task_id: int, target_ids: List[int], batch_number: int = 1):
     """
@@ -368,14 +451,9 @@ def process_target_batch(self, task_id: int, target_ids: List[int], batch_number
         batch_number: Номер батча для логирования
     """
     # Если задачу удалили через веб — пропускаем батч без обращения к БД (ключ в Redis с TTL 2 ч)
-    try:
-        redis_url = os.getenv("REDIS_URL") or os.getenv("CELERY_RESULT_BACKEND") or "redis://redis:6379/5"
-        r = redis.Redis.from_url(redis_url, decode_responses=True)
-        if r.get(f"invite:deleted_task:{task_id}"):
-            logger.info("Задача %s удалена, пропуск батча %s", task_id, batch_number)
-            return
-    except Exception as e:
-        logger.debug("Проверка Redis deleted_task: %s", e)
+    if is_task_deleted(task_id):
+        logger.info("Задача %s удалена, пропуск батча %s", task_id, batch_number)
+        return
 
     logger.info(f"Обработка батча {batch_number} для задачи {task_id}: {len(target_ids)} целей")
     
@@ -396,21 +474,14 @@ def process_target_batch(self, task_id: int, target_ids: List[int], batch_number
             adapter = get_platform_adapter(task.platform)
             
             # Асинхронная обработка батча
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
+            result = run_async(
+                _process_batch_async(task, targets, adapter, db, batch_number)
+            )
             
-            try:
-                result = loop.run_until_complete(
-                    _process_batch_async(task, targets, adapter, db, batch_number)
-                )
-                
-                # Проверка завершения всей задачи
-                _check_task_completion(task, db)
-                
-                return result
-                
-            finally:
-                loop.close()
+            # Проверка завершения всей задачи
+            _check_task_completion(task, db)
+            
+            return result
                 
         except Exception as e:
             logger.error(f"Ошибка обработки батча {batch_number} задачи {task_id}: {str(e)}")
@@ -462,38 +533,12 @@ async def _process_batch_async(
 
         # Очередь кандидатов: только аккаунты, прошедшие check-admin-rights (allowed_account_ids),
         # иначе — из summary AM под конкретный паблик
-        preferred_queue: List[str] = []
-        restrict_to_verified = False
-        if task.settings and "allowed_account_ids" in task.settings and isinstance(task.settings.get("allowed_account_ids"), list):
-            allowed_ids = [str(aid).strip() for aid in task.settings["allowed_account_ids"] if aid]
-            preferred_queue = list(allowed_ids)
-            restrict_to_verified = True
-            logger.info(f"🔒 Кампания ограничена аккаунтами, прошедшими проверку прав: {preferred_queue}")
-        else:
-            try:
-                group_id = task.settings.get('group_id') if task.settings else None
-                summary = await account_manager.get_accounts_summary(
-                    user_id=task.user_id,
-                    purpose="invite_campaign",
-                    target_channel_id=group_id,
-                    limit=1000,
-                    include_unavailable=False,
-                )
-                if summary and isinstance(summary.get("accounts", []), list):
-                    seen = set()
-                    for acc in summary["accounts"]:
-                        acc_id = acc.get("account_id")
-                        if acc_id and acc_id not in seen:
-                            seen.add(acc_id)
-                            preferred_queue.append(acc_id)
-            except Exception as e:
-                logger.warning(f"⚠️ Не удалось получить accounts summary из Account Manager: {e}")
+        preferred_queue, restrict_to_verified = await account_candidates(task, account_manager)
         
         for target in targets:
-            # Проверка статуса задачи (может быть отменена)
-            db.refresh(task)
-            if task.status in [TaskStatus.CANCELLED, TaskStatus.FAILED]:
-                logger.info(f"📛 Задача {task.id} отменена/провалена, прерываем обработку батча {batch_number}")
+            # Сигнал pause/cancel из API - GET в Redis вместо refresh задачи из БД
+            if get_task_signal(task.id) in (SIGNAL_PAUSE, SIGNAL_CANCEL):
+                logger.info(f"📛 Задача {task.id} приостановлена/отменена, прерываем обработку батча {batch_number}")
                 # Освобождаем аккаунт если он был выделен
                 if current_account_allocation:
                     await account_manager.release_account(
@@ -791,7 +836,7 @@ async def _process_batch_async(
                 f"(delay_between_invites={delay_between_invites})"
             )
         db.refresh(task)
-        if task.status not in [TaskStatus.CANCELLED, TaskStatus.FAILED]:
+        if task.status not in [TaskStatus.CANCELLED, TaskStatus.FAILED, TaskStatus.PAUSED]:
             all_targets_ordered = db.query(InviteTarget).filter(InviteTarget.task_id == task.id).order_by(InviteTarget.id).all()
             total_batches = len(all_targets_ordered)
             if batch_number < total_batches:
@@ -976,6 +1021,24 @@ def _check_task_completion(task: InviteTask, db: Session):
         logger.info(f"Задача {task.id} полностью завершена")
 
 
+async def _check_task_completion_async(task: InviteTask, db: AsyncSession):
+    """Проверка завершения задачи (AsyncSession)"""
+    pending_count = (await db.execute(
+        select(func.count(InviteTarget.id)).where(
+            InviteTarget.task_id == task.id,
+            InviteTarget.status == TargetStatus.PENDING
+        )
+    )).scalar()
+    
+    if pending_count == 0:
+        task.status = TaskStatus.COMPLETED
+        task.end_time = datetime.utcnow()
+        task.updated_at = datetime.utcnow()
+        await db.commit()
+        
+        logger.info(f"Задача {task.id} полностью завершена")
+
+
 def _is_retryable_error(error: Exception) -> bool:
     """Проверка возможности retry для ошибки"""
     
@@ -1038,46 +1101,39 @@ def single_invite_operation(self, task_id: int, target_id: int, account_id: int
             adapter = get_platform_adapter(task.platform)
             account_manager = AccountManagerClient()
             
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            
-            try:
-                # ✅ ПЕРЕРАБОТАНО: Запрос аккаунта через Account Manager вместо прямой инициализации
-                account_allocation = loop.run_until_complete(
-                    account_manager.allocate_account(
-                        user_id=task.user_id,
-                        purpose="single_invite",
-                        timeout_minutes=30
-                    )
+            # ✅ ПЕРЕРАБОТАНО: Запрос аккаунта через Account Manager вместо прямой инициализации
+            account_allocation = run_async(
+                account_manager.allocate_account(
+                    user_id=task.user_id,
+                    purpose="single_invite",
+                    timeout_minutes=30
                 )
-                
-                if not account_allocation:
-                    logger.error(f"❌ AccountManager: Нет доступных аккаунтов для задачи {task_id}")
-                    return "Нет доступных аккаунтов через Account Manager"
-                
-                logger.info(f"✅ AccountManager: Выделен аккаунт {account_allocation['allocation']['account_id']} для одиночного приглашения")
-                
-                # Отправка приглашения через Account Manager
-                result = loop.run_until_complete(
-                    _send_single_invite_via_account_manager(
-                        task, target, account_allocation, account_manager, adapter, db
-                    )
+            )
+            
+            if not account_allocation:
+                logger.error(f"❌ AccountManager: Нет доступных аккаунтов для задачи {task_id}")
+                return "Нет доступных аккаунтов через Account Manager"
+            
+            logger.info(f"✅ AccountManager: Выделен аккаунт {account_allocation['allocation']['account_id']} для одиночного приглашения")
+            
+            # Отправка приглашения через Account Manager
+            result = run_async(
+                _send_single_invite_via_account_manager(
+                    task, target, account_allocation, account_manager, adapter, db
                 )
-                
-                # Освобождаем аккаунт
-                loop.run_until_complete(
-                    account_manager.release_account(
-                        account_allocation['allocation']['account_id'],
-                        {'invites_sent': 1 if result.is_success else 0, 'success': result.is_success}
-                    )
+            )
+            
+            # Освобождаем аккаунт
+            run_async(
+                account_manager.release_account(
+                    account_allocation['allocation']['account_id'],
+                    {'invites_sent': 1 if result.is_success else 0, 'success': result.is_success}
                 )
-                
-                logger.info(f"🔓 AccountManager: Освобожден аккаунт {account_allocation['allocation']['account_id']} после одиночного приглашения")
-                
-                return f"Приглашение отправлено через Account Manager: {result.status}"
-                
-            finally:
-                loop.close()
+            )
+            
+            logger.info(f"🔓 AccountManager: Освобожден аккаунт {account_allocation['allocation']['account_id']} после одиночного приглашения")
+            
+            return f"Приглашение отправлено через Account Manager: {result.status}"
                 
         except Exception as e:
             logger.error(f"Ошибка одиночного приглашения: {str(e)}")
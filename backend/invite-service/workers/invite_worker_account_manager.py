@@ -4,7 +4,8 @@
 """
 import logging
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Union
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.models import InviteTarget, TargetStatus
@@ -44,11 +45,17 @@ async def _send_single_invite_via_account_manager(
     account_allocation: Dict[str, Any],
     account_manager: AccountManagerClient,
     adapter,
-    db: Session
+    db: Union[Session, AsyncSession],
+    commit: bool = True,
+    reservation_token: Optional[str] = None
 ) -> InviteResult:
     """
     ✅ НОВАЯ ФУНКЦИЯ: Отправка одиночного приглашения через Account Manager
     Заменяет прямые вызовы Integration Service согласно ТЗ Account Manager
+    
+    commit=False: изменения цели и лог только добавляются в сессию (в т.ч. AsyncSession),
+    коммитит вызывающий код - одним коммитом на пачку целей.
+    reservation_token: резерв rate limit (reserve_action) - успешный invite записывает Integration Service.
     """
     start_time = datetime.utcnow()
     
@@ -67,7 +74,8 @@ async def _send_single_invite_via_account_manager(
         if hasattr(target, "last_attempt_at"):
             target.last_attempt_at = datetime.utcnow()
         target.updated_at = datetime.utcnow()
-        db.commit()
+        if commit:
+            db.commit()
         
         # Подготавливаем данные цели для адаптера
         target_data = {}
@@ -83,6 +91,8 @@ async def _send_single_invite_via_account_manager(
             'group_id': task.settings.get('group_id') if task.settings else None,
             'message': task.settings.get('message') if task.settings else None
         }
+        if reservation_token:
+            invite_data['reservation_token'] = reservation_token
         
         logger.info(f"🔍 AccountManager: Данные для приглашения - target: {target_data}, invite: {invite_data}")
         
@@ -206,7 +216,8 @@ async def _send_single_invite_via_account_manager(
         
         # Коммитим изменения с обработкой ошибок (цель + лог)
         try:
-            db.commit()
+            if commit:
+                db.commit()
         except Exception as db_error:
             logger.error(f"❌ Ошибка сохранения в БД для цели {target.id} и лога: {str(db_error)}")
             db.rollback()
@@ -239,7 +250,8 @@ async def _send_single_invite_via_account_manager(
         target.updated_at = datetime.utcnow()
         
         try:
-            db.commit()
+            if commit:
+                db.commit()
         except Exception as db_error:
             logger.error(f"❌ Ошибка сохранения ошибки в БД для цели {target.id}: {str(db_error)}")
             db.rollback()
@@ -279,7 +291,8 @@ async def _send_single_invite_via_account_manager(
                 error_message=e_str,
             )
             db.add(err_log)
-            db.commit()
+            if commit:
+                db.commit()
         except Exception:
             logger.warning(
                 "⚠️ AccountManager: не удалось записать InviteExecutionLog для исключения по цели %s",
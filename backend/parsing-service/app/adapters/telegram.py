@@ -7,7 +7,8 @@ import asyncio
 import logging
 import os
 import tempfile
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Set, AsyncGenerator, Union
+from dataclasses import dataclass, field
 from datetime import datetime
 
 from telethon import TelegramClient
@@ -29,9 +30,65 @@ from ..core.config import Platform
 from ..models.parse_task import ParseTask
 from ..models.parse_result import ParseResult
 from ..clients.account_manager_client import AccountManagerClient
+from ..core.parsing_speed import ParsingSpeed, get_speed_config
+from ..core.rate_limiter import TokenBucket
+from ..core.user_profile_cache import get_user_profile_cache, build_user_profile
+from ..core.search_cache import transliterate, paginate_communities, get_comments_probe_cache
+from .telegram_user_resolver import TelegramUserResolver, GET_USERS_BATCH_LIMIT
 
 logger = logging.getLogger(__name__)
 
+# Users per batch yielded by iter_target_batches
+DEFAULT_STREAM_BATCH_SIZE = 100
+
+# Channel posts buffered before their comment threads are fetched together
+CHANNEL_WINDOW_MAX_MESSAGES = 50
+
+# Search results whose community data (has-comments probe, full info) is fetched concurrently
+COMMUNITY_EXTRACT_CONCURRENCY = 4
+
+# Attempts of one community extraction request after FloodWait (the api bucket is paused in between)
+COMMUNITY_EXTRACT_FLOOD_RETRIES = 3
+
+# Attempts of one comment thread fetch after FloodWait; a thread is never silently cut short
+REPLY_THREAD_FLOOD_RETRIES = 3
+
+# raw_data key of the account a user's access_hash belongs to (hashes are valid for that account only)
+ACCESS_HASH_ACCOUNT_KEY = 'access_hash_account_id'
+
+
+@dataclass
+class ParseCheckpoint:
+    """Resumable position of a streaming parse.
+    
+    Only the scalar fields are persisted (ParseTask.resume_data); the seen-user set
+    is rebuilt from already saved parse_results when a task is resumed.
+    """
+    last_message_id: Optional[int] = None
+    found_users: int = 0
+    metadata_saved: bool = False
+    seen_user_ids: Set[int] = field(default_factory=set)
+    
+    def to_resume_data(self) -> Dict[str, Any]:
+        """Serialize the checkpoint for ParseTask.resume_data."""
+        return {
+            "last_message_id": self.last_message_id,
+            "found_users": self.found_users,
+            "metadata_saved": self.metadata_saved,
+            "checkpoint_at": datetime.utcnow().isoformat()
+        }
+    
+    @classmethod
+    def from_resume_data(cls, resume_data: Optional[Dict[str, Any]], seen_user_ids: Optional[Set[int]] = None) -> "ParseCheckpoint":
+        """Restore a checkpoint saved by to_resume_data."""
+        resume_data = resume_data or {}
+        return cls(
+            last_message_id=resume_data.get("last_message_id"),
+            found_users=int(resume_data.get("found_users") or 0),
+            metadata_saved=bool(resume_data.get("metadata_saved")),
+            seen_user_ids=set(seen_user_ids or ())
+        )
+
 
 class TelegramAdapter(BasePlatformAdapter):
     """Telegram platform adapter for parsing channels and groups with Telethon.
@@ -46,6 +103,15 @@ class TelegramAdapter(BasePlatformAdapter):
         self.account_manager = AccountManagerClient()
         self.current_account_id = None
         self.allocated_account = None
+        # Per-account token buckets, built from SpeedConfig in _configure_rate_limiters
+        self.api_rate_limiter: Optional[TokenBucket] = None
+        self.user_rate_limiter: Optional[TokenBucket] = None
+        self._rate_limit_profile = None
+        # Profiles shared across tasks (and with Invite Service) to skip repeated GetFullUserRequest
+        self.user_profile_cache = get_user_profile_cache()
+        # Communities seen while scanning dialogs, for the community index (platform_id -> community)
+        self.discovered_communities: Dict[str, Dict[str, Any]] = {}
+        self.comments_probe_cache = get_comments_probe_cache()
         
     @property
     def platform_name(self) -> str:
@@ -297,13 +363,77 @@ class TelegramAdapter(BasePlatformAdapter):
         
         return results
     
+    def _configure_rate_limiters(self, speed_config=None):
+        """Create token buckets for the account from SpeedConfig (kept while the speed profile is unchanged)."""
+        speed_config = speed_config or get_speed_config(ParsingSpeed.MEDIUM)
+        if self._rate_limit_profile == speed_config.name and self.api_rate_limiter:
+            return
+        burst = max(1, speed_config.reply_fetch_concurrency)
+        self.api_rate_limiter = TokenBucket(speed_config.api_requests_per_minute, capacity=burst, name="api")
+        self.user_rate_limiter = TokenBucket(speed_config.user_requests_per_minute, capacity=burst, name="user")
+        self._rate_limit_profile = speed_config.name
+        self.logger.info(
+            f"🪣 Rate limiters: {speed_config.api_requests_per_minute} api req/min, "
+            f"{speed_config.user_requests_per_minute} user req/min, burst {burst}"
+        )
+    
+    async def _acquire_search_slot(self):
+        """Take a token from the account api bucket before a search request (no-op when unconfigured)."""
+        if self.api_rate_limiter:
+            await self.api_rate_limiter.acquire()
+    
+    def _penalize_search(self, seconds: float):
+        """Pause every concurrent search request of this account after FloodWait."""
+        if self.api_rate_limiter:
+            self.api_rate_limiter.penalize(seconds)
+    
+    async def _paced_search_call(self, make_call, label: str):
+        """
+        Run one search or community extraction request through the account api bucket.
+        
+        FloodWait pauses the bucket for every concurrent search request and the request
+        is retried; it is raised after COMMUNITY_EXTRACT_FLOOD_RETRIES attempts.
+        """
+        for attempt in range(1, COMMUNITY_EXTRACT_FLOOD_RETRIES + 1):
+            await self._acquire_search_slot()
+            try:
+                return await make_call()
+            except FloodWaitError as e:
+                self.logger.warning(f"⏳ FloodWait {e.seconds}s in {label} (attempt {attempt})")
+                self._penalize_search(e.seconds + 1)
+                if attempt == COMMUNITY_EXTRACT_FLOOD_RETRIES:
+                    raise
+                if not self.api_rate_limiter:
+                    await asyncio.sleep(e.seconds + 1)
+    
     async def parse_target(self, task: ParseTask, target: str, config: Dict[str, Any]):
         """Parse messages from a Telegram target with speed configuration support."""
+        parsed_results = []
+        async for batch in self.iter_target_batches(task, target, config):
+            parsed_results.extend(batch)
+        
+        self.logger.info(f"✅ Completed parsing {target}, returning {len(parsed_results)} results")
+        return parsed_results
+    
+    async def iter_target_batches(self, task: ParseTask, target: str, config: Dict[str, Any]) -> AsyncGenerator[List[Dict[str, Any]], None]:
+        """
+        Parse a Telegram target and yield extracted users in batches.
+        
+        The first batch holds the channel/group metadata. config['checkpoint'] (ParseCheckpoint)
+        is updated before every yield, so once a batch is persisted the checkpoint can be
+        saved and an interrupted task resumed from it.
+        
+        config['shard'] ({'min_id', 'max_id'}) limits channel parsing to a message-id range,
+        used by sharded multi-account parsing.
+        """
         try:
             normalized_target = self.normalize_target(target)
             message_limit = config.get('message_limit', 10000)
             progress_callback = config.get('progress_callback')
             speed_config = config.get('speed_config')  # New: speed configuration
+            checkpoint = config.get('checkpoint') or ParseCheckpoint()
+            stream_batch_size = config.get('stream_batch_size', DEFAULT_STREAM_BATCH_SIZE)
+            shard = config.get('shard')
             
             # ✅ Перед началом парсинга проверяем лимиты в Account Manager, чтобы не конфликтовать с Invite Service
             if self.current_account_id:
@@ -327,20 +457,21 @@ class TelegramAdapter(BasePlatformAdapter):
             else:
                 self.logger.info(f"📥 Starting to parse {normalized_target} (USER LIMIT: {message_limit} users, DEFAULT SPEED)")
             
+            if checkpoint.found_users or checkpoint.last_message_id:
+                self.logger.info(f"♻️ Resuming {normalized_target} from message {checkpoint.last_message_id} ({checkpoint.found_users} users already collected)")
+            
             # Get entity (Channel/Group)
             entity = await self.client.get_entity(normalized_target)
             
-            parsed_results = []
-            
             if isinstance(entity, Channel):
-                parsed_results = await self._parse_channel(task, entity, message_limit, progress_callback, speed_config)
+                batches = self._iter_channel_batches(task, entity, message_limit, progress_callback, speed_config, checkpoint, stream_batch_size, shard)
             elif isinstance(entity, Chat):
-                parsed_results = await self._parse_group(task, entity, message_limit, progress_callback, speed_config)
+                batches = self._iter_group_batches(task, entity, message_limit, progress_callback, speed_config, checkpoint, stream_batch_size)
             else:
                 raise ValueError(f"Unsupported entity type: {type(entity)}")
             
-            self.logger.info(f"✅ Completed parsing {normalized_target}, returning {len(parsed_results)} results")
-            return parsed_results
+            async for batch in batches:
+                yield batch
             
         except Exception as e:
             self.logger.error(f"❌ Failed to parse {target}: {e}")
@@ -348,39 +479,140 @@ class TelegramAdapter(BasePlatformAdapter):
     
     async def _parse_channel(self, task: ParseTask, channel: Channel, message_limit: int, progress_callback=None, speed_config=None):
         """Parse users from a Telegram channel by collecting commenters from posts."""
+        parsed_results = []
+        async for batch in self._iter_channel_batches(task, channel, message_limit, progress_callback, speed_config):
+            parsed_results.extend(batch)
+        return parsed_results
+    
+    async def _iter_channel_batches(
+        self,
+        task: ParseTask,
+        channel: Channel,
+        message_limit: int,
+        progress_callback=None,
+        speed_config=None,
+        checkpoint: Optional["ParseCheckpoint"] = None,
+        stream_batch_size: int = DEFAULT_STREAM_BATCH_SIZE,
+        shard: Optional[Dict[str, int]] = None
+    ) -> AsyncGenerator[List[Dict[str, Any]], None]:
+        """Yield users from a Telegram channel (commenters and post authors) in batches."""
         self.logger.info(f"📱 Parsing channel users: {channel.title} (USER LIMIT: {message_limit} users)")
+        if shard:
+            self.logger.info(f"🧩 Shard: messages {shard['min_id'] + 1}..{shard['max_id'] - 1}")
         
         # Apply speed configuration defaults if not provided
         if speed_config:
-            message_delay = speed_config.message_delay
-            user_request_delay = speed_config.user_request_delay
-            batch_size = speed_config.batch_size
-            self.logger.info(f"⚡ Channel parsing speed: {message_delay}s msg delay, {user_request_delay}s user delay, batch {batch_size}")
+            reply_concurrency = max(1, speed_config.reply_fetch_concurrency)
+            self.logger.info(
+                f"⚡ Channel parsing speed: {speed_config.api_requests_per_minute} api req/min, "
+                f"{speed_config.user_requests_per_minute} user req/min, {reply_concurrency} reply threads in flight"
+            )
         else:
             # Default speed settings (medium)
-            message_delay = 0.8
-            user_request_delay = 1.5
-            batch_size = 25
+            reply_concurrency = get_speed_config(ParsingSpeed.MEDIUM).reply_fetch_concurrency
             self.logger.info("⚡ Using default speed settings")
+        self._configure_rate_limiters(speed_config)
+        
+        if checkpoint is None:
+            checkpoint = ParseCheckpoint()
+        
+        # Channel metadata goes first so it is persisted with the first batch
+        if not checkpoint.metadata_saved:
+            channel_metadata = await self._extract_channel_metadata(task, channel)
+            checkpoint.metadata_saved = True
+            yield [channel_metadata]
         
-        unique_users = {}  # user_id -> user_data
+        seen_users = checkpoint.seen_user_ids
+        pending: List[Dict[str, Any]] = []
         processed_messages = 0
-        found_commenters = 0
-        request_count = 0  # Track requests for batch processing
+        found_commenters = checkpoint.found_users
+        limit_reached = found_commenters >= message_limit
+        resolver = TelegramUserResolver(self.client, rate_limiter=self.api_rate_limiter)
+        
+        async def process_window(window: List[Message]):
+            """Fetch reply threads of the window concurrently, then collect users in message order."""
+            nonlocal found_commenters, limit_reached
+            
+            reply_senders = await asyncio.gather(
+                *(self._fetch_reply_senders(channel, message) for message in window)
+            )
+            
+            for message, senders in zip(window, reply_senders):
+                if limit_reached:
+                    break
+                
+                # user_id -> (User from message or None, user_type), commenters first
+                candidates: Dict[int, tuple] = {}
+                for user_id, sender in senders.items():
+                    if user_id not in seen_users:
+                        candidates[user_id] = (sender, "commenter")
+                
+                # Also collect message authors (if not anonymous channel)
+                if message.from_id and isinstance(message.from_id, PeerUser):
+                    user_id = message.from_id.user_id
+                    if user_id not in seen_users and user_id not in candidates:
+                        candidates[user_id] = (resolver.sender_of(message), "author")
+                
+                if candidates:
+                    resolved_users = await resolver.resolve(
+                        {user_id: user for user_id, (user, _) in candidates.items()}
+                    )
+                    
+                    for user_id, (_, user_type) in candidates.items():
+                        user = resolved_users.get(user_id)
+                        if user is None or user_id in seen_users:
+                            continue
+                        
+                        try:
+                            user_data = await self._extract_user_data(task, user, channel, user_type)
+                            seen_users.add(user_id)
+                            pending.append(user_data)
+                            found_commenters += 1
+                            
+                            # 🔥 ПРОВЕРКА ЛИМИТА ПОЛЬЗОВАТЕЛЕЙ
+                            if found_commenters >= message_limit:
+                                self.logger.info(f"🛑 LIMIT REACHED: {found_commenters}/{message_limit} users found - STOPPING CHANNEL PARSING")
+                                limit_reached = True
+                                break
+                            
+                            # Calculate progress update frequency (every 5% of message_limit)
+                            progress_step = max(1, int(message_limit * 0.05))
+                            if found_commenters % progress_step == 0:
+                                self.logger.info(f"Found {found_commenters} unique commenters...")
+                                # Update progress if callback provided
+                                if progress_callback:
+                                    try:
+                                        await progress_callback(found_commenters, message_limit)
+                                    except Exception as e:
+                                        self.logger.debug(f"Progress callback error: {e}")
+                        
+                        except Exception as e:
+                            self.logger.debug(f"Could not get {user_type} data for user {user_id}: {e}")
+                
+                # Message fully processed - advance the checkpoint
+                checkpoint.found_users = found_commenters
+                if not limit_reached:
+                    checkpoint.last_message_id = message.id
         
         # Get recent messages to find users who commented
         # Use larger message limit since we're limiting by USERS, not messages
         message_search_limit = max(message_limit * 10, 1000)  # Search more messages to find enough users
+        history_kwargs = {'limit': message_search_limit, 'offset_id': checkpoint.last_message_id or 0}
+        if shard:
+            # The shard range already bounds the history (min_id/max_id are exclusive)
+            history_kwargs.update(limit=None, min_id=shard['min_id'], max_id=shard['max_id'])
         self.logger.info(f"📝 Will search through {message_search_limit} messages to find {message_limit} users")
-        async for message in self.client.iter_messages(channel, limit=message_search_limit):
-            if not isinstance(message, Message):
-                continue
-            
-            # Check if we already reached user limit before processing more messages
-            if found_commenters >= message_limit:
+        window: List[Message] = []
+        window_threads = 0
+        logged_messages = 0
+        async for message in self.client.iter_messages(channel, **history_kwargs):
+            if limit_reached:
                 self.logger.info(f"🛑 USER LIMIT REACHED: {found_commenters}/{message_limit} - stopping message iteration")
                 break
             
+            if not isinstance(message, Message):
+                continue
+            
             # ✅ Периодически проверяем rate limit AM, чтобы не пересекаться с Invite Service
             if self.current_account_id and (processed_messages % 25 == 0):
                 try:
@@ -398,112 +630,110 @@ class TelegramAdapter(BasePlatformAdapter):
                     self.logger.debug(f"Rate-limit check failed (channel mid): {rl_err}")
             
             processed_messages += 1
+            window.append(message)
+            if self._has_replies(message):
+                window_threads += 1
             
-            # Check if message has comments/replies (only for channels with comments enabled)
-            if hasattr(message, 'replies') and message.replies and message.replies.replies > 0:
-                try:
-                    # Rate limiting: speed-configurable delay between message requests
-                    await asyncio.sleep(message_delay)
-                    
-                    # Get comments/replies for this message
-                    comment_count = 0
-                    async for reply in self.client.iter_messages(
-                        channel, 
-                        reply_to=message.id,
-                        limit=50  # Limit comments per post
-                    ):
-                        if reply.from_id and isinstance(reply.from_id, PeerUser):
-                            user_id = reply.from_id.user_id
-                            
-                            # Skip if we already have this user
-                            if user_id in unique_users:
-                                continue
-                            
-                            try:
-                                user = await self.client.get_entity(reply.from_id)
-                                user_data = await self._extract_user_data(task, user, channel, "commenter")
-                                unique_users[user_id] = user_data
-                                found_commenters += 1
-                                comment_count += 1
-                                request_count += 1
-                                
-                                # 🔥 ПРОВЕРКА ЛИМИТА ПОЛЬЗОВАТЕЛЕЙ
-                                if found_commenters >= message_limit:
-                                    self.logger.info(f"🛑 LIMIT REACHED: {found_commenters}/{message_limit} users found - STOPPING CHANNEL PARSING")
-                                    channel_metadata = await self._extract_channel_metadata(task, channel)
-                                    final_results = [channel_metadata] + list(unique_users.values())
-                                    self.logger.info(f"✅ Returning {len(final_results)} results due to user limit")
-                                    return final_results
-                                
-                                # Calculate progress update frequency (every 5% of message_limit)
-                                progress_step = max(1, int(message_limit * 0.05))
-                                if found_commenters % progress_step == 0:
-                                    self.logger.info(f"Found {found_commenters} unique commenters...")
-                                    # Update progress if callback provided
-                                    if progress_callback:
-                                        try:
-                                            await progress_callback(found_commenters, message_limit)
-                                        except Exception as e:
-                                            self.logger.debug(f"Progress callback error: {e}")
-                                
-                                # Speed-configurable rate limiting for user requests
-                                if request_count % batch_size == 0:
-                                    await asyncio.sleep(user_request_delay)
-                                    
-                            except FloodWaitError as e:
-                                self.logger.warning(f"FloodWait {e.seconds}s - pausing...")
-                                try:
-                                    # Защищенное ожидание FloodWait от отмены
-                                    await asyncio.sleep(e.seconds + 1)
-                                except asyncio.CancelledError:
-                                    self.logger.warning(f"⚠️ FloodWait cancelled during {e.seconds}s wait")
-                                    raise
-                            except Exception as e:
-                                self.logger.debug(f"Could not get commenter data for user {user_id}: {e}")
+            # Keep up to reply_concurrency comment threads in flight
+            if window_threads < reply_concurrency and len(window) < CHANNEL_WINDOW_MAX_MESSAGES:
+                continue
+            
+            await process_window(window)
+            window = []
+            window_threads = 0
+            
+            if processed_messages - logged_messages >= 50:
+                logged_messages = processed_messages
+                self.logger.info(f"Processed {processed_messages} messages, found {found_commenters} unique users...")
+            
+            if len(pending) >= stream_batch_size:
+                yield pending
+                pending = []
+        
+        if window and not limit_reached:
+            await process_window(window)
+        
+        checkpoint.found_users = found_commenters
+        if pending:
+            yield pending
+        
+        self.logger.info(f"📊 Channel parsing complete: {processed_messages} messages processed, {found_commenters} unique users found")
+        self.logger.info(f"👥 User resolution stats: {resolver.stats()}")
+    
+    @staticmethod
+    def _has_replies(message) -> bool:
+        """Whether a channel post has a non-empty comment thread."""
+        replies = getattr(message, 'replies', None)
+        return bool(replies and replies.replies and replies.replies > 0)
+    
+    async def _fetch_reply_senders(self, channel: Channel, message) -> Dict[int, Optional[User]]:
+        """
+        Fetch one comment thread and return its authors in reply order
+        (user_id -> User embedded in the reply, or None if Telethon did not provide one).
+        
+        A thread interrupted by FloodWait is fetched again through the bucket; after
+        REPLY_THREAD_FLOOD_RETRIES attempts FloodWaitError is raised, so the window is
+        not counted as processed and the checkpoint does not move past it.
+        """
+        senders: Dict[int, Optional[User]] = {}
+        if not self._has_replies(message):
+            return senders
+        
+        for attempt in range(1, REPLY_THREAD_FLOOD_RETRIES + 1):
+            try:
+                # One GetReplies request per thread, paced by the account token bucket
+                if self.api_rate_limiter:
+                    await self.api_rate_limiter.acquire()
                 
-                except FloodWaitError as e:
-                    self.logger.warning(f"FloodWait {e.seconds}s while getting replies for message {message.id}")
+                # Get comments/replies for this message
+                async for reply in self.client.iter_messages(
+                    channel, 
+                    reply_to=message.id,
+                    limit=50  # Limit comments per post
+                ):
+                    if reply.from_id and isinstance(reply.from_id, PeerUser):
+                        user_id = reply.from_id.user_id
+                        if user_id not in senders:
+                            senders[user_id] = TelegramUserResolver.sender_of(reply)
+                return senders
+            
+            except FloodWaitError as e:
+                self.logger.warning(f"FloodWait {e.seconds}s while getting replies for message {message.id} (attempt {attempt})")
+                if self.api_rate_limiter:
+                    # Pause every in-flight fetch of this account, not just this one
+                    self.api_rate_limiter.penalize(e.seconds + 1)
+                if attempt == REPLY_THREAD_FLOOD_RETRIES:
+                    raise
+                if not self.api_rate_limiter:
                     try:
                         await asyncio.sleep(e.seconds + 1)
                     except asyncio.CancelledError:
                         self.logger.warning(f"⚠️ FloodWait cancelled during {e.seconds}s wait for message {message.id}")
                         raise
-                except Exception as e:
-                    self.logger.debug(f"Could not get replies for message {message.id}: {e}")
-            
-            # Also collect message authors (if not anonymous channel)
-            if message.from_id and isinstance(message.from_id, PeerUser):
-                user_id = message.from_id.user_id
-                if user_id not in unique_users:
-                    try:
-                        user = await self.client.get_entity(message.from_id)
-                        user_data = await self._extract_user_data(task, user, channel, "author")
-                        unique_users[user_id] = user_data
-                        found_commenters += 1
-                        
-                        # 🔥 ПРОВЕРКА ЛИМИТА ПОЛЬЗОВАТЕЛЕЙ
-                        if found_commenters >= message_limit:
-                            self.logger.info(f"🛑 LIMIT REACHED: {found_commenters}/{message_limit} users found - STOPPING CHANNEL PARSING")
-                            channel_metadata = await self._extract_channel_metadata(task, channel)
-                            final_results = [channel_metadata] + list(unique_users.values())
-                            self.logger.info(f"✅ Returning {len(final_results)} results due to user limit")
-                            return final_results
-                        
-                    except Exception as e:
-                        self.logger.debug(f"Could not get author data for user {user_id}: {e}")
-            
-            if processed_messages % 50 == 0:
-                self.logger.info(f"Processed {processed_messages} messages, found {len(unique_users)} unique users...")
-        
-        # Add channel metadata as first result
-        channel_metadata = await self._extract_channel_metadata(task, channel)
+            except Exception as e:
+                self.logger.debug(f"Could not get replies for message {message.id}: {e}")
+                return senders
         
-        parsed_results = [channel_metadata] + list(unique_users.values())
-        self.logger.info(f"📊 Channel parsing complete: {processed_messages} messages processed, {len(unique_users)} unique users found")
-        return parsed_results
+        return senders
     
     async def _parse_group(self, task: ParseTask, chat: Chat, message_limit: int, progress_callback=None, speed_config=None):
         """Parse users from a Telegram group by collecting all participants."""
+        parsed_results = []
+        async for batch in self._iter_group_batches(task, chat, message_limit, progress_callback, speed_config):
+            parsed_results.extend(batch)
+        return parsed_results
+    
+    async def _iter_group_batches(
+        self,
+        task: ParseTask,
+        chat: Chat,
+        message_limit: int,
+        progress_callback=None,
+        speed_config=None,
+        checkpoint: Optional["ParseCheckpoint"] = None,
+        stream_batch_size: int = DEFAULT_STREAM_BATCH_SIZE
+    ) -> AsyncGenerator[List[Dict[str, Any]], None]:
+        """Yield users from a Telegram group (participants or message authors) in batches."""
         self.logger.info(f"👥 Parsing group users: {chat.title} (USER LIMIT: {message_limit} users)")
         
         # Apply speed configuration defaults if not provided
@@ -519,33 +749,46 @@ class TelegramAdapter(BasePlatformAdapter):
             batch_size = 25
             self.logger.info("⚡ Using default speed settings")
         
-        unique_users = {}  # user_id -> user_data
+        if checkpoint is None:
+            checkpoint = ParseCheckpoint()
+        
+        # Group metadata goes first so it is persisted with the first batch
+        if not checkpoint.metadata_saved:
+            group_metadata = await self._extract_group_metadata(task, chat)
+            checkpoint.metadata_saved = True
+            yield [group_metadata]
+        
+        seen_users = checkpoint.seen_user_ids
+        pending: List[Dict[str, Any]] = []
         request_count = 0  # Track requests for batch processing
+        resolver = TelegramUserResolver(self.client, rate_limiter=self.api_rate_limiter)
         
         # Parse group participants (primary focus)
-        participant_count = 0
+        participant_count = checkpoint.found_users
+        if participant_count >= message_limit:
+            return
+        
         try:
             async for participant in self.client.iter_participants(chat):
                 if isinstance(participant, User):
                     user_id = participant.id
                     
                     # Skip if we already have this user
-                    if user_id in unique_users:
+                    if user_id in seen_users:
                         continue
                     
                     try:
                         user_data = await self._extract_user_data(task, participant, chat, "participant")
-                        unique_users[user_id] = user_data
+                        seen_users.add(user_id)
+                        pending.append(user_data)
                         participant_count += 1
                         request_count += 1
+                        checkpoint.found_users = participant_count
                         
                         # 🔥 ПРОВЕРКА ЛИМИТА ПОЛЬЗОВАТЕЛЕЙ
                         if participant_count >= message_limit:
                             self.logger.info(f"🛑 LIMIT REACHED: {participant_count}/{message_limit} users found - STOPPING GROUP PARSING")
-                            group_metadata = await self._extract_group_metadata(task, chat)
-                            final_results = [group_metadata] + list(unique_users.values())
-                            self.logger.info(f"✅ Returning {len(final_results)} results due to user limit")
-                            return final_results
+                            break
                         
                         # Calculate progress update frequency (every 5% of message_limit)
                         progress_step = max(1, int(message_limit * 0.05))
@@ -576,6 +819,10 @@ class TelegramAdapter(BasePlatformAdapter):
                                             await asyncio.sleep(wait_sec)
                                 except Exception as rl_err:
                                     self.logger.debug(f"Rate-limit check failed (group batch): {rl_err}")
+                        
+                        if len(pending) >= stream_batch_size:
+                            yield pending
+                            pending = []
                     
                     except FloodWaitError as e:
                         self.logger.warning(f"FloodWait {e.seconds}s while processing participant {user_id}")
@@ -593,7 +840,44 @@ class TelegramAdapter(BasePlatformAdapter):
             # Fallback: collect users from recent messages
             self.logger.info("Fallback: collecting users from recent messages...")
             message_count = 0
-            async for message in self.client.iter_messages(chat, limit=message_limit):
+            
+            async def process_author_window(window: List[Message]):
+                """Resolve the authors of a message window in one GetUsers call, then collect them in order."""
+                nonlocal participant_count
+                authors: Dict[int, Optional[User]] = {}
+                for message in window:
+                    user_id = message.from_id.user_id
+                    if user_id not in seen_users and user_id not in authors:
+                        authors[user_id] = resolver.sender_of(message)
+                
+                # FloodWait is handled by the resolver (bucket paused, one retry)
+                resolved_users = await resolver.resolve(authors) if authors else {}
+                
+                for message in window:
+                    user_id = message.from_id.user_id
+                    if participant_count < message_limit and user_id not in seen_users:
+                        user = resolved_users.get(user_id)
+                        if user is None:
+                            self.logger.debug(f"Could not get message author data for user {user_id}: user could not be resolved")
+                        else:
+                            try:
+                                user_data = await self._extract_user_data(task, user, chat, "message_author")
+                                seen_users.add(user_id)
+                                pending.append(user_data)
+                                participant_count += 1
+                                
+                                # 🔥 ПРОВЕРКА ЛИМИТА ПОЛЬЗОВАТЕЛЕЙ
+                                if participant_count >= message_limit:
+                                    self.logger.info(f"🛑 LIMIT REACHED: {participant_count}/{message_limit} users found - STOPPING GROUP PARSING (fallback mode)")
+                            except Exception as e:
+                                self.logger.debug(f"Could not get message author data for user {user_id}: {e}")
+                    
+                    checkpoint.found_users = participant_count
+                    checkpoint.last_message_id = message.id
+            
+            # Authors missing from messages are resolved per window of up to 100 messages (one GetUsers)
+            window: List[Message] = []
+            async for message in self.client.iter_messages(chat, limit=message_limit, offset_id=checkpoint.last_message_id or 0):
                 if not isinstance(message, Message):
                     continue
                     
@@ -603,92 +887,76 @@ class TelegramAdapter(BasePlatformAdapter):
                     break
                     
                 message_count += 1
-                
-                # Get message author
                 if message.from_id and isinstance(message.from_id, PeerUser):
-                    user_id = message.from_id.user_id
-                    if user_id not in unique_users:
-                        try:
-                            user = await self.client.get_entity(message.from_id)
-                            user_data = await self._extract_user_data(task, user, chat, "message_author")
-                            unique_users[user_id] = user_data
-                            participant_count += 1
-                            
-                            # 🔥 ПРОВЕРКА ЛИМИТА ПОЛЬЗОВАТЕЛЕЙ
-                            if participant_count >= message_limit:
-                                self.logger.info(f"🛑 LIMIT REACHED: {participant_count}/{message_limit} users found - STOPPING GROUP PARSING (fallback mode)")
-                                group_metadata = await self._extract_group_metadata(task, chat)
-                                final_results = [group_metadata] + list(unique_users.values())
-                                self.logger.info(f"✅ Returning {len(final_results)} results due to user limit")
-                                return final_results
-                        except FloodWaitError as e:
-                            self.logger.warning(f"FloodWait {e.seconds}s while getting message author {user_id}")
-                            try:
-                                await asyncio.sleep(e.seconds + 1)
-                            except asyncio.CancelledError:
-                                self.logger.warning(f"⚠️ FloodWait cancelled during {e.seconds}s wait for message author {user_id}")
-                                raise
-                        except Exception as e:
-                            self.logger.debug(f"Could not get message author data for user {user_id}: {e}")
+                    window.append(message)
                 
                 if message_count % 100 == 0:
-                    self.logger.info(f"Processed {message_count} messages, found {len(unique_users)} unique users...")
+                    self.logger.info(f"Processed {message_count} messages, found {participant_count} unique users...")
+                
+                if len(window) >= GET_USERS_BATCH_LIMIT:
+                    await process_author_window(window)
+                    window = []
+                    if len(pending) >= stream_batch_size:
+                        yield pending
+                        pending = []
+            
+            if window and participant_count < message_limit:
+                await process_author_window(window)
         
-        # Add group metadata as first result
-        group_metadata = await self._extract_group_metadata(task, chat)
+        checkpoint.found_users = participant_count
+        if pending:
+            yield pending
         
-        parsed_results = [group_metadata] + list(unique_users.values())
-        self.logger.info(f"📊 Group parsing complete: {len(unique_users)} unique users found")
-        return parsed_results
+        self.logger.info(f"📊 Group parsing complete: {participant_count} unique users found")
+        if resolver.from_messages or resolver.api_calls:
+            self.logger.info(f"👥 User resolution stats: {resolver.stats()}")
     
-    async def _get_user_phone(self, user: User) -> Optional[str]:
-        """Get user's phone number if accessible."""
+    async def _get_known_phone(self, user: User):
+        """
+        Phone known without an API call: (phone, checked).
+        
+        checked=False means users.getFullUser is still needed - that is left to the
+        deferred phone enrichment stage (services.phone_enrichment).
+        """
+        if getattr(user, 'phone', None):
+            phone = f"+{user.phone}"
+            await self.user_profile_cache.put(build_user_profile(user, phone))
+            return phone, True
+        
+        cached = await self.user_profile_cache.get(user.id)
+        if cached and cached.get("phone_checked"):
+            return cached.get("phone"), True
+        return None, False
+    
+    async def fetch_user_phone(self, peer) -> Optional[str]:
+        """
+        users.getFullUser for one user (User, InputUser or username); the result is cached.
+        
+        FloodWaitError is re-raised after pausing the user bucket so the caller can stop.
+        """
+        if self.user_rate_limiter:
+            await self.user_rate_limiter.acquire()
         try:
-            # Check if phone is already available in user object
-            if hasattr(user, 'phone') and user.phone:
-                return f"+{user.phone}"
-            
-            # Try to get full user info (may fail due to privacy settings)
-            try:
-                full_user = await self.client(GetFullUserRequest(user))
-                if hasattr(full_user.user, 'phone') and full_user.user.phone:
-                    return f"+{full_user.user.phone}"
-            except FloodWaitError as e:
-                self.logger.warning(f"FloodWait {e.seconds}s while getting full user info for {user.id}")
-                try:
-                    await asyncio.sleep(e.seconds + 1)
-                    # Retry after FloodWait
-                    full_user = await self.client(GetFullUserRequest(user))
-                    if hasattr(full_user.user, 'phone') and full_user.user.phone:
-                        return f"+{full_user.user.phone}"
-                except asyncio.CancelledError:
-                    self.logger.warning(f"⚠️ FloodWait cancelled during {e.seconds}s wait for user {user.id}")
-                    return None
-                except Exception:
-                    self.logger.debug(f"Could not get phone after FloodWait retry for user {user.id}")
-                    return None
-            except Exception as full_user_error:
-                self.logger.debug(f"Could not get full user info for {user.id}: {full_user_error}")
-            
-            # Check if user has contact info in mutual contacts
-            try:
-                if hasattr(user, 'contact') and user.contact:
-                    return f"+{user.phone}" if user.phone else None
-            except Exception:
-                pass
-            
-            return None
-            
-        except Exception as e:
-            self.logger.debug(f"Could not get phone for user {user.id}: {e}")
-            return None
+            full = await self.client(GetFullUserRequest(peer))
+        except FloodWaitError as e:
+            self.logger.warning(f"FloodWait {e.seconds}s while getting full user info")
+            if self.user_rate_limiter:
+                self.user_rate_limiter.penalize(e.seconds + 1)
+            raise
+        
+        user = next((u for u in full.users if u.id == full.full_user.id), None)
+        phone = f"+{user.phone}" if user is not None and user.phone else None
+        if user is not None:
+            # Hidden phones are cached too - privacy settings rarely change within the TTL
+            await self.user_profile_cache.put(build_user_profile(user, phone))
+        return phone
     
     async def _extract_user_data(self, task: ParseTask, user: User, entity, user_type: str) -> Dict[str, Any]:
         """Extract user data from a Telegram user."""
         from datetime import datetime
         
-        # Get user's phone number
-        user_phone = await self._get_user_phone(user)
+        # Only phones available without an API call; the rest is backfilled by phone enrichment
+        user_phone, phone_checked = await self._get_known_phone(user)
         
         # Construct full name
         full_name = f"{user.first_name or ''} {user.last_name or ''}".strip()
@@ -712,6 +980,8 @@ class TelegramAdapter(BasePlatformAdapter):
         
         # Convert user.to_dict() and sanitize datetime objects
         raw_data = self._sanitize_datetime_objects(user.to_dict())
+        if self.current_account_id:
+            raw_data[ACCESS_HASH_ACCOUNT_KEY] = str(self.current_account_id)
         
         return {
             'task_id': task.id,
@@ -726,6 +996,7 @@ class TelegramAdapter(BasePlatformAdapter):
             'author_username': user.username,
             'author_name': full_name,
             'author_phone': user_phone,
+            'phone_checked_at': content_created_at if phone_checked else None,
             'content_created_at': content_created_at,
             'views_count': 0,
             'has_media': False,
@@ -956,30 +1227,24 @@ class TelegramAdapter(BasePlatformAdapter):
         """
         self.logger.info(f"🔍 Searching Telegram communities for query: '{query}' (offset={offset}, limit={limit})")
         
+        all_results = await self.collect_communities(query, progress_callback=progress_callback, speed_config=speed_config)
+        page = paginate_communities(all_results, offset, limit)
+        
+        self.logger.info(f"✅ Found {len(all_results)} total communities, returning {len(page['results'])} (has_more: {page['has_more']})")
+        return page
+    
+    async def collect_communities(self, query: str, progress_callback=None, speed_config=None) -> List[Dict[str, Any]]:
+        """
+        Run every search method over the query variations and return all matching
+        communities, deduplicated and sorted by member count (the cacheable result).
+        """
         if not self.client:
             raise Exception("Telegram client not authenticated")
         
-        # Apply speed configuration defaults if not provided
-        if speed_config:
-            search_delay = speed_config.message_delay  # Use message_delay for API requests
-            method_delay = speed_config.user_request_delay  # Delay between methods
-            batch_size = speed_config.batch_size
-            self.logger.info(f"⚡ Search speed: {search_delay}s API delay, {method_delay}s method delay, batch {batch_size}")
-        else:
-            # Default search speed settings (medium)
-            search_delay = 1.0  # 1 second between API requests
-            method_delay = 2.0  # 2 seconds between search methods
-            batch_size = 10
-            self.logger.info("⚡ Using default search speed settings")
+        # One token bucket per client paces every search request (no fixed delays)
+        self._configure_rate_limiters(speed_config)
         
         try:
-            from telethon.tl.functions.contacts import SearchRequest
-            from telethon.tl.functions.messages import SearchGlobalRequest
-            from telethon.tl.types import Channel, Chat
-            
-            results = []
-            search_results = []
-            
             # Generate search query variations for better results
             search_queries = [query]
             
@@ -994,10 +1259,17 @@ class TelegramAdapter(BasePlatformAdapter):
             for suffix in base_suffixes:
                 search_queries.append(f"{query}{suffix}")
             
-            self.logger.info(f"🔍 Searching with {len(search_queries)} query variations: {search_queries[:3]}...")
+            variants = search_queries[:5]  # Limit to avoid too many API calls
+            self.logger.info(f"🔍 Searching with {len(variants)} query variations: {variants[:3]}...")
+            
+            # Contacts and global search per variant; dialogs are scanned once for all variants
+            searches = {}
+            for search_query in variants:
+                searches[asyncio.ensure_future(self._search_global_channels_with_progress(search_query, progress_callback))] = ("contacts_search", search_query)
+                searches[asyncio.ensure_future(self._search_global_new_with_progress(search_query, progress_callback))] = ("global_search", search_query)
+            searches[asyncio.ensure_future(self._search_dialogs_with_progress(variants, progress_callback))] = ("dialogs_search", ", ".join(variants))
             
-            # Progress tracking setup
-            total_steps = min(len(search_queries), 5) * 3  # Max 5 queries * 3 search methods
+            total_steps = len(searches)
             current_step = 0
             
             # Update initial progress
@@ -1007,87 +1279,51 @@ class TelegramAdapter(BasePlatformAdapter):
                 except Exception as e:
                     self.logger.debug(f"Progress callback error: {e}")
             
-            # Try different search approaches to get more results
-            for search_index, search_query in enumerate(search_queries[:5]):  # Limit to avoid too many API calls
-                if search_index > 0:
-                    # Rate limiting between different queries
-                    self.logger.info(f"⏳ Pausing {search_delay}s before next query variation...")
-                    await asyncio.sleep(search_delay)
-                
-                search_methods = [
-                    # Method 1: Global search for channels
-                    ("contacts_search", self._search_global_channels_with_progress(search_query, progress_callback)),
-                    # Method 2: Search in dialogs  
-                    ("dialogs_search", self._search_dialogs_with_progress(search_query, progress_callback)),
-                    # Method 3: Global search (newer API)
-                    ("global_search", self._search_global_new_with_progress(search_query, progress_callback)),
-                ]
-                
-                for method_index, (method_name, search_method) in enumerate(search_methods):
-                    try:
+            # Merge results by entity id as each method finishes
+            unique_results = {}
+            pending = set(searches)
+            try:
+                while pending:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for finished in done:
+                        method_name, search_query = searches[finished]
                         current_step += 1
-                        self.logger.info(f"📡 Step {current_step}/{total_steps}: {method_name} for '{search_query}'")
+                        try:
+                            method_results = finished.result()
+                        except Exception as e:
+                            self.logger.debug(f"Search method {method_name} failed for '{search_query}': {e}")
+                            method_results = []
                         
-                        # Progress update before each method
+                        for result in method_results:
+                            key = result.get('platform_id') or result.get('username')
+                            if key and key not in unique_results:
+                                unique_results[key] = result
+                        
+                        self.logger.info(
+                            f"✅ Step {current_step}/{total_steps}: {method_name} for '{search_query}' "
+                            f"found {len(method_results)} results (total: {len(unique_results)})"
+                        )
                         if progress_callback:
                             try:
-                                await progress_callback(current_step - 1, total_steps)
+                                await progress_callback(current_step, total_steps)
                             except Exception as e:
                                 self.logger.debug(f"Progress callback error: {e}")
-                        
-                        method_results = await search_method
-                        search_results.extend(method_results)
-                        
-                        self.logger.info(f"✅ {method_name} found {len(method_results)} results (total: {len(search_results)})")
-                        
-                        # Rate limiting between search methods
-                        if method_index < len(search_methods) - 1:
-                            await asyncio.sleep(method_delay)
-                        
-                        # Break if we have enough results to avoid rate limiting
-                        if len(search_results) > 100:
-                            self.logger.info(f"🛑 Found enough results ({len(search_results)}), stopping search")
-                            break
-                            
-                    except FloodWaitError as e:
-                        self.logger.warning(f"⏳ FloodWait {e.seconds}s for {method_name} on '{search_query}'")
-                        try:
-                            # Protected FloodWait with progress updates
-                            wait_time = e.seconds + 1
-                            for wait_step in range(0, wait_time, 5):  # Update progress every 5 seconds
-                                remaining = wait_time - wait_step
-                                self.logger.info(f"⏳ FloodWait: {remaining}s remaining...")
-                                await asyncio.sleep(min(5, remaining))
-                        except asyncio.CancelledError:
-                            self.logger.warning(f"⚠️ FloodWait cancelled during {e.seconds}s wait")
-                            raise
-                    except Exception as e:
-                        self.logger.debug(f"Search method {method_name} failed for '{search_query}': {e}")
-                        continue
-                
-                # Break if we have enough results
-                if len(search_results) > 100:
-                    break
-            
-            # Processing results with progress
-            self.logger.info(f"🔄 Processing {len(search_results)} raw results...")
-            
-            # Remove duplicates by username/id
-            unique_results = {}
-            for result in search_results:
-                key = result.get('username') or result.get('platform_id')
-                if key and key not in unique_results:
-                    unique_results[key] = result
+                    
+                    # Stop early once there are enough results to avoid rate limiting
+                    if len(unique_results) > 100 and pending:
+                        self.logger.info(f"🛑 Found enough results ({len(unique_results)}), stopping search")
+                        break
+            finally:
+                for unfinished in pending:
+                    unfinished.cancel()
+                if pending:
+                    await asyncio.gather(*pending, return_exceptions=True)
             
             all_results = list(unique_results.values())
             
             # Sort by member count descending (largest first)
             all_results.sort(key=lambda x: x.get('members_count', 0), reverse=True)
             
-            # Apply pagination
-            paginated_results = all_results[offset:offset + limit]
-            has_more = len(all_results) > offset + limit
-            
             # Final progress update
             if progress_callback:
                 try:
@@ -1095,13 +1331,7 @@ class TelegramAdapter(BasePlatformAdapter):
                 except Exception as e:
                     self.logger.debug(f"Progress callback error: {e}")
             
-            self.logger.info(f"✅ Found {len(all_results)} total communities, returning {len(paginated_results)} (has_more: {has_more})")
-            
-            return {
-                'results': paginated_results,
-                'has_more': has_more,
-                'total_found': len(all_results)
-            }
+            return all_results
             
         except Exception as e:
             self.logger.error(f"❌ Failed to search Telegram communities: {e}")
@@ -1115,57 +1345,18 @@ class TelegramAdapter(BasePlatformAdapter):
             
             self.logger.info(f"📡 Contacts search starting for: '{query}'")
             
-            # Use contacts search for public entities with FloodWait protection
-            try:
-                search_result = await self.client(SearchRequest(
+            # Use contacts search for public entities; FloodWait retries go through the api bucket too
+            search_result = await self._paced_search_call(
+                lambda: self.client(SearchRequest(
                     q=query,
                     limit=200  # Increased from 50 to get more results
-                ))
-            except FloodWaitError as e:
-                self.logger.warning(f"⏳ FloodWait {e.seconds}s in contacts search for '{query}'")
-                try:
-                    wait_time = e.seconds + 1
-                    for wait_step in range(0, wait_time, 5):
-                        remaining = wait_time - wait_step
-                        self.logger.info(f"⏳ Contacts search FloodWait: {remaining}s remaining...")
-                        await asyncio.sleep(min(5, remaining))
-                    
-                    # Retry after FloodWait
-                    search_result = await self.client(SearchRequest(
-                        q=query,
-                        limit=200
-                    ))
-                except asyncio.CancelledError:
-                    self.logger.warning(f"⚠️ Contacts search FloodWait cancelled during {e.seconds}s wait")
-                    return []
-            
-            results = []
-            processed_chats = 0
-            total_chats = len(search_result.chats)
+                )),
+                f"contacts search for '{query}'"
+            )
             
-            self.logger.info(f"📊 Processing {total_chats} chats from contacts search")
+            self.logger.info(f"📊 Processing {len(search_result.chats)} chats from contacts search")
             
-            for chat in search_result.chats:
-                if isinstance(chat, (Channel, Chat)):
-                    try:
-                        community_data = await self._extract_community_data(chat)
-                        if community_data:
-                            results.append(community_data)
-                            processed_chats += 1
-                            
-                            if processed_chats % 5 == 0:  # Log every 5 processed
-                                self.logger.info(f"📈 Contacts search: processed {processed_chats}/{total_chats} communities")
-                    
-                    except FloodWaitError as e:
-                        self.logger.warning(f"⏳ FloodWait {e.seconds}s while extracting community data")
-                        try:
-                            await asyncio.sleep(e.seconds + 1)
-                        except asyncio.CancelledError:
-                            self.logger.warning(f"⚠️ Community extraction FloodWait cancelled")
-                            break
-                    except Exception as e:
-                        self.logger.debug(f"Failed to extract community data: {e}")
-                        continue
+            results = await self._extract_communities(search_result.chats, "Contacts search")
             
             self.logger.info(f"✅ Contacts search completed: {len(results)} valid communities found")
             return results
@@ -1178,16 +1369,22 @@ class TelegramAdapter(BasePlatformAdapter):
         """Search for global channels using SearchRequest (legacy method)."""
         return await self._search_global_channels_with_progress(query, None)
     
-    async def _search_dialogs_with_progress(self, query: str, progress_callback=None) -> List[Dict[str, Any]]:
-        """Search through user's dialogs for matching communities with progress tracking."""
+    async def _search_dialogs_with_progress(self, query: Union[str, List[str]], progress_callback=None) -> List[Dict[str, Any]]:
+        """
+        Search through user's dialogs for matching communities with progress tracking.
+        
+        `query` may be a list of query variants: dialogs are iterated once and an
+        entity matches if it matches any variant.
+        """
         try:
             from telethon.tl.types import Channel, Chat
             
-            results = []
-            query_lower = query.lower()
+            matched = []
+            queries = [query] if isinstance(query, str) else list(query)
+            queries_lower = [q.lower() for q in queries if q]
             processed_dialogs = 0
             
-            self.logger.info(f"📡 Dialog search starting for: '{query}'")
+            self.logger.info(f"📡 Dialog search starting for: {queries}")
             
             # Get user's dialogs and filter by query - increased limit
             try:
@@ -1196,49 +1393,37 @@ class TelegramAdapter(BasePlatformAdapter):
                     processed_dialogs += 1
                     
                     if isinstance(entity, (Channel, Chat)):
+                        # Only public communities go to the shared index, never the account's private chats
+                        if getattr(entity, 'username', None) and not getattr(entity, 'restricted', False):
+                            self.discovered_communities[str(entity.id)] = self._basic_community_data(entity)
+                        
                         # Check if title or username matches query
-                        title = getattr(entity, 'title', '').lower()
-                        username = getattr(entity, 'username', '').lower()
+                        title = (getattr(entity, 'title', None) or '').lower()
+                        username = (getattr(entity, 'username', None) or '').lower()
                         
-                        if (query_lower in title or 
-                            query_lower in username or
-                            (hasattr(entity, 'title') and any(word in title for word in query_lower.split()))):
-                            
-                            try:
-                                community_data = await self._extract_community_data(entity)
-                                if community_data:
-                                    results.append(community_data)
-                                    self.logger.info(f"🎯 Dialog match found: {title}")
-                            
-                            except FloodWaitError as e:
-                                self.logger.warning(f"⏳ FloodWait {e.seconds}s while processing dialog: {title}")
-                                try:
-                                    await asyncio.sleep(e.seconds + 1)
-                                    # Retry after FloodWait
-                                    community_data = await self._extract_community_data(entity)
-                                    if community_data:
-                                        results.append(community_data)
-                                except asyncio.CancelledError:
-                                    self.logger.warning(f"⚠️ Dialog processing FloodWait cancelled")
-                                    break
-                            except Exception as e:
-                                self.logger.debug(f"Failed to process dialog {title}: {e}")
-                                continue
+                        if any(query_lower in title or
+                               query_lower in username or
+                               any(word in title for word in query_lower.split())
+                               for query_lower in queries_lower):
+                            matched.append(entity)
+                            self.logger.info(f"🎯 Dialog match found: {title}")
                     
                     # Log progress every 50 dialogs
                     if processed_dialogs % 50 == 0:
-                        self.logger.info(f"📈 Dialog search: processed {processed_dialogs} dialogs, found {len(results)} matches")
+                        self.logger.info(f"📈 Dialog search: processed {processed_dialogs} dialogs, found {len(matched)} matches")
                         
                         # Small delay to avoid overwhelming API
                         await asyncio.sleep(0.1)
             
             except FloodWaitError as e:
                 self.logger.warning(f"⏳ FloodWait {e.seconds}s during dialog iteration")
+                self._penalize_search(e.seconds + 1)
                 try:
                     await asyncio.sleep(e.seconds + 1)
                 except asyncio.CancelledError:
                     self.logger.warning(f"⚠️ Dialog iteration FloodWait cancelled")
             
+            results = await self._extract_communities(matched, "Dialog search")
             self.logger.info(f"✅ Dialog search completed: {len(results)} matches found from {processed_dialogs} dialogs")
             return results
             
@@ -1258,9 +1443,9 @@ class TelegramAdapter(BasePlatformAdapter):
             
             self.logger.info(f"📡 Global search starting for: '{query}'")
             
-            # Use global search with FloodWait protection
-            try:
-                search_result = await self.client(SearchGlobalRequest(
+            # Use global search; FloodWait retries go through the api bucket too
+            search_result = await self._paced_search_call(
+                lambda: self.client(SearchGlobalRequest(
                     q=query,
                     filter=InputMessagesFilterEmpty(),  # No filter, get all types
                     min_date=None,
@@ -1269,64 +1454,13 @@ class TelegramAdapter(BasePlatformAdapter):
                     offset_peer=None,
                     offset_id=0,
                     limit=100
-                ))
-            except FloodWaitError as e:
-                self.logger.warning(f"⏳ FloodWait {e.seconds}s in global search for '{query}'")
-                try:
-                    wait_time = e.seconds + 1
-                    for wait_step in range(0, wait_time, 5):
-                        remaining = wait_time - wait_step
-                        self.logger.info(f"⏳ Global search FloodWait: {remaining}s remaining...")
-                        await asyncio.sleep(min(5, remaining))
-                    
-                    # Retry after FloodWait
-                    search_result = await self.client(SearchGlobalRequest(
-                        q=query,
-                        filter=InputMessagesFilterEmpty(),
-                        min_date=None,
-                        max_date=None,
-                        offset_rate=0,
-                        offset_peer=None,
-                        offset_id=0,
-                        limit=100
-                    ))
-                except asyncio.CancelledError:
-                    self.logger.warning(f"⚠️ Global search FloodWait cancelled during {e.seconds}s wait")
-                    return []
-            
-            results = []
-            processed_chats = 0
-            total_chats = len(search_result.chats)
+                )),
+                f"global search for '{query}'"
+            )
             
-            self.logger.info(f"📊 Processing {total_chats} chats from global search")
+            self.logger.info(f"📊 Processing {len(search_result.chats)} chats from global search")
             
-            # Process found chats
-            for chat in search_result.chats:
-                if isinstance(chat, (Channel, Chat)):
-                    try:
-                        community_data = await self._extract_community_data(chat)
-                        if community_data:
-                            results.append(community_data)
-                            processed_chats += 1
-                            
-                            if processed_chats % 5 == 0:  # Log every 5 processed
-                                self.logger.info(f"📈 Global search: processed {processed_chats}/{total_chats} communities")
-                    
-                    except FloodWaitError as e:
-                        self.logger.warning(f"⏳ FloodWait {e.seconds}s while extracting global community data")
-                        try:
-                            await asyncio.sleep(e.seconds + 1)
-                            # Retry after FloodWait
-                            community_data = await self._extract_community_data(chat)
-                            if community_data:
-                                results.append(community_data)
-                                processed_chats += 1
-                        except asyncio.CancelledError:
-                            self.logger.warning(f"⚠️ Global community extraction FloodWait cancelled")
-                            break
-                    except Exception as e:
-                        self.logger.debug(f"Failed to extract global community data: {e}")
-                        continue
+            results = await self._extract_communities(search_result.chats, "Global search")
             
             self.logger.info(f"✅ Global search completed: {len(results)} valid communities found")
             return results
@@ -1342,22 +1476,11 @@ class TelegramAdapter(BasePlatformAdapter):
     def _generate_transliterations(self, query: str) -> List[str]:
         """Generate transliteration variations for Cyrillic text."""
         try:
-            # Basic cyrillic to latin mapping for common letters
-            cyrillic_to_latin = {
-                'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'д': 'd', 'е': 'e', 'ё': 'e',
-                'ж': 'zh', 'з': 'z', 'и': 'i', 'й': 'y', 'к': 'k', 'л': 'l', 'м': 'm',
-                'н': 'n', 'о': 'o', 'п': 'p', 'р': 'r', 'с': 's', 'т': 't', 'у': 'u',
-                'ф': 'f', 'х': 'h', 'ц': 'ts', 'ч': 'ch', 'ш': 'sh', 'щ': 'sch',
-                'ъ': '', 'ы': 'y', 'ь': '', 'э': 'e', 'ю': 'yu', 'я': 'ya'
-            }
-            
             transliterations = []
             query_lower = query.lower()
             
             # Full transliteration
-            transliterated = ''
-            for char in query_lower:
-                transliterated += cyrillic_to_latin.get(char, char)
+            transliterated = transliterate(query_lower)
             
             if transliterated != query_lower:
                 transliterations.append(transliterated)
@@ -1405,16 +1528,26 @@ class TelegramAdapter(BasePlatformAdapter):
             if not is_broadcast:
                 return True  # Не broadcast канал - ОК
             
+            # Вердикт уже известен - без запросов к API
+            cached = await self.comments_probe_cache.get(entity.id)
+            if cached is not None:
+                return bool(cached.get('has_comments'))
+            
             # Для broadcast каналов проверяем реальные комментарии
             title = getattr(entity, 'title', 'Unknown')
             self.logger.debug(f"🔍 Проверяем комментарии в broadcast канале: {title}")
             
-            comments_found = 0
-            messages_checked = 0
             max_messages_to_check = 15  # Проверяем последние 15 сообщений
             
-            # Проверяем последние сообщения канала
-            async for message in self.client.iter_messages(entity, limit=max_messages_to_check):
+            # Последние сообщения канала - один messages.getHistory через api bucket
+            messages = await self._paced_search_call(
+                lambda: self.client.get_messages(entity, limit=max_messages_to_check),
+                f"comments probe of {title}"
+            )
+            
+            comments_found = 0
+            messages_checked = 0
+            for message in messages:
                 if not isinstance(message, Message):
                     continue
                 
@@ -1428,20 +1561,70 @@ class TelegramAdapter(BasePlatformAdapter):
                     # Если нашли хотя бы 1 комментарий - канал подходит
                     if comments_found >= 1:
                         self.logger.debug(f"✅ Канал {title} ПОДХОДИТ - найден {comments_found} комментарий из {messages_checked} сообщений")
+                        await self.comments_probe_cache.put(entity.id, True, messages_checked, comments_found)
                         return True
-                
-                # Небольшая задержка для избежания флуда
-                await asyncio.sleep(0.1)
             
             # Если проверили все сообщения и не нашли комментариев
             self.logger.debug(f"❌ Канал {title} НЕ ПОДХОДИТ - 0 комментариев из {messages_checked} сообщений")
+            await self.comments_probe_cache.put(entity.id, False, messages_checked, comments_found)
             return False
             
+        except FloodWaitError:
+            # Канал не проверен, а не «без комментариев» - решает вызывающий код
+            raise
         except Exception as e:
             # При ошибке проверки - исключаем канал из результатов (безопаснее)
             self.logger.debug(f"❌ Ошибка проверки комментариев: {e}")
             return False
 
+    async def _extract_communities(self, entities, label: str) -> List[Dict[str, Any]]:
+        """
+        _extract_community_data for search hits, COMMUNITY_EXTRACT_CONCURRENCY at a time.
+        
+        Channels with a cached has-comments verdict skip the probe entirely.
+        """
+        from telethon.tl.types import Channel, Chat
+        
+        candidates = [entity for entity in entities if isinstance(entity, (Channel, Chat))]
+        semaphore = asyncio.Semaphore(COMMUNITY_EXTRACT_CONCURRENCY)
+        processed = 0
+        
+        async def extract(entity):
+            nonlocal processed
+            async with semaphore:
+                community_data = await self._extract_community_data(entity)
+            if community_data:
+                processed += 1
+                if processed % 5 == 0:  # Log every 5 processed
+                    self.logger.info(f"📈 {label}: processed {processed}/{len(candidates)} communities")
+            return community_data
+        
+        extracted = await asyncio.gather(*(extract(entity) for entity in candidates))
+        return [community_data for community_data in extracted if community_data]
+    
+    def _basic_community_data(self, entity) -> Dict[str, Any]:
+        """Community data available without API calls (has_comments unknown for broadcast channels)."""
+        username = getattr(entity, 'username', None)
+        is_megagroup = getattr(entity, 'megagroup', False)
+        is_channel = isinstance(entity, Channel)
+        return {
+            'platform': 'telegram',
+            'platform_id': str(entity.id),
+            'title': getattr(entity, 'title', 'Unnamed'),
+            'username': username,
+            'description': None,
+            'members_count': getattr(entity, 'participants_count', None) or 0,
+            'link': f"https://t.me/{username}" if username else f"https://t.me/c/{entity.id}",
+            'platform_specific_data': {
+                'entity_type': 'channel' if is_channel else 'group',
+                'is_megagroup': is_megagroup,
+                'is_broadcast': getattr(entity, 'broadcast', False),
+                'verified': getattr(entity, 'verified', False),
+                'restricted': getattr(entity, 'restricted', False),
+                'has_comments': True if (not is_channel or is_megagroup) else None
+            }
+        }
+    
     async def _extract_community_data(self, entity) -> Optional[Dict[str, Any]]:
         """Extract community data from Telegram entity with STRICT filtering for channels with comments."""
         try:
@@ -1476,10 +1659,13 @@ class TelegramAdapter(BasePlatformAdapter):
                     self.logger.debug(f"❌ Пропускаем канал {title} - нет активных комментариев")
                     return None
                 
+                full_channel = None
                 if is_broadcast and not is_megagroup:
                     # Broadcast канал - дополнительная проверка настроек
                     try:
-                        full_channel = await self.client(GetFullChannelRequest(entity))
+                        full_channel = await self._paced_search_call(
+                            lambda: self.client(GetFullChannelRequest(entity)), f"full channel info of {title}"
+                        )
                         
                         # Check multiple ways for comments:
                         # 1. Has linked discussion group
@@ -1495,6 +1681,8 @@ class TelegramAdapter(BasePlatformAdapter):
                         
                         self.logger.debug(f"✅ Broadcast channel {title} has comments enabled")
                         
+                    except FloodWaitError:
+                        raise
                     except Exception as e:
                         # If we can't check comments settings, rely on real comment check above
                         self.logger.debug(f"Warning: couldn't check comment settings for {title}: {e}")
@@ -1506,11 +1694,16 @@ class TelegramAdapter(BasePlatformAdapter):
                     self.logger.debug(f"Skipping unknown channel type: {title}")
                     return None
                 
-                # Get detailed channel info
+                # Get detailed channel info (reuse the settings request for broadcast channels)
                 try:
-                    full_channel = await self.client(GetFullChannelRequest(entity))
+                    if full_channel is None:
+                        full_channel = await self._paced_search_call(
+                            lambda: self.client(GetFullChannelRequest(entity)), f"full channel info of {title}"
+                        )
                     participants_count = getattr(full_channel.full_chat, 'participants_count', 0)
                     about = getattr(full_channel.full_chat, 'about', '')
+                except FloodWaitError:
+                    raise
                 except:
                     participants_count = 0
                     about = ''
@@ -1529,10 +1722,14 @@ class TelegramAdapter(BasePlatformAdapter):
                 
                 # Get detailed chat info
                 try:
-                    full_chat = await self.client(GetFullChatRequest(entity.id))
+                    full_chat = await self._paced_search_call(
+                        lambda: self.client(GetFullChatRequest(entity.id)), f"full chat info of {title}"
+                    )
                     participants_count = getattr(full_chat.full_chat, 'participants_count', 0)
                     about = getattr(full_chat.full_chat, 'about', '')
                     self.logger.debug(f"✅ Found open group: {title} ({participants_count} members)")
+                except FloodWaitError:
+                    raise
                 except:
                     participants_count = getattr(entity, 'participants_count', 0)
                     about = ''
@@ -1571,6 +1768,10 @@ class TelegramAdapter(BasePlatformAdapter):
             self.logger.debug(f"✅ Found valid community: {title} (@{username}) - {participants_count} members")
             return community_data
             
+        except FloodWaitError as e:
+            # Retries are exhausted: the community is dropped visibly, not as "no comments"
+            self.logger.warning(f"⚠️ Community {getattr(entity, 'id', None)} skipped after repeated FloodWait {e.seconds}s")
+            return None
         except Exception as e:
             self.logger.debug(f"Failed to extract community data: {e}")
             return None 
\ No newline at end of file
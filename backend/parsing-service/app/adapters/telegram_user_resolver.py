@@ -0,0 +1,124 @@
+"""
+Batched Telegram user resolution for channel/group parsing.
+
+Users are taken from the `User` objects Telethon already attaches to
+messages (message.sender / reply.sender). Only misses go to the API,
+coalesced into users.GetUsers calls of up to 100 ids each.
+"""
+
+import asyncio
+import logging
+from typing import Dict, List, Optional
+
+from telethon import TelegramClient
+from telethon.tl.types import User, PeerUser
+from telethon.tl.functions.users import GetUsersRequest
+from telethon.errors import FloodWaitError
+
+from ..core.rate_limiter import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# users.getUsers accepts at most 100 ids per call
+GET_USERS_BATCH_LIMIT = 100
+
+
+class TelegramUserResolver:
+    """Resolve user ids to `User` objects with as few MTProto calls as possible."""
+
+    def __init__(
+        self,
+        client: TelegramClient,
+        batch_limit: int = GET_USERS_BATCH_LIMIT,
+        rate_limiter: Optional[TokenBucket] = None
+    ):
+        self.client = client
+        self.rate_limiter = rate_limiter
+        self.batch_limit = max(1, min(batch_limit, GET_USERS_BATCH_LIMIT))
+        self.from_messages = 0
+        self.from_api = 0
+        self.api_calls = 0
+        self.unresolved = 0
+
+    @staticmethod
+    def sender_of(message) -> Optional[User]:
+        """Return the User already embedded in a message, if Telethon provided one."""
+        sender = getattr(message, 'sender', None)
+        return sender if isinstance(sender, User) else None
+
+    async def resolve(self, users: Dict[int, Optional[User]]) -> Dict[int, User]:
+        """
+        Resolve user ids to User objects.
+
+        Args:
+            users: user_id -> User already known from a message, or None if missing
+
+        Returns:
+            user_id -> User for every id that could be resolved
+        """
+        resolved: Dict[int, User] = {}
+        misses: List[int] = []
+
+        for user_id, user in users.items():
+            if isinstance(user, User):
+                resolved[user_id] = user
+                self.from_messages += 1
+            else:
+                misses.append(user_id)
+
+        for start in range(0, len(misses), self.batch_limit):
+            chunk = misses[start:start + self.batch_limit]
+            fetched = await self._fetch_users(chunk)
+            resolved.update(fetched)
+            self.from_api += len(fetched)
+            self.unresolved += len(chunk) - len(fetched)
+
+        return resolved
+
+    async def _fetch_users(self, user_ids: List[int]) -> Dict[int, User]:
+        """Fetch up to batch_limit users in a single users.GetUsers call."""
+        input_users = []
+        for user_id in user_ids:
+            try:
+                # Served from the session entity cache filled by iter_messages
+                input_users.append(await self.client.get_input_entity(PeerUser(user_id)))
+            except Exception as e:
+                logger.debug(f"No access hash for user {user_id}: {e}")
+
+        if not input_users:
+            return {}
+
+        try:
+            if self.rate_limiter:
+                await self.rate_limiter.acquire()
+            self.api_calls += 1
+            users = await self.client(GetUsersRequest(id=input_users))
+        except FloodWaitError as e:
+            logger.warning(f"FloodWait {e.seconds}s while resolving {len(input_users)} users - pausing...")
+            if self.rate_limiter:
+                # The retry waits out the penalty in the bucket like every other request
+                self.rate_limiter.penalize(e.seconds + 1)
+            else:
+                await asyncio.sleep(e.seconds + 1)
+            try:
+                if self.rate_limiter:
+                    await self.rate_limiter.acquire()
+                self.api_calls += 1
+                users = await self.client(GetUsersRequest(id=input_users))
+            except Exception as retry_error:
+                logger.debug(f"GetUsers retry failed for {len(input_users)} users: {retry_error}")
+                return {}
+        except Exception as e:
+            logger.debug(f"GetUsers failed for {len(input_users)} users: {e}")
+            return {}
+
+        return {user.id: user for user in users if isinstance(user, User)}
+
+    def stats(self) -> Dict[str, int]:
+        """Resolution counters for logging."""
+        return {
+            'from_messages': self.from_messages,
+            'from_api': self.from_api,
+            'api_calls': self.api_calls,
+            'unresolved': self.unresolved
+        }
@@ -6,11 +6,11 @@ from typing import List, Dict, Any, Optional
 
 from fastapi import APIRouter, HTTPException, Depends, Request
 from pydantic import BaseModel, Field
-from sqlalchemy import select, func, or_
+from sqlalchemy import select, func
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import get_db
-from app.models.parse_result import ParseResult
+from app.models.parse_result import ParseResult, SEARCH_TS_CONFIG
 from app.models.parse_task import ParseTask
 from app.core.auth import get_user_id_from_request
 from app.core.config import Platform
@@ -60,9 +60,10 @@ async def get_telegram_snippets_for_topic(
     - Фильтрация:
       - platform = telegram
       - content_text is not null
-      - простое тематическое совпадение по ключевым словам темы
+      - полнотекстовое совпадение по ключевым словам темы (search_vector, стемминг ru/en)
       - engagement (views/likes/comments/reactions) >= порогов
-    - Сортировка: по engagement_total и дате по убыванию.
+    - Сортировка: релевантность × log(engagement_total), затем просмотры и дата.
+      Без ключевых слов - по engagement_total.
     """
     user_id = await get_user_id_from_request(request)
 
@@ -78,12 +79,8 @@ async def get_telegram_snippets_for_topic(
     keywords = list({w for w in words if len(w) > 3})[:8]  # ограничим до 8 ключевых слов
 
     # Базовый запрос по результатам этого пользователя и платформе Telegram.
-    engagement_total = (
-        ParseResult.likes_count
-        + ParseResult.shares_count
-        + ParseResult.comments_count
-        + ParseResult.reactions_count
-    )
+    # engagement_total - генерируемая (stored) колонка с индексом
+    engagement_total = ParseResult.engagement_total
 
     query = (
         select(ParseResult)
@@ -101,15 +98,16 @@ async def get_telegram_snippets_for_topic(
     if payload.min_engagement > 0:
         query = query.where(engagement_total >= payload.min_engagement)
 
-    # Тематический фильтр по ключевым словам (ILIKE по тексту и хэштегам).
+    # Тематический фильтр: любое из ключевых слов по GIN-индексу search_vector.
+    # \w+ не содержит операторов tsquery (& | ! : * скобки), экранирование не нужно.
     if keywords:
-        like_clauses = []
-        for kw in keywords:
-            pattern = f"%{kw}%"
-            like_clauses.append(ParseResult.content_text.ilike(pattern))
-        query = query.where(or_(*like_clauses))
+        ts_query = func.to_tsquery(SEARCH_TS_CONFIG, " | ".join(keywords))
+        relevance = func.ts_rank_cd(ParseResult.search_vector, ts_query)
+        query = query.where(ParseResult.search_vector.op("@@")(ts_query)).order_by(
+            (relevance * func.ln(engagement_total + 2)).desc()
+        )
 
-    # Сортируем по engagement и дате.
+    # Затем (или только) по engagement и дате.
     query = (
         query.order_by(engagement_total.desc(), ParseResult.views_count.desc(), ParseResult.created_at.desc())
         .limit(payload.limit)
@@ -123,12 +121,7 @@ async def get_telegram_snippets_for_topic(
         if not text:
             continue
 
-        total_eng = int(
-            (r.likes_count or 0)
-            + (r.shares_count or 0)
-            + (r.comments_count or 0)
-            + (r.reactions_count or 0)
-        )
+        total_eng = int(r.engagement_total or 0)
 
         items.append(
             TelegramSnippet(
@@ -5,9 +5,6 @@ from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
 from typing import List, Optional
-import json
-import csv
-import io
 import logging
 import traceback
 
@@ -15,6 +12,10 @@ from app.database import get_db
 from app.models.parse_result import ParseResult
 from app.models.parse_task import ParseTask
 from app.core.auth import get_user_id_from_request
+from app.services.result_export import (
+    STREAMING_FORMATS, COLUMNAR_FORMATS, export_headers, columnar_export_headers,
+    has_results, stream_export, stream_columnar_export
+)
 
 router = APIRouter()
 
@@ -30,9 +31,8 @@ async def list_results(
     
     # Build base query with JOIN to ParseTask
     query = select(ParseResult).join(ParseTask, ParseResult.task_id == ParseTask.id)
-    count_query = select(func.count(ParseResult.id)).select_from(
-        ParseResult.__table__.join(ParseTask.__table__, ParseResult.task_id == ParseTask.id)
-    )
+    # Without a platform filter the total is the sum of per-task counters
+    count_query = select(func.coalesce(func.sum(ParseTask.result_count), 0))
     
     # Apply user filter
     if user_id is not None:
@@ -42,7 +42,7 @@ async def list_results(
     # Apply platform filter
     if platform:
         query = query.where(ParseResult.platform == platform)
-        count_query = count_query.where(ParseResult.platform == platform)
+        count_query = select(func.count()).select_from(query.subquery())
     
     # Get total count
     total_result = await db.execute(count_query)
@@ -67,142 +67,118 @@ async def list_results(
         }
     }
 
+def _extract_target_url(config: Optional[dict]) -> str:
+    """Target of a task from its config - supports both `targets` (list) and `target` formats."""
+    config = config or {}
+    
+    # Новый формат: targets (массив)
+    if config.get('targets'):
+        targets = config['targets']
+        return targets[0] if isinstance(targets, list) and targets else str(targets)
+    
+    # Старый формат: target (одиночное поле)
+    if config.get('target'):
+        return str(config['target'])
+    
+    # Fallback: любой URL-подобный паттерн в config
+    for value in config.values():
+        if isinstance(value, str) and ('t.me/' in value or '@' in value):
+            return value
+    
+    return 'Unknown'
+
+
 @router.get("/grouped")
 async def list_results_grouped_by_task(
     request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="Tasks per page (all tasks if not set)"),
+    offset: int = Query(0, ge=0, description="Offset for pagination"),
     db: AsyncSession = Depends(get_db)
 ):
-    """List parsing results grouped by tasks for user."""
+    """
+    List parsing results grouped by tasks for user (one query per page).
+    Without `limit` all tasks are returned, as existing callers expect.
+    """
     
     logger = logging.getLogger(__name__)
-    logger.info("🔍 DIAGNOSTIC: Starting /grouped endpoint")
     
     # ✅ JWT АВТОРИЗАЦИЯ: Получаем user_id из JWT токена  
     try:
-        logger.info("🔍 DIAGNOSTIC: Starting JWT authentication")
         user_id = await get_user_id_from_request(request)
-        logger.info(f"🔐 JWT Authorization successful for grouped endpoint: user_id={user_id}")
+        logger.debug(f"🔐 JWT Authorization successful for grouped endpoint: user_id={user_id}")
     except Exception as auth_error:
         logger.error(f"❌ JWT Authorization failed for grouped endpoint: {auth_error}")
-        logger.error(f"❌ DIAGNOSTIC: Full auth traceback: {traceback.format_exc()}")
         raise HTTPException(status_code=401, detail=f"Authorization failed: {str(auth_error)}")
     
     try:
-        logger.info(f"🔍 DIAGNOSTIC: Building SQL query for user_id={user_id}")
-        
-        # Query to get task summaries with result counts (без config в GROUP BY)
+        # Tasks, their config and the total number of tasks (window) in one round trip
         query = select(
-            ParseTask.id,
             ParseTask.task_id,
             ParseTask.title,
             ParseTask.platform,
             ParseTask.status,
             ParseTask.created_at,
-            func.count(ParseResult.id).label('total_results')
-        ).outerjoin(
-            ParseResult, ParseTask.id == ParseResult.task_id
-        ).group_by(
-            ParseTask.id, ParseTask.task_id, ParseTask.title, 
-            ParseTask.platform, ParseTask.status, ParseTask.created_at
-        )
+            ParseTask.config,
+            ParseTask.result_count,
+            ParseTask.results_with_username,
+            ParseTask.results_with_phone,
+            ParseTask.last_result_at,
+            func.count().over().label('total_tasks')
+        ).where(
+            ParseTask.user_id == user_id
+        ).order_by(
+            ParseTask.created_at.desc(), ParseTask.id.desc()
+        ).offset(offset)
+        if limit is not None:
+            query = query.limit(limit)
         
-        logger.info("🔍 DIAGNOSTIC: Query built successfully")
+        tasks = (await db.execute(query)).all()
         
-        # Apply user filter from JWT token
-        query = query.where(ParseTask.user_id == user_id)
-        logger.info(f"🔍 DIAGNOSTIC: User filter applied for user_id={user_id}")
-        
-        # Order by creation date
-        query = query.order_by(ParseTask.created_at.desc())
-        logger.info("🔍 DIAGNOSTIC: Query ordering applied")
-        
-        logger.info("🔍 DIAGNOSTIC: Executing database query...")
-        result = await db.execute(query)
-        logger.info("🔍 DIAGNOSTIC: Database query executed successfully")
-        
-        tasks = result.all()
-        logger.info(f"🔍 DIAGNOSTIC: Found {len(tasks)} tasks in database")
+        formatted_tasks = [
+            {
+                "task_id": task.task_id,
+                "platform": task.platform.value if hasattr(task.platform, 'value') else str(task.platform),
+                "target_url": _extract_target_url(task.config),
+                "title": task.title,
+                "status": task.status.value if hasattr(task.status, 'value') else str(task.status),
+                "total_results": task.result_count or 0,
+                "results_with_username": task.results_with_username or 0,
+                "results_with_phone": task.results_with_phone or 0,
+                "last_result_at": task.last_result_at.isoformat() if task.last_result_at else None,
+                "created_at": task.created_at.isoformat() if task.created_at else None
+            }
+            for task in tasks
+        ]
         
-        # Получаем config для каждой задачи отдельно
-        formatted_tasks = []
-        for i, task in enumerate(tasks):
-            try:
-                logger.debug(f"🔍 DIAGNOSTIC: Processing task {i+1}/{len(tasks)}: {task.task_id}")
-                
-                # Получаем config отдельным запросом
-                config_query = select(ParseTask.config).where(ParseTask.id == task.id)
-                config_result = await db.execute(config_query)
-                config = config_result.scalar() or {}
-                
-                # 🔍 ДИАГНОСТИКА: логируем реальное содержимое config
-                logger.debug(f"🔍 DIAGNOSTIC: Task {task.task_id} config: {config}")
-                
-                # Extract target info from config - поддержка обоих форматов
-                target_url = 'Unknown'
-                
-                # Проверяем новый формат: targets (массив)
-                if 'targets' in config and config['targets']:
-                    targets = config['targets']
-                    target_url = targets[0] if isinstance(targets, list) and targets else str(targets)
-                    logger.debug(f"🔍 DIAGNOSTIC: Found targets array: {targets}, using: {target_url}")
-                
-                # Проверяем старый формат: target (одиночное поле)
-                elif 'target' in config and config['target']:
-                    target_url = str(config['target'])
-                    logger.debug(f"🔍 DIAGNOSTIC: Found single target: {target_url}")
-                
-                # Fallback: пытаемся найти любой URL-подобный паттерн в config
-                else:
-                    logger.warning(f"🔍 DIAGNOSTIC: No target/targets found in config: {config}")
-                    for key, value in config.items():
-                        if isinstance(value, str) and ('t.me/' in value or '@' in value):
-                            target_url = value
-                            logger.debug(f"🔍 DIAGNOSTIC: Found URL-like value in {key}: {target_url}")
-                            break
-                
-                logger.debug(f"🔍 DIAGNOSTIC: Final target_url for task {task.task_id}: {target_url}")
-                
-                formatted_task = {
-                    "task_id": task.task_id,
-                    "platform": task.platform.value if hasattr(task.platform, 'value') else str(task.platform),
-                    "target_url": target_url,
-                    "title": task.title,
-                    "status": task.status.value if hasattr(task.status, 'value') else str(task.status),
-                    "total_results": task.total_results,
-                    "created_at": task.created_at.isoformat() if task.created_at else None
-                }
-                
-                formatted_tasks.append(formatted_task)
-                logger.debug(f"🔍 DIAGNOSTIC: Task {i+1} formatted successfully")
-                
-            except Exception as task_error:
-                logger.error(f"❌ DIAGNOSTIC: Error processing task {i+1}: {task_error}")
-                logger.error(f"❌ DIAGNOSTIC: Task data: {task}")
-                logger.error(f"❌ DIAGNOSTIC: Task processing traceback: {traceback.format_exc()}")
+        if tasks:
+            total_tasks = tasks[0].total_tasks
+        elif offset:
+            # Page past the end: the window count is not available, count separately
+            total_tasks = (await db.execute(
+                select(func.count(ParseTask.id)).where(ParseTask.user_id == user_id)
+            )).scalar() or 0
+        else:
+            total_tasks = 0
         
-        response_data = {
+        logger.info(f"📊 Grouped results for user {user_id}: {len(formatted_tasks)}/{total_tasks} tasks (offset {offset})")
+        return {
             "tasks": formatted_tasks,
-            "total_tasks": len(formatted_tasks),
+            "total_tasks": total_tasks,
+            "limit": limit,
+            "offset": offset,
             "user_id": user_id  # Для отладки
         }
         
-        logger.info(f"🔍 DIAGNOSTIC: Returning {len(formatted_tasks)} formatted tasks")
-        return response_data
-        
     except Exception as e:
-        logger.error(f"❌ DIAGNOSTIC: Critical error in /grouped endpoint: {e}")
-        logger.error(f"❌ DIAGNOSTIC: Full traceback: {traceback.format_exc()}")
-        logger.error(f"❌ DIAGNOSTIC: Request headers: {dict(request.headers)}")
-        logger.error(f"❌ DIAGNOSTIC: User ID: {user_id if 'user_id' in locals() else 'NOT_SET'}")
-        
-        # Возвращаем детальную ошибку для диагностики
+        logger.error(f"❌ Error in /grouped endpoint for user {user_id}: {e}")
+        logger.error(traceback.format_exc())
         raise HTTPException(
             status_code=500, 
             detail={
                 "error": "internal_server_error",
                 "message": f"Database query failed: {str(e)}",
                 "details": str(e),
-                "user_id": user_id if 'user_id' in locals() else None
+                "user_id": user_id
             }
         )
 
@@ -220,24 +196,28 @@ async def get_result(
     
     # Build query with user verification
     query = select(ParseResult).join(ParseTask, ParseResult.task_id == ParseTask.id)
+    count_query = select(ParseTask.result_count)
     
     # Filter by task_id (string or int)
     try:
         task_id_int = int(task_id)
         query = query.where(ParseTask.id == task_id_int)
+        count_query = count_query.where(ParseTask.id == task_id_int)
     except ValueError:
         query = query.where(ParseTask.task_id == task_id)
+        count_query = count_query.where(ParseTask.task_id == task_id)
     
     # Apply user filter for security
     if user_id is not None:
         query = query.where(ParseTask.user_id == user_id)
+        count_query = count_query.where(ParseTask.user_id == user_id)
     
-    # Apply platform filter
+    # Apply platform filter (the task counter is not per platform - count rows)
     if platform_filter:
         query = query.where(ParseResult.platform == platform_filter)
+        count_query = select(func.count()).select_from(query.subquery())
     
     # Get total count
-    count_query = select(func.count()).select_from(query.subquery())
     total_result = await db.execute(count_query)
     total = total_result.scalar() or 0
     
@@ -280,12 +260,16 @@ async def export_result(
     task_id: str, 
     user_id: Optional[int] = Query(None, description="Filter by user ID"),
     format: str = "json",
+    gzip: bool = Query(False, description="Gzip the export on the fly"),
     db: AsyncSession = Depends(get_db)
 ):
-    """Export parsing result in specified format with user verification."""
+    """Export parsing result in specified format with user verification (streamed page by page)."""
     
-    # Get all results for the task with user verification
-    query = select(ParseResult).join(ParseTask, ParseResult.task_id == ParseTask.id)
+    if format.lower() not in STREAMING_FORMATS and format.lower() not in COLUMNAR_FORMATS:
+        raise HTTPException(status_code=400, detail="Unsupported format. Use 'json', 'csv', 'ndjson', 'parquet' or 'arrow'")
+    
+    # Resolve the task with user verification
+    query = select(ParseTask.id)
     
     try:
         task_id_int = int(task_id)
@@ -295,76 +279,26 @@ async def export_result(
     
     if user_id is not None:
         query = query.where(ParseTask.user_id == user_id)
-        
-    query = query.order_by(ParseResult.created_at.desc())
     
-    result = await db.execute(query)
-    results = result.scalars().all()
+    task_db_id = (await db.execute(query)).scalar_one_or_none()
     
-    if not results:
+    if not task_db_id or not await has_results(task_db_id):
         raise HTTPException(status_code=404, detail="No results found for this task")
     
-    # Format results for export
-    formatted_results = [_format_result(r) for r in results]
-    
-    # Export in JSON
-    if format.lower() == "json":
-        json_content = json.dumps(formatted_results, ensure_ascii=False, indent=2)
-        return StreamingResponse(
-            io.BytesIO(json_content.encode('utf-8')),
-            media_type="application/json",
-            headers={"Content-Disposition": f"attachment; filename=parsing_results_{task_id}.json"}
-        )
-    
-    # Export in CSV
-    elif format.lower() == "csv":
-        output = io.StringIO()
-        if formatted_results:
-            # Flatten the data for CSV
-            flattened_results = []
-            for result in formatted_results:
-                flat_result = {
-                    "id": result["id"],
-                    "task_id": result["task_id"],
-                    "platform": result["platform"],
-                    "platform_id": result["platform_id"],
-                    "username": result.get("username", ""),
-                    "display_name": result.get("display_name", ""),
-                    "author_phone": result.get("author_phone", ""),
-                    "created_at": result["created_at"],
-                }
-                
-                # Add platform-specific data as separate columns
-                if result.get("platform_specific_data"):
-                    for k, v in result["platform_specific_data"].items():
-                        flat_result[f"specific_{k}"] = str(v) if v is not None else ""
-                
-                flattened_results.append(flat_result)
-            
-            if flattened_results:
-                writer = csv.DictWriter(output, fieldnames=flattened_results[0].keys())
-                writer.writeheader()
-                writer.writerows(flattened_results)
-        
-        csv_content = output.getvalue()
+    if format.lower() in COLUMNAR_FORMATS:
+        media_type, headers = columnar_export_headers(task_id, format)
         return StreamingResponse(
-            io.BytesIO(csv_content.encode('utf-8')),
-            media_type="text/csv",
-            headers={"Content-Disposition": f"attachment; filename=parsing_results_{task_id}.csv"}
+            stream_columnar_export(task_db_id, format),
+            media_type=media_type,
+            headers=headers
         )
     
-    # Export in NDJSON (newline-delimited JSON)
-    elif format.lower() == "ndjson":
-        ndjson_lines = [json.dumps(result, ensure_ascii=False) for result in formatted_results]
-        ndjson_content = "\n".join(ndjson_lines)
-        return StreamingResponse(
-            io.BytesIO(ndjson_content.encode('utf-8')),
-            media_type="application/x-ndjson",
-            headers={"Content-Disposition": f"attachment; filename=parsing_results_{task_id}.ndjson"}
-        )
-    
-    else:
-        raise HTTPException(status_code=400, detail="Unsupported format. Use 'json', 'csv', or 'ndjson'")
+    media_type, headers = export_headers(task_id, format, gzip)
+    return StreamingResponse(
+        stream_export(task_db_id, format, gzip=gzip),
+        media_type=media_type,
+        headers=headers
+    )
 
 def _format_result(result: ParseResult) -> dict:
     """Format ParseResult model for API response."""
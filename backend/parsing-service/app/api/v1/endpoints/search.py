@@ -3,13 +3,18 @@ Search endpoints for multi-platform community search.
 """
 
 from fastapi import APIRouter, HTTPException, Depends, Query, Request
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Set
+import asyncio
 import logging
 
 from ....core.auth import get_user_id_from_request
 from ....core.config import Platform, get_settings
 from ....adapters.telegram import TelegramAdapter
 from ....core.integration_client import get_integration_client
+from ....core.search_cache import SearchCache, get_search_cache, paginate_communities
+from ....services.community_index import (
+    index_communities, is_public_community, search_community_index, INDEX_MIN_RESULTS
+)
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -17,6 +22,109 @@ router = APIRouter()
 settings = get_settings()
 
 
+async def _open_search_adapter(user_id: int) -> TelegramAdapter:
+    """Authenticate a TelegramAdapter on one of the user's active accounts."""
+    integration_client = get_integration_client()
+    
+    # Use the same method that works in parsing - get all active accounts
+    import httpx
+    try:
+        async with httpx.AsyncClient(timeout=30.0) as client:
+            response = await client.get(
+                f"{integration_client.base_url}/api/v1/telegram/internal/active-accounts"
+            )
+    except httpx.RequestError as e:
+        logger.error(f"❌ Network error getting accounts: {e}")
+        raise HTTPException(503, "Integration service unavailable")
+    
+    if response.status_code != 200:
+        logger.error(f"❌ Failed to get accounts from internal endpoint: {response.status_code}")
+        raise HTTPException(503, "Integration service unavailable")
+    
+    all_accounts = response.json()
+    logger.info(f"✅ Retrieved {len(all_accounts)} accounts from internal endpoint")
+    
+    # Filter accounts for this user
+    user_accounts = [acc for acc in all_accounts if acc.get('user_id') == user_id]
+    if not user_accounts:
+        raise HTTPException(503, f"No active Telegram accounts available for user {user_id}")
+    
+    # Select the first available account
+    selected_account = user_accounts[0]
+    session_id = selected_account.get('session_id') or selected_account.get('id')
+    
+    logger.info(f"🔑 Using Telegram account {session_id} for search")
+    
+    # Get credentials (same structure as parsing); user_id нужен для allocate через Account Manager
+    credentials = {
+        'session_id': session_id,
+        'user_id': user_id,
+        'api_id': selected_account.get('api_id'),
+        'api_hash': selected_account.get('api_hash'),
+        'session_data': selected_account.get('session_data')
+    }
+    
+    if not credentials['session_data']:
+        raise HTTPException(503, f"No session data available for account {session_id}")
+    
+    adapter = TelegramAdapter()
+    if not await adapter.authenticate(session_id, credentials):
+        raise HTTPException(503, f"Failed to authenticate with Telegram account {session_id}")
+    return adapter
+
+
+async def _collect_and_cache(user_id: int, platform: str, query: str, speed: str, progress_callback=None) -> Dict[str, Any]:
+    """
+    Run the full search on a user's account and store the merged list in the search cache.
+
+    The cache is shared by all users, so only public communities (with a username) are
+    cached. The returned entry also holds the caller's private matches (from their own
+    dialogs) for this response only.
+    """
+    from ....core.parsing_speed import parse_speed_from_string, get_speed_config
+    
+    speed_config = get_speed_config(parse_speed_from_string(speed))
+    logger.info(f"🔧 Search configuration: speed={speed_config.name}, {speed_config.message_delay}s API delay")
+    
+    adapter = await _open_search_adapter(user_id)
+    try:
+        all_results = await adapter.collect_communities(
+            query,
+            progress_callback=progress_callback,
+            speed_config=speed_config
+        )
+    finally:
+        await adapter.cleanup()
+    
+    # Everything seen goes into the community index: scanned dialogs first, verified results on top
+    await index_communities(adapter.discovered_communities.values())
+    await index_communities(all_results)
+    
+    entry = await get_search_cache().put(
+        platform, query, [result for result in all_results if is_public_community(result)]
+    )
+    return {**entry, 'results': all_results}
+
+
+async def _refresh_search(user_id: int, platform: str, query: str, speed: str):
+    """Background refresh of a stale cache entry (one refresh per query at a time)."""
+    search_cache = get_search_cache()
+    if not await search_cache.acquire_refresh(platform, query):
+        return
+    try:
+        entry = await _collect_and_cache(user_id, platform, query, speed)
+        public_count = sum(1 for result in entry['results'] if is_public_community(result))
+        logger.info(f"♻️ Search cache refreshed for '{query}': {public_count} public communities")
+    except Exception as e:
+        logger.warning(f"⚠️ Search cache refresh failed for '{query}': {e}")
+    finally:
+        await search_cache.release_refresh(platform, query)
+
+
+# Keep references to background refreshes so they are not garbage collected
+_refresh_tasks: Set[asyncio.Task] = set()
+
+
 @router.get("/")
 @router.get("")
 async def search_communities(
@@ -35,6 +143,11 @@ async def search_communities(
     - Sorting: By member count descending (largest first)
     - Pagination: offset/limit based
     
+    The merged list of public communities is cached by normalized (transliterated)
+    query: repeated and paginated requests are served from the cache, stale entries
+    are returned immediately and refreshed in the background. Private chats found
+    in the searching account's dialogs are only returned by that user's live search.
+    
     Speed options:
     - fast: 0.1s API delay, 0.5s method delay (высокий риск rate limits)
     - medium: 0.5s API delay, 1.5s method delay (рекомендуемый)
@@ -56,104 +169,41 @@ async def search_communities(
         if platform != "telegram":
             raise HTTPException(501, f"Search not implemented for platform: {platform}")
         
-        # Get active account for this platform (using same method as parsing)
-        integration_client = get_integration_client()
+        search_cache = get_search_cache()
+        cached = await search_cache.get(platform, query)
+        if cached:
+            if cached['stale']:
+                refresh = asyncio.create_task(_refresh_search(user_id, platform, query, speed))
+                _refresh_tasks.add(refresh)
+                refresh.add_done_callback(_refresh_tasks.discard)
+            logger.info(f"⚡ Search cache hit for '{query}' (stale: {cached['stale']})")
+            return SearchCache.page(cached, offset, limit)
         
-        # Use the same method that works in parsing - get all active accounts
-        import httpx
-        try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.get(
-                    f"{integration_client.base_url}/api/v1/telegram/internal/active-accounts"
-                )
-                
-                if response.status_code == 200:
-                    all_accounts = response.json()
-                    logger.info(f"✅ Retrieved {len(all_accounts)} accounts from internal endpoint")
-                    
-                    # DEBUG: Логируем для диагностики
-                    logger.info(f"🔍 DEBUG: Current JWT user_id: {user_id} (type: {type(user_id)})")
-                    for i, acc in enumerate(all_accounts[:3]):  # Только первые 3 для краткости
-                        acc_user_id = acc.get('user_id')
-                        logger.info(f"🔍 DEBUG: Account {i}: user_id={acc_user_id} (type: {type(acc_user_id)})")
-                    
-                    # Filter accounts for this user
-                    user_accounts = [acc for acc in all_accounts if acc.get('user_id') == user_id]
-                    
-                    logger.info(f"🔍 DEBUG: After filtering: found {len(user_accounts)} accounts for user_id {user_id}")
-                    
-                    if not user_accounts:
-                        raise HTTPException(503, f"No active Telegram accounts available for user {user_id}")
-                    
-                    # Select the first available account
-                    selected_account = user_accounts[0]
-                    session_id = selected_account.get('session_id') or selected_account.get('id')
-                    
-                    logger.info(f"🔑 Using Telegram account {session_id} for search")
-                    
-                    # Get credentials (same structure as parsing); user_id нужен для allocate через Account Manager
-                    credentials = {
-                        'session_id': session_id,
-                        'user_id': user_id,
-                        'api_id': selected_account.get('api_id'),
-                        'api_hash': selected_account.get('api_hash'),
-                        'session_data': selected_account.get('session_data')
-                    }
-                    
-                    if not credentials['session_data']:
-                        raise HTTPException(503, f"No session data available for account {session_id}")
-                        
-                else:
-                    logger.error(f"❌ Failed to get accounts from internal endpoint: {response.status_code}")
-                    raise HTTPException(503, "Integration service unavailable")
-                    
-        except httpx.RequestError as e:
-            logger.error(f"❌ Network error getting accounts: {e}")
-            raise HTTPException(503, "Integration service unavailable")
-        
-        # Create and authenticate adapter
-        adapter = TelegramAdapter()
+        # Community index next; live Telegram search only for cold queries.
+        # Index hits are not put into the search cache: it holds live results only
+        indexed = await search_community_index(query)
+        if len(indexed) >= INDEX_MIN_RESULTS:
+            logger.info(f"📚 Community index hit for '{query}': {len(indexed)} communities")
+            return {**paginate_communities(indexed, offset, limit), 'cached': False, 'source': 'index'}
         
-        if not await adapter.authenticate(session_id, credentials):
-            raise HTTPException(503, f"Failed to authenticate with Telegram account {session_id}")
+        # Progress callback for logging
+        async def search_progress_callback(current: int, total: int):
+            """Log search progress for monitoring."""
+            progress_pct = int((current / total) * 100) if total > 0 else 0
+            logger.info(f"📈 Search progress: {current}/{total} ({progress_pct}%) - User {user_id}, Query: '{query}'")
         
         try:
-            # Configure search speed (using same logic as parsing)
-            from ....core.parsing_speed import SpeedConfig, parse_speed_from_string, get_speed_config
-            
-            # Parse speed and get predefined configuration
-            speed_enum = parse_speed_from_string(speed)
-            speed_config = get_speed_config(speed_enum)
-            
-            logger.info(f"🔧 Search configuration: speed={speed_config.name}, {speed_config.message_delay}s API delay")
-            
-            # Progress callback for logging
-            async def search_progress_callback(current: int, total: int):
-                """Log search progress for monitoring."""
-                progress_pct = int((current / total) * 100) if total > 0 else 0
-                logger.info(f"📈 Search progress: {current}/{total} ({progress_pct}%) - User {user_id}, Query: '{query}'")
-            
-            # Perform search with progress tracking and speed config
-            search_results = await adapter.search_communities(
-                query=query,
-                offset=offset,
-                limit=limit,
-                progress_callback=search_progress_callback,
-                speed_config=speed_config
-            )
-            
-            # Ensure cleanup
-            await adapter.cleanup()
-            
-            logger.info(f"✅ Search completed: {len(search_results.get('results', []))} results found")
-            
-            return search_results
-            
+            entry = await _collect_and_cache(user_id, platform, query, speed, search_progress_callback)
+        except HTTPException:
+            raise
         except Exception as search_error:
-            await adapter.cleanup()
             logger.error(f"❌ Search failed: {search_error}")
             raise HTTPException(500, f"Search failed: {str(search_error)}")
         
+        search_results = {**paginate_communities(entry['results'], offset, limit), 'cached': False, 'source': 'telegram'}
+        logger.info(f"✅ Search completed: {len(search_results['results'])} results found")
+        return search_results
+        
     except HTTPException:
         # Re-raise HTTP exceptions as-is
         raise
@@ -1,16 +1,24 @@
 """Parse tasks API endpoints."""
 
-from fastapi import APIRouter
-from typing import List
+from fastapi import APIRouter, HTTPException, Request
+from typing import List, Optional
 from fastapi.responses import StreamingResponse
 import asyncio
 import json
 import logging
 from datetime import datetime
 
+from app.core.auth import get_user_id_from_request
+from app.core.progress_bus import (
+    TERMINAL_STATUSES, get_progress_bus, task_channel, user_channel, task_progress_event
+)
+
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# Keep-alive comment interval of idle SSE streams
+KEEPALIVE_SECONDS = 15.0
+
 # Импортируем created_tasks из main module для доступа к задачам
 def get_created_tasks():
     """Получить список задач из main модуля."""
@@ -18,6 +26,14 @@ def get_created_tasks():
     return getattr(main, 'created_tasks', [])
 
 
+async def _authorized_user_id(request: Request) -> int:
+    try:
+        return await get_user_id_from_request(request)
+    except Exception as auth_error:
+        logger.error(f"❌ JWT Authorization failed for progress stream: {auth_error}")
+        raise HTTPException(status_code=401, detail=f"Authorization failed: {str(auth_error)}")
+
+
 @router.get("/")
 async def list_tasks():
     """List all parsing tasks."""
@@ -30,6 +46,39 @@ async def create_task():
     return {"message": "Task creation endpoint - coming soon", "status": "not_implemented"}
 
 
+@router.get("/progress-stream")
+async def stream_user_progress(request: Request):
+    """
+    Server-Sent Events stream of progress events of all tasks of the current user.
+    
+    The first events are the current states of the user's active tasks; everything
+    after that is pushed from Redis pub/sub.
+    """
+    user_id = await _authorized_user_id(request)
+    
+    try:
+        subscription = await get_progress_bus().subscribe([user_channel(user_id)])
+    except Exception as redis_error:
+        logger.error(f"❌ Progress pub/sub unavailable for user {user_id}: {redis_error}")
+        raise HTTPException(status_code=503, detail="Progress stream unavailable")
+    
+    async def event_generator():
+        try:
+            for snapshot in await _active_task_snapshots(user_id):
+                yield _sse(snapshot)
+            
+            while True:
+                event = await subscription.next_event(KEEPALIVE_SECONDS)
+                yield ": keep-alive\n\n" if event is None else _sse(event)
+        except Exception as e:
+            logger.error(f"Error in user progress stream: {e}")
+            yield _sse({'error': str(e)})
+        finally:
+            await subscription.close()
+    
+    return _event_stream(event_generator())
+
+
 @router.get("/{task_id}")
 async def get_task(task_id: str):
     """Get specific parsing task."""
@@ -42,54 +91,150 @@ async def delete_task(task_id: str):
     return {"task_id": task_id, "deleted": True, "status": "coming_soon"}
 
 
+async def _task_snapshot(task_id: str) -> Optional[dict]:
+    """Current state of a task: last published event, own in-memory task or parse_tasks row."""
+    event = await get_progress_bus().last_event(task_id)
+    if event:
+        return event
+    
+    task = next((t for t in get_created_tasks() if t["id"] == task_id), None)
+    if task:
+        return task_progress_event(task)
+    
+    # Task owned by another replica that has not published yet
+    from app.database import AsyncSessionLocal
+    from app.models.parse_task import ParseTask
+    from sqlalchemy import select
+    
+    async with AsyncSessionLocal() as db_session:
+        row = (await db_session.execute(
+            select(ParseTask.user_id, ParseTask.status, ParseTask.progress)
+            .where(ParseTask.task_id == task_id)
+        )).first()
+    if not row:
+        return None
+    return {
+        "task_id": task_id,
+        "user_id": row.user_id,
+        "status": row.status.value if hasattr(row.status, 'value') else str(row.status),
+        "progress": row.progress or 0,
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+
+async def _active_task_snapshots(user_id: int) -> List[dict]:
+    """Current state of every pending/running/paused task of a user."""
+    from app.database import AsyncSessionLocal
+    from app.models.parse_task import ParseTask
+    from app.core.config import TaskStatus
+    from sqlalchemy import select
+    
+    async with AsyncSessionLocal() as db_session:
+        rows = (await db_session.execute(
+            select(ParseTask.task_id, ParseTask.status, ParseTask.progress)
+            .where(
+                ParseTask.user_id == user_id,
+                ParseTask.status.in_([TaskStatus.PENDING, TaskStatus.RUNNING, TaskStatus.PAUSED])
+            )
+            .order_by(ParseTask.created_at)
+        )).all()
+    
+    bus = get_progress_bus()
+    snapshots = []
+    for row in rows:
+        event = await bus.last_event(row.task_id)
+        snapshots.append(event or {
+            "task_id": row.task_id,
+            "user_id": user_id,
+            "status": row.status.value if hasattr(row.status, 'value') else str(row.status),
+            "progress": row.progress or 0,
+            "timestamp": datetime.utcnow().isoformat()
+        })
+    return snapshots
+
+
+def _sse(data: dict) -> str:
+    return f"data: {json.dumps(data, default=str)}\n\n"
+
+
+async def _poll_task_progress(task_id: str):
+    """Legacy polling of the in-memory task list (only sees tasks of this process)."""
+    while True:
+        task = next((t for t in get_created_tasks() if t["id"] == task_id), None)
+        if not task:
+            yield _sse({'error': 'Task not found'})
+            break
+        
+        event = task_progress_event(task)
+        yield _sse(event)
+        if event["status"] in TERMINAL_STATUSES:
+            break
+        await asyncio.sleep(1)
+
+
+def _event_stream(generator) -> StreamingResponse:
+    return StreamingResponse(
+        generator,
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "Access-Control-Allow-Origin": "*",
+            "Access-Control-Allow-Headers": "Cache-Control"
+        }
+    )
+
+
 @router.get("/{task_id}/progress-stream")
-async def stream_task_progress(task_id: str):
+async def stream_task_progress(task_id: str, request: Request):
     """
     Server-Sent Events stream для real-time обновления прогресса задачи
+    
+    Events are pushed from Redis pub/sub (any replica can serve the stream); the
+    first event is the current state, the stream ends on a terminal status.
+    Tasks of other users are reported as not found.
     """
+    user_id = await _authorized_user_id(request)
+    
+    subscription = None
+    try:
+        # Subscribe before reading the snapshot so no event is lost in between
+        subscription = await get_progress_bus().subscribe([task_channel(task_id)])
+    except Exception as redis_error:
+        logger.warning(f"⚠️ Progress pub/sub unavailable, polling task {task_id}: {redis_error}")
+    
+    snapshot = await _task_snapshot(task_id)
+    if not snapshot or str(snapshot.get("user_id")) != str(user_id):
+        if subscription is not None:
+            await subscription.close()
+        raise HTTPException(status_code=404, detail="Task not found")
+    
     async def event_generator():
         try:
+            yield _sse(snapshot)
+            if snapshot["status"] in TERMINAL_STATUSES:
+                return
+            
+            if subscription is None:
+                async for chunk in _poll_task_progress(task_id):
+                    yield chunk
+                return
+            
             while True:
-                # Получаем текущий прогресс задачи
-                created_tasks = get_created_tasks()
-                task = None
-                for t in created_tasks:
-                    if t["id"] == task_id:
-                        task = t
-                        break
-                
-                if not task:
-                    yield f"data: {json.dumps({'error': 'Task not found'})}\n\n"
+                event = await subscription.next_event(KEEPALIVE_SECONDS)
+                if event is None:
+                    # Keep-alive comment for proxies
+                    yield ": keep-alive\n\n"
+                    continue
+                yield _sse(event)
+                if event.get("status") in TERMINAL_STATUSES:
                     break
                 
-                # Отправляем данные о прогрессе
-                progress_data = {
-                    "task_id": task_id,
-                    "status": task["status"],
-                    "progress": task["progress"],
-                    "timestamp": datetime.utcnow().isoformat()
-                }
-                
-                yield f"data: {json.dumps(progress_data)}\n\n"
-                
-                # Если задача завершена, останавливаем stream
-                if task["status"] in ["completed", "failed", "cancelled"]:
-                    break
-                
-                # Ждем 1 секунду перед следующим обновлением
-                await asyncio.sleep(1)
-                
         except Exception as e:
             logger.error(f"Error in progress stream: {e}")
-            yield f"data: {json.dumps({'error': str(e)})}\n\n"
+            yield _sse({'error': str(e)})
+        finally:
+            if subscription is not None:
+                await subscription.close()
     
-    return StreamingResponse(
-        event_generator(),
-        media_type="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Headers": "Cache-Control"
-        }
-    ) 
\ No newline at end of file
+    return _event_stream(event_generator())
@@ -69,6 +69,25 @@ class Settings(BaseSettings):
             return f"redis://:{self.REDIS_PASSWORD}@{self.REDIS_HOST}:{self.REDIS_PORT}/{self.REDIS_DB}"
         return f"redis://{self.REDIS_HOST}:{self.REDIS_PORT}/{self.REDIS_DB}"
     
+    # Telegram user profile cache (shared with Invite Service, defaults to REDIS_URL)
+    USER_PROFILE_CACHE_URL: Optional[str] = None
+    USER_PROFILE_CACHE_TTL: int = 7 * 24 * 3600  # profiles with a phone
+    USER_PROFILE_CACHE_ABSENT_TTL: int = 3 * 24 * 3600  # phone hidden - re-check sooner
+    
+    # Community search cache: entries older than FRESH are served and refreshed in background
+    SEARCH_CACHE_FRESH_SECONDS: int = 3600
+    SEARCH_CACHE_TTL: int = 24 * 3600
+    COMMENTS_PROBE_TTL: int = 3 * 24 * 3600  # has-comments verdict per channel
+    
+    # Lease of a RUNNING task: renewed by the owning process, requeued by any replica once expired
+    TASK_LEASE_SECONDS: int = 120
+    TASK_LEASE_RENEW_SECONDS: int = 30
+    
+    # parse_results is partitioned by RANGE (task_id); old partitions are detached or dropped whole
+    PARSE_RESULTS_PARTITION_TASKS: int = 1000  # task ids per new partition
+    PARSE_RESULTS_RETENTION_DAYS: Optional[int] = None  # None - keep results forever
+    PARSE_RESULTS_RETENTION_ACTION: str = "detach"  # "detach" (keep as archive table) or "drop"
+    
     # RabbitMQ
     RABBITMQ_HOST: str = "rabbitmq"
     RABBITMQ_PORT: int = 5672
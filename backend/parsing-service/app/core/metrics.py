@@ -17,9 +17,10 @@ metrics_registry = CollectorRegistry()
 # TASK METRICS
 # =============================================================================
 
-# Task counters by platform and status
+# Task counters by platform and status. Not named 'parsing_tasks_total':
+# that counter's '_created' sample would collide with parsing_tasks_created_total.
 tasks_total = Counter(
-    'parsing_tasks_total',
+    'parsing_tasks_by_status_total',
     'Total number of parsing tasks',
     ['platform', 'task_type', 'status', 'user_id'],
     registry=metrics_registry
@@ -92,6 +93,23 @@ parsing_rate = Histogram(
     registry=metrics_registry
 )
 
+# Persistence throughput (rows written to parse_results per second)
+persist_rate = Histogram(
+    'parsing_persist_rows_per_second',
+    'Rate of rows persisted to parse_results in rows per second',
+    ['platform'],
+    buckets=[10, 50, 100, 500, 1000, 5000, 10000, 50000],
+    registry=metrics_registry
+)
+
+# Persisted rows by outcome (inserted, duplicate)
+results_persisted = Counter(
+    'parsing_results_persisted_total',
+    'Total number of rows sent to parse_results storage',
+    ['platform', 'outcome'],
+    registry=metrics_registry
+)
+
 # =============================================================================
 # PLATFORM ACCOUNT METRICS
 # =============================================================================
@@ -205,7 +223,7 @@ class MetricsCollector:
     """Helper class for collecting metrics."""
     
     def __init__(self):
-        self.service_info.info({
+        service_info.info({
             'version': settings.VERSION,
             'app_name': settings.APP_NAME,
             'supported_platforms': ','.join([p.value for p in settings.SUPPORTED_PLATFORMS])
@@ -258,6 +276,14 @@ class MetricsCollector:
         """Record parsing rate."""
         parsing_rate.labels(platform=platform.value).observe(rate)
     
+    def record_persist_rate(self, platform: Platform, rows: int, duplicates: int, seconds: float):
+        """Record one persisted chunk and its rows/sec throughput."""
+        results_persisted.labels(platform=platform.value, outcome='inserted').inc(rows)
+        if duplicates:
+            results_persisted.labels(platform=platform.value, outcome='duplicate').inc(duplicates)
+        if seconds > 0:
+            persist_rate.labels(platform=platform.value).observe((rows + duplicates) / seconds)
+    
     # Account metrics
     def record_account_used(self, platform: Platform, account_status: str):
         """Record account usage."""
@@ -45,6 +45,9 @@ class SpeedConfig:
     description: str
     estimated_speed: str       # Estimated users per hour
     risk_level: str           # Risk description
+    
+    # Concurrency
+    reply_fetch_concurrency: int = 1   # Comment threads fetched in parallel per account
 
 
 # Predefined speed configurations based on research
@@ -72,7 +75,10 @@ SPEED_CONFIGS: Dict[ParsingSpeed, SpeedConfig] = {
         name="Безопасный",
         description="Минимальный риск FloodWait и блокировок. Медленно, но надежно.",
         estimated_speed="~300-500 пользователей/час",
-        risk_level="Очень низкий"
+        risk_level="Очень низкий",
+        
+        # Concurrency
+        reply_fetch_concurrency=2   # 2 ветки комментариев параллельно
     ),
     
     ParsingSpeed.MEDIUM: SpeedConfig(
@@ -97,7 +103,10 @@ SPEED_CONFIGS: Dict[ParsingSpeed, SpeedConfig] = {
         name="Средний (рекомендуемый)",
         description="Оптимальный баланс скорости и безопасности. Иногда возможны FloodWait.",
         estimated_speed="~800-1200 пользователей/час",
-        risk_level="Средний"
+        risk_level="Средний",
+        
+        # Concurrency
+        reply_fetch_concurrency=4   # 4 ветки комментариев параллельно
     ),
     
     ParsingSpeed.FAST: SpeedConfig(
@@ -122,7 +131,10 @@ SPEED_CONFIGS: Dict[ParsingSpeed, SpeedConfig] = {
         name="Быстрый (опасный)",
         description="Максимальная скорость. Высокий риск FloodWait и временных блокировок.",
         estimated_speed="~1500-2500 пользователей/час",
-        risk_level="Высокий"
+        risk_level="Высокий",
+        
+        # Concurrency
+        reply_fetch_concurrency=8   # 8 веток комментариев параллельно
     )
 }
 
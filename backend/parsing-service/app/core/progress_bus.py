@@ -0,0 +1,148 @@
+"""
+Task progress events over Redis pub/sub.
+
+The worker that runs a task publishes every progress/status change to
+`parsing:progress:task:<task_id>` and `parsing:progress:user:<user_id>`, and
+keeps the last event under `parsing:progress:last:<task_id>`. SSE endpoints on
+any API replica subscribe to those channels instead of polling the in-memory
+task list of the process that owns the task.
+"""
+
+import asyncio
+import json
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import redis.asyncio as aioredis
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+TASK_CHANNEL_PREFIX = "parsing:progress:task:"
+USER_CHANNEL_PREFIX = "parsing:progress:user:"
+LAST_EVENT_PREFIX = "parsing:progress:last:"
+
+# Last event of a finished task is kept for late subscribers
+LAST_EVENT_TTL = 24 * 3600
+
+TERMINAL_STATUSES = ("completed", "failed", "cancelled")
+
+
+def task_channel(task_id: str) -> str:
+    return f"{TASK_CHANNEL_PREFIX}{task_id}"
+
+
+def user_channel(user_id: int) -> str:
+    return f"{USER_CHANNEL_PREFIX}{user_id}"
+
+
+def task_progress_event(task: Dict[str, Any]) -> Dict[str, Any]:
+    """Progress event for an in-memory task dict (same fields the SSE stream always sent)."""
+    event = {
+        "task_id": task["id"],
+        "user_id": task.get("user_id"),
+        "status": task.get("status"),
+        "progress": task.get("progress", 0),
+        "timestamp": datetime.utcnow().isoformat()
+    }
+    for field in ("current_users", "estimated_total", "result_count", "error_message"):
+        if task.get(field) is not None:
+            event[field] = task[field]
+    return event
+
+
+class ProgressBus:
+    """Publisher and subscriber side of the task progress channels."""
+
+    def __init__(self, url: Optional[str] = None):
+        self.url = url or settings.REDIS_URL
+        self._redis = None
+
+    def _client(self):
+        if self._redis is None:
+            self._redis = aioredis.from_url(self.url, decode_responses=True)
+        return self._redis
+
+    async def publish(self, event: Dict[str, Any]):
+        """Store the event as the task's last state and fan it out; never raises."""
+        payload = json.dumps(event, default=str)
+        try:
+            pipe = self._client().pipeline(transaction=False)
+            pipe.set(f"{LAST_EVENT_PREFIX}{event['task_id']}", payload, ex=LAST_EVENT_TTL)
+            pipe.publish(task_channel(event['task_id']), payload)
+            if event.get('user_id') is not None:
+                pipe.publish(user_channel(event['user_id']), payload)
+            await pipe.execute()
+        except Exception as e:
+            logger.debug(f"Progress publish failed for task {event.get('task_id')}: {e}")
+
+    async def last_event(self, task_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            value = await self._client().get(f"{LAST_EVENT_PREFIX}{task_id}")
+        except Exception as e:
+            logger.debug(f"Progress snapshot read failed for task {task_id}: {e}")
+            return None
+        if not value:
+            return None
+        try:
+            return json.loads(value)
+        except ValueError:
+            return None
+
+    async def subscribe(self, channels: List[str]) -> "ProgressSubscription":
+        """Subscribe to `channels`; raises if Redis is unavailable (callers may fall back to polling)."""
+        pubsub = self._client().pubsub()
+        await pubsub.subscribe(*channels)
+        return ProgressSubscription(pubsub)
+
+
+class ProgressSubscription:
+    """Open subscription to one or more progress channels."""
+
+    def __init__(self, pubsub):
+        self._pubsub = pubsub
+
+    async def next_event(self, timeout: float = 15.0) -> Optional[Dict[str, Any]]:
+        """Next published event, or None if nothing arrived within `timeout` seconds."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return None
+            message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=remaining)
+            if message is None:
+                continue
+            try:
+                return json.loads(message['data'])
+            except (ValueError, TypeError):
+                continue
+
+    async def close(self):
+        try:
+            await self._pubsub.unsubscribe()
+            await self._pubsub.reset()
+        except Exception as e:
+            logger.debug(f"Progress unsubscribe failed: {e}")
+
+
+_progress_bus: Optional[ProgressBus] = None
+
+
+def get_progress_bus() -> ProgressBus:
+    global _progress_bus
+    if _progress_bus is None:
+        _progress_bus = ProgressBus()
+    return _progress_bus
+
+
+async def publish_task_progress(task: Dict[str, Any]):
+    """Publish the current state of an in-memory task dict."""
+    await get_progress_bus().publish(task_progress_event(task))
+
+
+def publish_task_progress_nowait(task: Dict[str, Any]):
+    """Publish from synchronous code running inside the event loop (state is captured now)."""
+    asyncio.ensure_future(get_progress_bus().publish(task_progress_event(task)))
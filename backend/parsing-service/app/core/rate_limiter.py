@@ -0,0 +1,60 @@
+"""
+Token bucket rate limiting for Telegram API calls.
+
+Each TelegramAdapter (one Telethon client = one account) owns a pair of buckets
+built from its SpeedConfig: `api_requests_per_minute` for general requests
+(reply threads, users.getUsers) and `user_requests_per_minute` for per-user
+requests (users.getFullUser).
+"""
+
+import asyncio
+import time
+import logging
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Async token bucket: `rate_per_minute` tokens refilled continuously, up to `capacity`."""
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[int] = None, name: str = "api"):
+        self.rate = max(float(rate_per_minute), 1.0) / 60.0  # tokens per second
+        self.capacity = max(1, int(capacity or 1))
+        self.name = name
+        self._tokens = float(self.capacity)
+        self._updated_at = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float):
+        elapsed = now - self._updated_at
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._updated_at = now
+
+    async def acquire(self, tokens: float = 1.0) -> float:
+        """Wait until `tokens` are available and take them. Returns seconds waited."""
+        waited = 0.0
+        # Waiters are served in order: the lock is held while sleeping
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._blocked_until:
+                    delay = self._blocked_until - now
+                else:
+                    self._refill(now)
+                    if self._tokens >= tokens:
+                        self._tokens -= tokens
+                        return waited
+                    delay = (tokens - self._tokens) / self.rate
+                await asyncio.sleep(delay)
+                waited += delay
+
+    def penalize(self, seconds: float):
+        """Block the bucket (e.g. after FloodWait) so no caller proceeds for `seconds`."""
+        now = time.monotonic()
+        self._blocked_until = max(self._blocked_until, now + seconds)
+        self._tokens = 0.0
+        self._updated_at = now + seconds
+        logger.warning(f"⏳ {self.name} rate limiter paused for {seconds}s")
@@ -0,0 +1,211 @@
+"""
+Cache of community search results.
+
+A community search expands the query into several variants and runs three
+Telegram search methods per variant plus a has-comments probe per channel, so
+it can take minutes. The merged, deduplicated and sorted community list is
+cached in Redis under the normalized, transliterated query ("Футбол",
+"футбол " and "futbol" share one entry). Entries are shared by all users, so they hold only
+public communities (with a username), never private chats from the searching
+account's dialogs. Pages (offset/limit) are cut from the
+cached list; entries older than SEARCH_CACHE_FRESH_SECONDS are still served
+while the caller refreshes them in the background.
+
+Has-comments probe verdicts are cached separately per channel id
+(CommentsProbeCache), so known channels are filtered without API calls.
+"""
+
+import json
+import logging
+import re
+import time
+from typing import Any, Dict, List, Optional
+
+import redis.asyncio as aioredis
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "search:communities:"
+LOCK_PREFIX = "search:communities:refresh:"
+PROBE_KEY_PREFIX = "tg:comments_probe:"
+
+# Only one process refreshes a given query at a time
+REFRESH_LOCK_SECONDS = 600
+
+CYRILLIC_TO_LATIN = {
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'д': 'd', 'е': 'e', 'ё': 'e',
+    'ж': 'zh', 'з': 'z', 'и': 'i', 'й': 'y', 'к': 'k', 'л': 'l', 'м': 'm',
+    'н': 'n', 'о': 'o', 'п': 'p', 'р': 'r', 'с': 's', 'т': 't', 'у': 'u',
+    'ф': 'f', 'х': 'h', 'ц': 'ts', 'ч': 'ch', 'ш': 'sh', 'щ': 'sch',
+    'ъ': '', 'ы': 'y', 'ь': '', 'э': 'e', 'ю': 'yu', 'я': 'ya'
+}
+
+
+def transliterate(text: str) -> str:
+    """Basic Cyrillic -> Latin transliteration (lowercase input)."""
+    return ''.join(CYRILLIC_TO_LATIN.get(char, char) for char in text)
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase, drop leading @/# and collapse whitespace."""
+    return re.sub(r'\s+', ' ', query.lower()).strip().lstrip('@#').strip()
+
+
+def search_cache_key(platform: str, query: str) -> str:
+    return f"{KEY_PREFIX}{platform}:{transliterate(normalize_query(query))}"
+
+
+def _refresh_lock_key(platform: str, query: str) -> str:
+    return f"{LOCK_PREFIX}{platform}:{transliterate(normalize_query(query))}"
+
+
+def paginate_communities(results: List[Dict[str, Any]], offset: int, limit: int) -> Dict[str, Any]:
+    """Cut one page from a full, sorted community list."""
+    return {
+        'results': results[offset:offset + limit],
+        'has_more': len(results) > offset + limit,
+        'total_found': len(results)
+    }
+
+
+class SearchCache:
+    """Redis-backed community search cache with stale-while-refresh entries."""
+
+    def __init__(
+        self,
+        url: Optional[str] = None,
+        fresh_seconds: int = settings.SEARCH_CACHE_FRESH_SECONDS,
+        ttl: int = settings.SEARCH_CACHE_TTL
+    ):
+        self.url = url or settings.REDIS_URL
+        self.fresh_seconds = fresh_seconds
+        self.ttl = ttl
+        self._redis = None
+
+    def _client(self):
+        if self._redis is None:
+            self._redis = aioredis.from_url(self.url, decode_responses=True)
+        return self._redis
+
+    async def get(self, platform: str, query: str) -> Optional[Dict[str, Any]]:
+        """Cached entry with a `stale` flag, or None (missing or Redis unavailable)."""
+        try:
+            value = await self._client().get(search_cache_key(platform, query))
+        except Exception as e:
+            logger.warning(f"⚠️ Search cache read failed: {e}")
+            return None
+        if not value:
+            return None
+        try:
+            entry = json.loads(value)
+        except ValueError:
+            return None
+        entry['stale'] = time.time() - entry.get('cached_at', 0) > self.fresh_seconds
+        return entry
+
+    async def put(self, platform: str, query: str, results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        entry = {
+            'query': query,
+            'results': results,
+            'cached_at': time.time()
+        }
+        try:
+            await self._client().set(search_cache_key(platform, query), json.dumps(entry, default=str), ex=self.ttl)
+        except Exception as e:
+            logger.warning(f"⚠️ Search cache write failed: {e}")
+        return entry
+
+    async def acquire_refresh(self, platform: str, query: str) -> bool:
+        """Take the refresh lock for a query; False if another refresh is running."""
+        try:
+            return bool(await self._client().set(
+                _refresh_lock_key(platform, query), "1", nx=True, ex=REFRESH_LOCK_SECONDS
+            ))
+        except Exception as e:
+            logger.debug(f"Search cache lock failed: {e}")
+            return False
+
+    async def release_refresh(self, platform: str, query: str):
+        try:
+            await self._client().delete(_refresh_lock_key(platform, query))
+        except Exception as e:
+            logger.debug(f"Search cache unlock failed: {e}")
+
+    @staticmethod
+    def page(entry: Dict[str, Any], offset: int, limit: int) -> Dict[str, Any]:
+        """Search response for one page of a cached entry."""
+        return {
+            **paginate_communities(entry['results'], offset, limit),
+            'cached': True,
+            'source': 'cache',
+            'cached_at': entry.get('cached_at'),
+            'stale': entry.get('stale', False)
+        }
+
+
+class CommentsProbeCache:
+    """
+    Has-comments verdicts per channel id, with the data they are based on
+    (messages checked, comments found). Popular channels come back in many
+    searches; a cached verdict saves the iter_messages probe.
+    """
+
+    def __init__(self, url: Optional[str] = None, ttl: int = settings.COMMENTS_PROBE_TTL):
+        self.url = url or settings.REDIS_URL
+        self.ttl = ttl
+        self._redis = None
+        self.hits = 0
+        self.misses = 0
+
+    def _client(self):
+        if self._redis is None:
+            self._redis = aioredis.from_url(self.url, decode_responses=True)
+        return self._redis
+
+    async def get(self, channel_id: int) -> Optional[Dict[str, Any]]:
+        try:
+            value = await self._client().get(f"{PROBE_KEY_PREFIX}{channel_id}")
+        except Exception as e:
+            logger.debug(f"Comments probe cache read failed: {e}")
+            return None
+        if not value:
+            self.misses += 1
+            return None
+        try:
+            verdict = json.loads(value)
+        except ValueError:
+            return None
+        self.hits += 1
+        return verdict
+
+    async def put(self, channel_id: int, has_comments: bool, messages_checked: int, comments_found: int):
+        verdict = {
+            'has_comments': has_comments,
+            'messages_checked': messages_checked,
+            'comments_found': comments_found,
+            'checked_at': time.time()
+        }
+        try:
+            await self._client().set(f"{PROBE_KEY_PREFIX}{channel_id}", json.dumps(verdict), ex=self.ttl)
+        except Exception as e:
+            logger.debug(f"Comments probe cache write failed: {e}")
+
+
+_search_cache: Optional[SearchCache] = None
+_comments_probe_cache: Optional[CommentsProbeCache] = None
+
+
+def get_search_cache() -> SearchCache:
+    global _search_cache
+    if _search_cache is None:
+        _search_cache = SearchCache()
+    return _search_cache
+
+
+def get_comments_probe_cache() -> CommentsProbeCache:
+    global _comments_probe_cache
+    if _comments_probe_cache is None:
+        _comments_probe_cache = CommentsProbeCache()
+    return _comments_probe_cache
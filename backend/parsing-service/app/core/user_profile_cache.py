@@ -0,0 +1,123 @@
+"""
+Cross-task cache of Telegram user profiles.
+
+Customers parse overlapping audiences, so the same user ids come back task
+after task. Profiles (username, names, phone or "phone hidden", premium/verified)
+are kept in Redis under `tg:user_profile:<user_id>` with a TTL, which lets
+TelegramAdapter skip users.getFullUser for users it has already checked.
+Invite Service reads the same keys when importing parsing results.
+
+The cache is best effort: any Redis error is logged and treated as a miss.
+"""
+
+import json
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional
+
+import redis.asyncio as aioredis
+from telethon.tl.types import User
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "tg:user_profile:"
+
+
+def profile_key(user_id: int) -> str:
+    return f"{KEY_PREFIX}{user_id}"
+
+
+def build_user_profile(user: User, phone: Optional[str], phone_checked: bool = True) -> Dict[str, Any]:
+    """Profile stored in the cache. phone=None with phone_checked=True means the phone is hidden."""
+    return {
+        "user_id": user.id,
+        "username": user.username,
+        "first_name": user.first_name,
+        "last_name": user.last_name,
+        "phone": phone,
+        "phone_checked": phone_checked,
+        "is_premium": bool(getattr(user, 'premium', False)),
+        "is_verified": bool(getattr(user, 'verified', False)),
+        "fetched_at": datetime.utcnow().isoformat()
+    }
+
+
+class UserProfileCache:
+    """Redis-backed Telegram user profile cache with TTL refresh."""
+
+    def __init__(
+        self,
+        url: Optional[str] = None,
+        ttl: int = settings.USER_PROFILE_CACHE_TTL,
+        absent_ttl: int = settings.USER_PROFILE_CACHE_ABSENT_TTL
+    ):
+        self.url = url or settings.USER_PROFILE_CACHE_URL or settings.REDIS_URL
+        self.ttl = ttl
+        self.absent_ttl = absent_ttl
+        self._redis = None
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def _client(self):
+        if self._redis is None:
+            self._redis = aioredis.from_url(self.url, decode_responses=True)
+        return self._redis
+
+    async def get(self, user_id: int) -> Optional[Dict[str, Any]]:
+        """Cached profile or None (missing, expired or Redis unavailable)."""
+        profiles = await self.get_many([user_id])
+        return profiles.get(user_id)
+
+    async def get_many(self, user_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+        """Fetch several profiles in one MGET."""
+        user_ids = list(user_ids)
+        if not user_ids:
+            return {}
+        try:
+            values = await self._client().mget([profile_key(user_id) for user_id in user_ids])
+        except Exception as e:
+            self.errors += 1
+            logger.debug(f"User profile cache read failed: {e}")
+            return {}
+
+        profiles = {}
+        for user_id, value in zip(user_ids, values):
+            if not value:
+                continue
+            try:
+                profiles[user_id] = json.loads(value)
+            except ValueError:
+                continue
+        self.hits += len(profiles)
+        self.misses += len(user_ids) - len(profiles)
+        return profiles
+
+    async def put(self, profile: Dict[str, Any]):
+        """Store a profile; hidden phones expire sooner so they get re-checked."""
+        ttl = self.ttl if profile.get("phone") else self.absent_ttl
+        try:
+            await self._client().set(profile_key(profile["user_id"]), json.dumps(profile), ex=ttl)
+        except Exception as e:
+            self.errors += 1
+            logger.debug(f"User profile cache write failed for {profile.get('user_id')}: {e}")
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'errors': self.errors
+        }
+
+
+_user_profile_cache: Optional[UserProfileCache] = None
+
+
+def get_user_profile_cache() -> UserProfileCache:
+    """Process-wide cache instance (one Redis connection pool for all adapters)."""
+    global _user_profile_cache
+    if _user_profile_cache is None:
+        _user_profile_cache = UserProfileCache()
+    return _user_profile_cache
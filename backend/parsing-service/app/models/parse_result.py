@@ -5,21 +5,45 @@ Parse result model for storing parsed data from all platforms.
 from datetime import datetime
 from sqlalchemy import (
     Column, Integer, String, DateTime, Text, JSON, 
-    Boolean, ForeignKey, Enum as SQLEnum, BigInteger
+    Boolean, ForeignKey, Enum as SQLEnum, BigInteger, Index, Computed, DDL, event, text
 )
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import relationship
 
 from .base import BaseModel
 from ..core.config import Platform
 
+# Text search configuration of search_vector: the `russian` config stems Cyrillic
+# words with the Russian snowball stemmer and Latin words with the English one
+SEARCH_TS_CONFIG = 'russian'
+
 
 class ParseResult(BaseModel):
     """Universal model for storing parsed data from all platforms."""
     
     __tablename__ = 'parse_results'
+    __table_args__ = (
+        # Dedupe key for bulk INSERT ... ON CONFLICT DO NOTHING
+        Index('uq_parse_results_task_source_author', 'task_id', 'source_id', 'author_id', unique=True),
+        # Keyset pagination of exports: WHERE task_id = ? AND (created_at, id) < (?, ?)
+        Index('ix_parse_results_task_created_id', 'task_id', 'created_at', 'id'),
+        # Phone enrichment queue: users whose phone has not been looked up yet
+        Index(
+            'ix_parse_results_phone_enrichment', 'id',
+            postgresql_where=text("author_id IS NOT NULL AND author_phone IS NULL AND phone_checked_at IS NULL")
+        ),
+        # Topic search for research snippets: search_vector @@ tsquery, ranked with engagement
+        Index('ix_parse_results_search_vector', 'search_vector', postgresql_using='gin'),
+        Index('ix_parse_results_engagement_total', 'engagement_total'),
+        # Range partitions per block of task ids (see services/result_partitions)
+        {'postgresql_partition_by': 'RANGE (task_id)'},
+    )
+    
+    # Primary key of a partitioned table must include the partition key
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
     
     # Link to parse task
-    task_id = Column(Integer, ForeignKey('parse_tasks.id'), nullable=False, index=True)
+    task_id = Column(Integer, ForeignKey('parse_tasks.id'), primary_key=True, nullable=False, index=True)
     
     # Platform and source info
     platform = Column(SQLEnum(Platform), nullable=False, index=True)
@@ -40,6 +64,7 @@ class ParseResult(BaseModel):
     author_username = Column(String(255), nullable=True)
     author_name = Column(String(255), nullable=True)
     author_phone = Column(String(20), nullable=True)  # Phone number if accessible
+    phone_checked_at = Column(DateTime, nullable=True)  # Set once the phone lookup is done (found or hidden)
     author_verified = Column(Boolean, default=False, nullable=False)
     
     # Timestamps
@@ -52,6 +77,10 @@ class ParseResult(BaseModel):
     shares_count = Column(BigInteger, default=0, nullable=False)
     comments_count = Column(BigInteger, default=0, nullable=False)
     reactions_count = Column(BigInteger, default=0, nullable=False)
+    engagement_total = Column(
+        BigInteger,
+        Computed("likes_count + shares_count + comments_count + reactions_count", persisted=True)
+    )
     
     # Media information
     has_media = Column(Boolean, default=False, nullable=False)
@@ -106,8 +135,11 @@ class ParseResult(BaseModel):
     # Raw data backup
     raw_data = Column(JSON, nullable=True)  # Complete raw response from platform API
     
-    # Indexing and search
-    search_vector = Column(Text, nullable=True)  # For full-text search
+    # Indexing and search (generated by PostgreSQL from content_text)
+    search_vector = Column(
+        TSVECTOR,
+        Computed(f"to_tsvector('{SEARCH_TS_CONFIG}', coalesce(content_text, ''))", persisted=True)
+    )
     
     def __repr__(self):
         return f"<ParseResult(id={self.id}, platform={self.platform.value}, content_id={self.content_id})>"
@@ -143,13 +175,22 @@ class ParseResult(BaseModel):
         return list(set(word for word in words if len(word) > 3))
 
 
+# Fresh databases (create_all) get the catch-all partition; range partitions are
+# created ahead of new tasks by ResultPartitionMaintainer
+event.listen(
+    ParseResult.__table__,
+    'after_create',
+    DDL("CREATE TABLE IF NOT EXISTS parse_results_default PARTITION OF parse_results DEFAULT")
+)
+
+
 class ParseResultMedia(BaseModel):
     """Model for storing media files associated with parse results."""
     
     __tablename__ = 'parse_result_media'
     
-    # Link to parse result
-    result_id = Column(Integer, ForeignKey('parse_results.id'), nullable=False, index=True)
+    # Link to parse result (no FK: parse_results is partitioned, its key is (id, task_id))
+    result_id = Column(Integer, nullable=False, index=True)
     
     # Media information
     media_type = Column(String(20), nullable=False)  # 'photo', 'video', 'audio', 'document'
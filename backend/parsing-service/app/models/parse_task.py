@@ -84,6 +84,10 @@ class ParseTask(BaseModel):
     account_ids = Column(JSON, nullable=True)  # List of account IDs to use
     current_account_id = Column(String(100), nullable=True)  # Currently active account
     
+    # Lease of a RUNNING task, renewed by the scheduler process that runs it
+    lease_owner = Column(String(100), nullable=True)
+    lease_expires_at = Column(DateTime, nullable=True, index=True)
+    
     # Resume functionality
     resume_data = Column(JSON, nullable=True)  # Data needed to resume parsing
     """
@@ -103,7 +107,12 @@ class ParseTask(BaseModel):
     
     # Results reference
     result_file_path = Column(String(500), nullable=True)  # Path to result file
+    
+    # Result counters, maintained by ParseResultWriter in the insert transaction
     result_count = Column(Integer, default=0, nullable=False)
+    results_with_username = Column(Integer, default=0, nullable=False)
+    results_with_phone = Column(Integer, default=0, nullable=False)
+    last_result_at = Column(DateTime, nullable=True)
     
     # Celery task ID for cancellation
     celery_task_id = Column(String(100), nullable=True, index=True)
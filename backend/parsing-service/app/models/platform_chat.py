@@ -5,7 +5,7 @@ Platform chat/community model for storing information about channels, groups, et
 from datetime import datetime
 from sqlalchemy import (
     Column, Integer, String, DateTime, Text, JSON, 
-    Boolean, Enum as SQLEnum, BigInteger
+    Boolean, Enum as SQLEnum, BigInteger, Index
 )
 
 from .base import BaseModel
@@ -16,6 +16,13 @@ class PlatformChat(BaseModel):
     """Universal model for storing information about chats/communities across platforms."""
     
     __tablename__ = 'platform_chats'
+    __table_args__ = (
+        # Community index upserts: ON CONFLICT (platform, chat_id)
+        Index('ix_platform_chats_platform_chat_id_unique', 'platform', 'chat_id', unique=True),
+        # Local community search: ILIKE '%query%' on title/username (pg_trgm)
+        Index('ix_platform_chats_title_trgm', 'title', postgresql_using='gin', postgresql_ops={'title': 'gin_trgm_ops'}),
+        Index('ix_platform_chats_username_trgm', 'username', postgresql_using='gin', postgresql_ops={'username': 'gin_trgm_ops'}),
+    )
     
     # Platform and identification
     platform = Column(SQLEnum(Platform), nullable=False, index=True)
@@ -30,6 +37,9 @@ class PlatformChat(BaseModel):
     # Status flags
     is_verified = Column(Boolean, default=False, nullable=False)
     is_private = Column(Boolean, default=False, nullable=False)
+    is_broadcast = Column(Boolean, default=False, nullable=False)
+    is_megagroup = Column(Boolean, default=False, nullable=False)
+    has_comments = Column(Boolean, nullable=True)  # None - not checked yet
     
     # Statistics
     members_count = Column(BigInteger, default=0, nullable=False)
@@ -41,6 +51,7 @@ class PlatformChat(BaseModel):
     # Discovery
     keywords = Column(JSON, nullable=True)
     last_parsed = Column(DateTime, nullable=True)
+    last_verified_at = Column(DateTime, nullable=True, index=True)  # Last time the entity was seen in Telegram
     
     def __repr__(self):
         return f"<PlatformChat(platform={self.platform.value}, chat_id={self.chat_id})>"
@@ -0,0 +1,194 @@
+"""
+Persistent community index (platform_chats).
+
+Every community seen by a search, a dialog scan or a parse is upserted into
+platform_chats with its member count, broadcast/megagroup flags, has-comments
+flag and last verified time. Community search answers from this index first
+(trigram ILIKE on title/username) and only goes to Telegram for cold queries.
+"""
+
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import select, or_, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from ..database import AsyncSessionLocal
+from ..models.platform_chat import PlatformChat
+from ..core.config import Platform
+from ..core.search_cache import normalize_query, transliterate
+
+logger = logging.getLogger(__name__)
+
+# Index entries older than this are not served (re-verified by a live search)
+INDEX_MAX_AGE = timedelta(days=7)
+
+# Fewer local matches than this counts as a cold query
+INDEX_MIN_RESULTS = 10
+
+# Upper bound of communities returned for one query (same order as live search)
+INDEX_SEARCH_LIMIT = 500
+
+
+def _chat_row(community: Dict[str, Any], seen_at: datetime) -> Dict[str, Any]:
+    """Map a community dict (TelegramAdapter search format) to a platform_chats row."""
+    specific = community.get('platform_specific_data') or {}
+    entity_type = specific.get('entity_type', 'channel')
+    if entity_type == 'channel' and specific.get('is_megagroup'):
+        entity_type = 'supergroup'
+    return {
+        'platform': Platform.TELEGRAM,
+        'chat_id': str(community['platform_id']),
+        'username': community.get('username'),
+        'title': community.get('title'),
+        'description': community.get('description'),
+        'chat_type': entity_type,
+        'is_verified': bool(specific.get('verified', False)),
+        'is_private': not community.get('username'),
+        'is_broadcast': bool(specific.get('is_broadcast', False)),
+        'is_megagroup': bool(specific.get('is_megagroup', False)),
+        'has_comments': specific.get('has_comments'),
+        'members_count': community.get('members_count') or 0,
+        'messages_count': 0,
+        'last_verified_at': seen_at,
+        'created_at': seen_at,
+        'updated_at': seen_at
+    }
+
+
+def _community_from_chat(chat: PlatformChat) -> Dict[str, Any]:
+    """Map an index row back to the community dict returned by search."""
+    link = f"https://t.me/{chat.username}" if chat.username else f"https://t.me/c/{chat.chat_id}"
+    return {
+        'platform': chat.platform.value if hasattr(chat.platform, 'value') else str(chat.platform),
+        'platform_id': chat.chat_id,
+        'title': chat.title,
+        'username': chat.username,
+        'description': chat.description,
+        'members_count': chat.members_count or 0,
+        'link': link,
+        'platform_specific_data': {
+            'entity_type': 'group' if chat.chat_type == 'group' else 'channel',
+            'is_megagroup': chat.is_megagroup,
+            'is_broadcast': chat.is_broadcast,
+            'verified': chat.is_verified,
+            'restricted': False,
+            'has_comments': chat.has_comments,
+            'last_verified_at': chat.last_verified_at.isoformat() if chat.last_verified_at else None
+        }
+    }
+
+
+def is_public_community(community: Optional[Dict[str, Any]]) -> bool:
+    """Whether a community may be shared across users (index, search cache): it has a username."""
+    return bool(community and community.get('platform_id') and community.get('username'))
+
+
+async def index_communities(communities: Iterable[Dict[str, Any]]) -> int:
+    """
+    Upsert communities into platform_chats.
+
+    The index is shared by all users, so only public communities (with a
+    username) are stored. Unknown values (has_comments None, zero members,
+    no description) never overwrite what the index already knows.
+    """
+    now = datetime.utcnow()
+    rows = {}
+    for community in communities:
+        if is_public_community(community):
+            rows[str(community['platform_id'])] = _chat_row(community, now)
+    if not rows:
+        return 0
+
+    table = PlatformChat.__table__
+    stmt = pg_insert(table).values(list(rows.values()))
+    excluded = stmt.excluded
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['platform', 'chat_id'],
+        set_={
+            'username': excluded.username,
+            'title': excluded.title,
+            'description': func.coalesce(excluded.description, table.c.description),
+            'chat_type': excluded.chat_type,
+            'is_verified': excluded.is_verified,
+            'is_private': excluded.is_private,
+            'is_broadcast': excluded.is_broadcast,
+            'is_megagroup': excluded.is_megagroup,
+            'has_comments': func.coalesce(excluded.has_comments, table.c.has_comments),
+            'members_count': func.coalesce(func.nullif(excluded.members_count, 0), table.c.members_count),
+            'last_verified_at': excluded.last_verified_at,
+            'updated_at': excluded.updated_at
+        }
+    )
+    try:
+        async with AsyncSessionLocal() as db_session:
+            await db_session.execute(stmt)
+            await db_session.commit()
+    except Exception as e:
+        logger.warning(f"⚠️ Failed to index {len(rows)} communities: {e}")
+        return 0
+    return len(rows)
+
+
+async def search_community_index(query: str, platform: Platform = Platform.TELEGRAM) -> List[Dict[str, Any]]:
+    """
+    Public communities from the index matching the query (or its transliteration)
+    in title or username, with comments, verified within INDEX_MAX_AGE, largest first.
+    """
+    normalized = normalize_query(query)
+    variants = {normalized, transliterate(normalized)}
+    variants.discard('')
+    if not variants:
+        return []
+
+    conditions = []
+    for variant in variants:
+        pattern = f"%{variant}%"
+        conditions.append(PlatformChat.title.ilike(pattern))
+        conditions.append(PlatformChat.username.ilike(pattern))
+
+    stmt = (
+        select(PlatformChat)
+        .where(
+            PlatformChat.platform == platform,
+            PlatformChat.has_comments.is_(True),
+            PlatformChat.is_private.is_(False),
+            PlatformChat.last_verified_at >= datetime.utcnow() - INDEX_MAX_AGE,
+            or_(*conditions)
+        )
+        .order_by(PlatformChat.members_count.desc(), PlatformChat.id)
+        .limit(INDEX_SEARCH_LIMIT)
+    )
+    try:
+        async with AsyncSessionLocal() as db_session:
+            chats = (await db_session.execute(stmt)).scalars().all()
+    except Exception as e:
+        logger.warning(f"⚠️ Community index search failed: {e}")
+        return []
+    return [_community_from_chat(chat) for chat in chats]
+
+
+def community_from_metadata(metadata: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Community dict from a channel/group metadata row emitted by the parser."""
+    data = metadata.get('platform_data') or {}
+    chat_id = data.get('channel_id') or data.get('group_id') or data.get('chat_id')
+    if not chat_id:
+        return None
+    is_channel = metadata.get('content_type') == 'channel_metadata'
+    is_megagroup = bool(data.get('is_megagroup', False))
+    return {
+        'platform_id': str(chat_id),
+        'title': data.get('title'),
+        'username': data.get('username'),
+        'description': (data.get('description') or None) and data['description'][:200],
+        'members_count': data.get('participants_count') or 0,
+        'platform_specific_data': {
+            'entity_type': 'channel' if is_channel else 'group',
+            'is_megagroup': is_megagroup,
+            'is_broadcast': bool(data.get('is_broadcast', False)),
+            'verified': bool(data.get('is_verified', False)),
+            # Groups and megagroups always accept messages; broadcast comments are checked by search
+            'has_comments': True if (not is_channel or is_megagroup) else None
+        }
+    }
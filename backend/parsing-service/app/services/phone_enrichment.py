@@ -0,0 +1,348 @@
+"""
+Deferred phone enrichment of parsed users.
+
+The parser only records phones it gets without an API call (user object,
+UserProfileCache). parse_results rows with author_phone and phone_checked_at
+both NULL form the enrichment queue. PhoneEnrichmentWorker takes a spare
+Account Manager account (purpose "parsing") when no parse task is waiting,
+spends at most `budget` users.getFullUser calls on it and backfills the
+phones with bulk UPDATEs.
+
+An access_hash is only valid for the account that parsed the user, so the
+worker asks for that account and looks up only the rows it can reach: rows
+hashed by the allocated account, or rows with a username. Rows are marked
+checked only when Telegram actually answered for the user.
+"""
+
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from sqlalchemy import select, update, bindparam, case, or_
+from telethon.errors import FloodWaitError, RPCError
+from telethon.tl.types import InputUser
+
+from ..adapters.telegram import ACCESS_HASH_ACCOUNT_KEY
+from ..database import AsyncSessionLocal
+from ..models.parse_result import ParseResult
+from ..models.parse_task import ParseTask
+from ..core.config import Platform, TaskStatus
+from ..core.parsing_speed import ParsingSpeed, get_speed_config
+from ..clients.account_manager_client import AccountManagerClient
+
+logger = logging.getLogger(__name__)
+
+# Queue rows read per query
+ENRICHMENT_BATCH_SIZE = 100
+
+# users.getFullUser calls per allocated account before it is handed back
+ENRICHMENT_BUDGET = 200
+
+# Enrichment never competes with parsing for request rate
+ENRICHMENT_SPEED = ParsingSpeed.SAFE
+
+# Re-check the queue at this interval even without notify()
+IDLE_RECHECK_SECONDS = 300
+
+RELEASE_STATS = {
+    "invites_sent": 0,
+    "messages_sent": 0,
+    "contacts_added": 0,
+    "channels_used": [],
+    "success": True,
+    "error_type": None,
+    "error_message": None
+}
+
+
+def _pending_condition():
+    return (
+        ParseResult.author_id.isnot(None),
+        ParseResult.author_phone.is_(None),
+        ParseResult.phone_checked_at.is_(None)
+    )
+
+
+def _hash_account_column():
+    return ParseResult.raw_data[ACCESS_HASH_ACCOUNT_KEY].as_string()
+
+
+def _reachable_condition(account_id: Optional[str] = None):
+    """Rows account_id can look up, or (account_id=None) rows some account can look up."""
+    if account_id is None:
+        return or_(ParseResult.author_username.isnot(None), _hash_account_column().isnot(None))
+    return or_(ParseResult.author_username.isnot(None), _hash_account_column() == str(account_id))
+
+
+def hash_account_of(row) -> Optional[str]:
+    """Account the row's access_hash belongs to (None for rows parsed before it was recorded)."""
+    account_id = (row.raw_data or {}).get(ACCESS_HASH_ACCOUNT_KEY)
+    return str(account_id) if account_id else None
+
+
+class PhoneEnrichmentWorker:
+    """Background consumer of the phone enrichment queue, one account at a time."""
+
+    def __init__(
+        self,
+        budget: int = ENRICHMENT_BUDGET,
+        batch_size: int = ENRICHMENT_BATCH_SIZE,
+        platform: Platform = Platform.TELEGRAM
+    ):
+        self.budget = budget
+        self.batch_size = batch_size
+        self.platform = platform
+        self.account_manager = AccountManagerClient()
+        self._wakeup = asyncio.Event()
+        self._runner: Optional[asyncio.Task] = None
+        self.lookups = 0
+        # Whether the last run_once spent its whole budget, i.e. the queue may hold more work
+        self._budget_used_up = False
+        self.phones_found = 0
+        self.rows_updated = 0
+
+    def notify(self):
+        """Request an enrichment pass (e.g. a parse task released its account)."""
+        self._wakeup.set()
+
+    async def start(self):
+        self._runner = asyncio.create_task(self._run())
+        logger.info("📞 Phone enrichment worker started")
+
+    async def stop(self):
+        if self._runner:
+            self._runner.cancel()
+            try:
+                await self._runner
+            except asyncio.CancelledError:
+                pass
+            self._runner = None
+
+    async def _run(self):
+        while True:
+            try:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=IDLE_RECHECK_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                await self._drain()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Ошибка в phone enrichment: {e}")
+
+    async def _drain(self):
+        """Run passes back to back while each one uses its full budget; run_once yields to parse tasks."""
+        await self.run_once()
+        while self._budget_used_up:
+            await self.run_once()
+
+    async def _has_pending_tasks(self) -> bool:
+        """Parse tasks waiting for an account take precedence over enrichment."""
+        async with AsyncSessionLocal() as db_session:
+            result = await db_session.execute(
+                select(ParseTask.id)
+                .where(ParseTask.status == TaskStatus.PENDING, ParseTask.platform == self.platform)
+                .limit(1)
+            )
+            return result.scalar_one_or_none() is not None
+
+    async def _next_batch(self, user_id: Optional[int] = None, account_id: Optional[str] = None):
+        stmt = (
+            select(
+                ParseResult.id,
+                ParseResult.task_id,
+                ParseResult.author_id,
+                ParseResult.author_username,
+                ParseResult.raw_data,
+                ParseTask.user_id
+            )
+            .join(ParseTask, ParseResult.task_id == ParseTask.id)
+            .where(*_pending_condition(), _reachable_condition(account_id), ParseResult.platform == self.platform)
+            .order_by(ParseResult.id)
+            .limit(self.batch_size)
+        )
+        if user_id is not None:
+            stmt = stmt.where(ParseTask.user_id == user_id)
+        async with AsyncSessionLocal() as db_session:
+            return (await db_session.execute(stmt)).all()
+
+    async def run_once(self) -> int:
+        """Enrich queued rows on one spare account. Returns the number of rows updated."""
+        self._budget_used_up = False
+        if await self._has_pending_tasks():
+            return 0
+
+        batch = await self._next_batch()
+        if not batch:
+            return 0
+
+        # Rows are enriched for one customer per allocation (accounts are allocated per user),
+        # preferably on the account whose access_hash the oldest queued row carries
+        user_id = batch[0].user_id
+        allocation = await self.account_manager.allocate_account(
+            user_id=user_id or 1,
+            purpose="parsing",
+            timeout_minutes=30,
+            preferred_account_id=hash_account_of(batch[0])
+        )
+        if not allocation:
+            logger.debug("📞 No spare account for phone enrichment")
+            return 0
+
+        from .real_parser import create_allocated_adapter
+
+        account_id = str(allocation['account_id'])
+        adapter = None
+        updated = 0
+        lookups = 0
+        stats = dict(RELEASE_STATS)
+        try:
+            adapter = await create_allocated_adapter(allocation)
+            adapter._configure_rate_limiters(get_speed_config(ENRICHMENT_SPEED))
+
+            batch = await self._next_batch(user_id=user_id, account_id=account_id)
+            while batch and lookups < self.budget:
+                phones, used, flood_wait = await self._lookup_batch(adapter, batch, self.budget - lookups, account_id)
+                lookups += used
+                # Phones fetched before a FloodWait are kept
+                updated += await self._apply(batch, phones)
+                if flood_wait:
+                    raise flood_wait
+
+                # Hand the account back as soon as a parse task is waiting
+                if await self._has_pending_tasks():
+                    break
+                batch = await self._next_batch(user_id=user_id, account_id=account_id)
+        except FloodWaitError as e:
+            logger.warning(f"⏳ Phone enrichment stopped on account {allocation['account_id']}: FloodWait {e.seconds}s")
+            stats.update(success=False, error_type="flood_wait", error_message=str(e))
+        except Exception as e:
+            logger.error(f"❌ Phone enrichment failed on account {allocation['account_id']}: {e}")
+            stats.update(success=False, error_type="unknown_error", error_message=str(e))
+        finally:
+            if adapter:
+                try:
+                    await adapter.cleanup()
+                except Exception as cleanup_error:
+                    logger.warning(f"⚠️ Enrichment adapter cleanup error: {cleanup_error}")
+            await self.account_manager.release_account(allocation['account_id'], usage_stats=stats)
+
+        self.lookups += lookups
+        self._budget_used_up = stats["success"] and lookups >= self.budget
+        if updated:
+            logger.info(f"📞 Phone enrichment: {updated} rows updated with {lookups} lookups on account {allocation['account_id']}")
+        return updated
+
+    async def _lookup_batch(self, adapter, batch, budget: int, account_id: str):
+        """
+        Resolve phones for the distinct authors of a batch on account account_id.
+
+        Returns (author_id -> phone or None for every author that was checked, API calls used,
+        FloodWaitError that stopped the batch or None). Authors left out of the result stay queued.
+        """
+        authors: Dict[str, Any] = {}
+        for row in batch:
+            authors.setdefault(row.author_id, row)
+
+        # Another task may have looked the user up since the row was written
+        cached = await adapter.user_profile_cache.get_many(
+            int(author_id) for author_id in authors if str(author_id).isdigit()
+        )
+
+        phones: Dict[str, Optional[str]] = {}
+        used = 0
+        for author_id, row in authors.items():
+            profile = cached.get(int(author_id)) if str(author_id).isdigit() else None
+            if profile and profile.get("phone_checked"):
+                phones[author_id] = profile.get("phone")
+                continue
+            if used >= budget:
+                break
+
+            used += 1
+            try:
+                checked, phone = await self._lookup_one(adapter, row, account_id)
+            except FloodWaitError as e:
+                return phones, used, e
+            if checked:
+                phones[author_id] = phone
+        return phones, used, None
+
+    async def _lookup_one(self, adapter, row, account_id: str):
+        """
+        users.getFullUser for one queued row: (checked, phone).
+
+        The saved access_hash is used only when account_id parsed the row, then the
+        username is tried. checked=False (row stays queued) when no usable peer exists.
+        """
+        peers = []
+        access_hash = (row.raw_data or {}).get('access_hash')
+        if access_hash and str(row.author_id).isdigit() and hash_account_of(row) == account_id:
+            peers.append(InputUser(int(row.author_id), int(access_hash)))
+        if row.author_username:
+            peers.append(row.author_username)
+
+        checked = False
+        for peer in peers:
+            try:
+                return True, await adapter.fetch_user_phone(peer)
+            except FloodWaitError:
+                raise
+            except (RPCError, ValueError) as e:
+                # Telegram answered for a peer valid on this account: the user is gone or renamed
+                checked = True
+                logger.debug(f"Phone lookup for {row.author_id} via {type(peer).__name__} failed: {e}")
+        return checked, None
+
+    async def _apply(self, batch, phones: Dict[str, Optional[str]]) -> int:
+        """Backfill phones and mark rows checked in bulk, bumping task counters in the same transaction."""
+        checked = [row for row in batch if row.author_id in phones]
+        if not checked:
+            return 0
+
+        table = ParseResult.__table__
+        found = {row.id: phones[row.author_id] for row in checked if phones[row.author_id]}
+        async with AsyncSessionLocal() as db_session:
+            # Counters follow the rows this UPDATE actually changed (another worker may have checked some)
+            updated_rows = (await db_session.execute(
+                update(table)
+                .where(
+                    table.c.id.in_([row.id for row in checked]),
+                    table.c.task_id.in_({row.task_id for row in checked}),
+                    table.c.phone_checked_at.is_(None)
+                )
+                .values(
+                    author_phone=case(found, value=table.c.id, else_=None) if found else None,
+                    phone_checked_at=datetime.utcnow()
+                )
+                .returning(table.c.task_id, table.c.author_phone)
+            )).all()
+
+            new_phones = defaultdict(int)
+            for updated_row in updated_rows:
+                if updated_row.author_phone:
+                    new_phones[updated_row.task_id] += 1
+            if new_phones:
+                await db_session.execute(
+                    update(ParseTask.__table__)
+                    .where(ParseTask.__table__.c.id == bindparam('task_db_id'))
+                    .values(results_with_phone=ParseTask.__table__.c.results_with_phone + bindparam('found')),
+                    [{'task_db_id': task_db_id, 'found': count} for task_db_id, count in new_phones.items()]
+                )
+            await db_session.commit()
+
+        self.rows_updated += len(updated_rows)
+        self.phones_found += sum(new_phones.values())
+        return len(updated_rows)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._runner is not None,
+            "lookups": self.lookups,
+            "phones_found": self.phones_found,
+            "rows_updated": self.rows_updated
+        }
@@ -0,0 +1,121 @@
+"""
+Write-behind persistence of parse task progress.
+
+Progress callbacks fire on every 1% change of every running task; each used to
+be its own SELECT + COMMIT. ProgressWriter keeps the latest progress per task
+in memory and writes all dirty tasks with one batched UPDATE every
+FLUSH_INTERVAL_SECONDS. Final states (completed/failed) are still written
+synchronously by update_task_state; callers flush or discard the buffered
+value of a task first so a late batch never overwrites them (discard waits
+for an in-flight flush).
+"""
+
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import update, bindparam
+
+from ..database import AsyncSessionLocal
+from ..models.parse_task import ParseTask
+
+logger = logging.getLogger(__name__)
+
+# Buffered progress is written at most this often
+FLUSH_INTERVAL_SECONDS = 5
+
+
+class ProgressWriter:
+    """Coalesces per-task progress updates into periodic batched UPDATEs of parse_tasks."""
+
+    def __init__(self, interval: float = FLUSH_INTERVAL_SECONDS):
+        self.interval = interval
+        self._dirty: Dict[str, Tuple[int, datetime]] = {}
+        self._flush_lock = asyncio.Lock()
+        self._runner: Optional[asyncio.Task] = None
+        self.updates_received = 0
+        self.rows_written = 0
+        self.flushes = 0
+
+    def record(self, task_id: str, progress: int):
+        """Buffer the latest progress of a task (newer values replace older ones)."""
+        self._dirty[task_id] = (progress, datetime.utcnow())
+        self.updates_received += 1
+
+    async def discard(self, task_id: str):
+        """
+        Drop buffered progress of a task whose final state is written directly.
+        Waits for a running flush, which may already hold an older value of the task.
+        """
+        async with self._flush_lock:
+            self._dirty.pop(task_id, None)
+
+    async def start(self):
+        self._runner = asyncio.create_task(self._run())
+        logger.info(f"📝 Progress writer started (flush every {self.interval}s)")
+
+    async def stop(self):
+        if self._runner:
+            self._runner.cancel()
+            try:
+                await self._runner
+            except asyncio.CancelledError:
+                pass
+            self._runner = None
+        # Nothing buffered is lost on shutdown
+        await self.flush()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.sleep(self.interval)
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Ошибка записи прогресса задач: {e}")
+
+    async def flush(self, task_id: Optional[str] = None) -> int:
+        """Write buffered progress of all dirty tasks (or only `task_id`) in one UPDATE."""
+        async with self._flush_lock:
+            if task_id is not None:
+                pending = {task_id: self._dirty.pop(task_id)} if task_id in self._dirty else {}
+            else:
+                pending, self._dirty = self._dirty, {}
+            if not pending:
+                return 0
+
+            table = ParseTask.__table__
+            rows = [
+                {'key': key, 'progress': progress, 'seen_at': seen_at}
+                for key, (progress, seen_at) in pending.items()
+            ]
+            try:
+                async with AsyncSessionLocal() as db_session:
+                    await db_session.execute(
+                        update(table)
+                        .where(table.c.task_id == bindparam('key'))
+                        .values(progress=bindparam('progress'), updated_at=bindparam('seen_at')),
+                        rows
+                    )
+                    await db_session.commit()
+            except Exception as e:
+                # Keep the values for the next flush unless newer ones arrived meanwhile
+                for key, value in pending.items():
+                    self._dirty.setdefault(key, value)
+                logger.warning(f"⚠️ Progress flush of {len(rows)} tasks failed: {e}")
+                return 0
+
+            self.rows_written += len(rows)
+            self.flushes += 1
+            return len(rows)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._runner is not None,
+            "dirty_tasks": len(self._dirty),
+            "updates_received": self.updates_received,
+            "rows_written": self.rows_written,
+            "flushes": self.flushes
+        }
@@ -5,7 +5,7 @@ Real Telegram parsing service - NO MOCK DATA, only real parsing results.
 import logging
 import asyncio
 import aiohttp
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Union
 from datetime import datetime
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -14,8 +14,9 @@ from ..models.parse_result import ParseResult
 from ..models.parse_task import ParseTask
 from ..core.config import Platform
 from ..core.vault import get_vault_client
-from ..adapters.telegram import TelegramAdapter
-from sqlalchemy import select
+from ..adapters.telegram import TelegramAdapter, ParseCheckpoint
+from .result_writer import ParseResultWriter
+from sqlalchemy import select, update
 
 logger = logging.getLogger(__name__)
 
@@ -41,61 +42,75 @@ async def get_task_db_id(task_id: str, db_session: AsyncSession) -> Optional[int
 
 
 async def save_parsing_results(task_id: str, results: List[Dict]):
-    """Save parsing results to database."""
+    """Save parsing results to database in chunked multi-row inserts."""
     try:
-        async with AsyncSessionLocal() as db_session:
-            # Get task database ID
-            task_db_id = await get_task_db_id(task_id, db_session)
-            if not task_db_id:
-                logger.error(f"❌ Task {task_id} not found in database, cannot save results")
+        async with ParseResultWriter(task_id) as writer:
+            if not writer.task_db_id:
                 return 0
-            
-            results_saved = 0
-            
-            for result_data in results:
-                try:
-                    # Create ParseResult from TelegramAdapter data
-                    result = ParseResult(
-                        task_id=task_db_id,
-                        platform=result_data.get('platform', Platform.TELEGRAM),
-                        source_id=result_data.get('source_id', 'unknown'),
-                        source_name=result_data.get('source_name', 'unknown'),
-                        source_type=result_data.get('source_type', 'channel'),
-                        content_id=result_data.get('content_id', 'unknown'),
-                        content_type=result_data.get('content_type', 'user'),
-                        content_text=result_data.get('content_text', ''),
-                        author_id=result_data.get('author_id'),
-                        author_username=result_data.get('author_username'),
-                        author_name=result_data.get('author_name', ''),
-                        author_phone=result_data.get('author_phone'),
-                        content_created_at=result_data.get('content_created_at') or datetime.utcnow(),
-                        views_count=result_data.get('views_count', 0),
-                        has_media=result_data.get('has_media', False),
-                        media_count=result_data.get('media_count', 0),
-                        media_types=result_data.get('media_types', []),
-                        is_forwarded=result_data.get('is_forwarded', False),
-                        is_reply=result_data.get('is_reply', False),
-                        platform_data=result_data.get('platform_data', {}),
-                        raw_data=result_data.get('raw_data', {}),
-                        created_at=datetime.utcnow()
-                    )
-                    
-                    db_session.add(result)
-                    results_saved += 1
-                    
-                except Exception as e:
-                    logger.error(f"❌ Error saving individual result: {e}")
-                    continue
-            
-            await db_session.commit()
-            logger.info(f"💾 Saved {results_saved} parsing results to database")
-            return results_saved
+            await writer.write(results)
+        
+        logger.info(f"💾 Saved {writer.rows_written} parsing results to database")
+        return writer.rows_written
             
     except Exception as e:
         logger.error(f"❌ Error saving parsing results: {e}")
         return 0
 
 
+async def load_parse_checkpoint(task_db_id: Optional[int], resume_data: Optional[Dict]) -> ParseCheckpoint:
+    """Restore the streaming checkpoint of a task, rebuilding seen users from saved results."""
+    if not task_db_id or not resume_data:
+        return ParseCheckpoint()
+    
+    try:
+        async with AsyncSessionLocal() as db_session:
+            stmt = select(ParseResult.author_id).where(
+                ParseResult.task_id == task_db_id,
+                ParseResult.author_id.isnot(None)
+            )
+            result = await db_session.execute(stmt)
+            seen_user_ids = {int(author_id) for author_id in result.scalars() if str(author_id).isdigit()}
+        
+        checkpoint = ParseCheckpoint.from_resume_data(resume_data, seen_user_ids)
+        logger.info(f"♻️ Loaded checkpoint for task DB ID {task_db_id}: message {checkpoint.last_message_id}, {len(seen_user_ids)} users already saved")
+        return checkpoint
+        
+    except Exception as e:
+        logger.error(f"❌ Error loading checkpoint for task DB ID {task_db_id}: {e}")
+        return ParseCheckpoint()
+
+
+async def save_parse_checkpoint(task_db_id: int, checkpoint: Union[ParseCheckpoint, Dict, None]):
+    """Persist the streaming checkpoint (or ready resume_data dict) to ParseTask.resume_data (None clears it)."""
+    if isinstance(checkpoint, ParseCheckpoint):
+        resume_data = checkpoint.to_resume_data()
+    else:
+        resume_data = checkpoint
+    
+    try:
+        async with AsyncSessionLocal() as db_session:
+            await db_session.execute(
+                update(ParseTask)
+                .where(ParseTask.id == task_db_id)
+                .values(resume_data=resume_data)
+            )
+            await db_session.commit()
+    except Exception as e:
+        logger.error(f"❌ Error saving checkpoint for task DB ID {task_db_id}: {e}")
+
+
+async def create_allocated_adapter(allocation: Dict) -> TelegramAdapter:
+    """Create a TelegramAdapter authenticated with an account allocated by Account Manager."""
+    adapter = TelegramAdapter()
+    vault_client = get_vault_client()
+    api_keys = vault_client.get_secret("integration-service")
+    api_id = api_keys.get("telegram_api_id")
+    api_hash = api_keys.get("telegram_api_hash")
+    if not await adapter.authenticate_with_allocation(allocation, api_id=api_id, api_hash=api_hash):
+        raise Exception(f"Failed to authenticate with pre-allocated account {allocation.get('account_id')}")
+    return adapter
+
+
 async def perform_real_parsing(task_id: str, platform: str, link: str, user_id: int = 1):
     """Perform REAL Telegram parsing using actual integration-service accounts."""
     return await perform_real_parsing_with_progress(task_id, platform, link, user_id, None)
@@ -109,7 +124,8 @@ async def perform_real_parsing_with_progress(
     progress_callback=None,
     message_limit: int = 100,
     speed_config=None,  # New parameter for parsing speed configuration
-    allocated_account: Optional[Dict] = None  # Уже выделенный аккаунт от main (без повторного allocate)
+    allocated_account: Optional[Dict] = None,  # Уже выделенный аккаунт от main (без повторного allocate)
+    shard_accounts: int = 1  # >1: делим большой канал по диапазонам сообщений между несколькими аккаунтами
 ) -> int:
     """
     ГЛАВНАЯ функция парсинга - оркестрирует весь процесс:
@@ -118,7 +134,8 @@ async def perform_real_parsing_with_progress(
     2. Создание и настройка Platform Adapter
     3. Аутентификация с платформой
     4. Парсинг с real-time progress callbacks и speed configuration
-    5. Сохранение результатов в PostgreSQL
+       (shard_accounts > 1: параллельно на нескольких аккаунтах, см. sharded_parser)
+    5. Потоковое сохранение батчей в PostgreSQL с checkpoint'ом в resume_data
     6. Cleanup всех ресурсов
     """
     
@@ -128,17 +145,11 @@ async def perform_real_parsing_with_progress(
         logger.info(f"🚀 Starting REAL parsing for task {task_id}: {link} (USER LIMIT: {message_limit})")
     
     try:
-        adapter = TelegramAdapter()
-        
         if allocated_account:
             # Используем уже выделенный main'ом аккаунт — без повторного allocate
-            vault_client = get_vault_client()
-            api_keys = vault_client.get_secret("integration-service")
-            api_id = api_keys.get("telegram_api_id")
-            api_hash = api_keys.get("telegram_api_hash")
-            if not await adapter.authenticate_with_allocation(allocated_account, api_id=api_id, api_hash=api_hash):
-                raise Exception(f"Failed to authenticate with pre-allocated account {allocated_account.get('account_id')}")
+            adapter = await create_allocated_adapter(allocated_account)
         else:
+            adapter = TelegramAdapter()
             # Legacy: получаем аккаунты и выделяем через Account Manager
             accounts = await get_real_telegram_accounts()
             if not accounts:
@@ -182,23 +193,55 @@ async def perform_real_parsing_with_progress(
                 # Create minimal task object for compatibility
                 task = type('Task', (), {'id': 1, 'task_id': task_id})()
         
+        # Resume from the last saved checkpoint if the task was interrupted
+        checkpoint = await load_parse_checkpoint(task_db_id, getattr(task, 'resume_data', None))
+        
+        if shard_accounts > 1 and allocated_account:
+            from .sharded_parser import perform_sharded_parsing
+            
+            sharded_count = await perform_sharded_parsing(
+                task_id=task_id,
+                task=task,
+                task_db_id=task_db_id,
+                link=link,
+                primary_adapter=adapter,
+                user_id=user_id,
+                extra_accounts=shard_accounts - 1,
+                checkpoint=checkpoint,
+                progress_callback=progress_callback,
+                message_limit=message_limit,
+                speed_config=speed_config
+            )
+            if sharded_count is not None:
+                await adapter.cleanup()
+                return sharded_count
+            logger.info(f"🧩 Sharding not applicable for {link}, parsing on a single account")
+        
         # Create config dictionary for adapter
         config = {
             'message_limit': message_limit,
             'progress_callback': progress_callback,
-            'speed_config': speed_config
+            'speed_config': speed_config,
+            'checkpoint': checkpoint
         }
         
-        results = await adapter.parse_target(task, link, config)
+        # Step 6: Stream batches to PostgreSQL while parsing runs, checkpointing after each one
+        async with ParseResultWriter(task_id) as writer:
+            async for batch in adapter.iter_target_batches(task, link, config):
+                await writer.write(batch)
+                await writer.flush()
+                if task_db_id:
+                    await save_parse_checkpoint(task_db_id, checkpoint)
+        # Rows actually inserted: re-sent rows dropped by ON CONFLICT are not results
+        result_count = writer.rows_written
         
-        # Step 6: Save results to PostgreSQL database
-        if results:
-            await save_parsing_results(task_id, results)
+        # Parse finished - nothing left to resume
+        if task_db_id:
+            await save_parse_checkpoint(task_db_id, None)
         
         # Step 7: Cleanup resources
         await adapter.cleanup()
         
-        result_count = len(results) if results else 0
         if speed_config:
             logger.info(f"✅ REAL parsing completed with {speed_config.name} speed: {result_count} results")
         else:
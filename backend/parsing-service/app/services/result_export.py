@@ -0,0 +1,416 @@
+"""
+Streaming export of parse results.
+
+Rows are read page by page with keyset pagination on (created_at, id) and
+serialized as they arrive (JSON array, NDJSON or CSV), optionally gzipped on
+the fly, so memory stays flat regardless of the number of results.
+
+Columnar formats (Parquet, Arrow IPC) are written batch by batch with typed
+columns and platform_data flattened into its own columns; they need pyarrow.
+"""
+
+import asyncio
+import csv
+import io
+import json
+import logging
+import tempfile
+import zlib
+from typing import Any, AsyncGenerator, AsyncIterator, Dict, List, Optional, Tuple
+
+from sqlalchemy import select, func, text, tuple_
+
+from ..database import AsyncSessionLocal
+from ..models.parse_result import ParseResult
+
+logger = logging.getLogger(__name__)
+
+EXPORT_PAGE_SIZE = 2000
+
+# Bytes accumulated before a chunk is sent to the client
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+CSV_BASE_FIELDS = [
+    "id", "task_id", "platform", "platform_id", "username",
+    "display_name", "author_phone", "created_at"
+]
+
+# format -> (media type, file extension)
+STREAMING_FORMATS = {
+    "json": ("application/json", "json"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv", "csv"),
+}
+
+# Only the columns the export needs; content_text is only used as a display-name fallback
+EXPORT_COLUMNS = (
+    ParseResult.id,
+    ParseResult.task_id,
+    ParseResult.platform,
+    ParseResult.author_id,
+    ParseResult.content_id,
+    ParseResult.author_username,
+    ParseResult.author_name,
+    func.left(ParseResult.content_text, 50).label("content_text"),
+    ParseResult.author_phone,
+    ParseResult.created_at,
+    ParseResult.platform_data,
+)
+
+
+def format_export_row(row) -> Dict[str, Any]:
+    """Format a result row for export (same shape as the results API)."""
+    return {
+        "id": str(row.id),
+        "task_id": str(row.task_id),
+        "platform": row.platform.value if hasattr(row.platform, 'value') else str(row.platform),
+        "platform_id": row.author_id or row.content_id,
+        "username": row.author_username,
+        "display_name": row.author_name or row.content_text[:50] if row.content_text else "Unknown",
+        "author_phone": row.author_phone,
+        "created_at": row.created_at.isoformat() if row.created_at else None,
+        "platform_specific_data": row.platform_data or {}
+    }
+
+
+async def has_results(task_db_id: int) -> bool:
+    async with AsyncSessionLocal() as db_session:
+        result = await db_session.execute(
+            select(ParseResult.id).where(ParseResult.task_id == task_db_id).limit(1)
+        )
+        return result.first() is not None
+
+
+async def iter_result_rows(
+    task_db_id: int,
+    page_size: int = EXPORT_PAGE_SIZE,
+    columns: Tuple = EXPORT_COLUMNS
+) -> AsyncGenerator[Any, None]:
+    """Yield raw result rows of a task, newest first, using keyset pagination on (created_at, id)."""
+    last_key: Optional[Tuple] = None
+    while True:
+        stmt = select(*columns).where(ParseResult.task_id == task_db_id)
+        if last_key is not None:
+            stmt = stmt.where(tuple_(ParseResult.created_at, ParseResult.id) < tuple_(*last_key))
+        stmt = stmt.order_by(ParseResult.created_at.desc(), ParseResult.id.desc()).limit(page_size)
+
+        # Short session per page: no transaction is held open while the client reads
+        async with AsyncSessionLocal() as db_session:
+            rows = (await db_session.execute(stmt)).all()
+
+        for row in rows:
+            yield row
+
+        if len(rows) < page_size:
+            return
+        last_key = (rows[-1].created_at, rows[-1].id)
+
+
+async def iter_export_rows(task_db_id: int, page_size: int = EXPORT_PAGE_SIZE) -> AsyncGenerator[Dict[str, Any], None]:
+    """Yield formatted export rows of a task page by page."""
+    async for row in iter_result_rows(task_db_id, page_size):
+        yield format_export_row(row)
+
+
+async def get_platform_data_keys(task_db_id: int) -> List[str]:
+    """Distinct platform_data keys of a task (CSV columns), computed in the database."""
+    async with AsyncSessionLocal() as db_session:
+        result = await db_session.execute(
+            text(
+                "SELECT DISTINCT jsonb_object_keys(platform_data::jsonb) AS key "
+                "FROM parse_results "
+                "WHERE task_id = :task_id AND jsonb_typeof(platform_data::jsonb) = 'object'"
+            ),
+            {"task_id": task_db_id}
+        )
+        return sorted(result.scalars().all())
+
+
+async def _json_array_chunks(rows: AsyncIterator[Dict[str, Any]]) -> AsyncGenerator[str, None]:
+    yield "["
+    first = True
+    async for row in rows:
+        yield ("\n" if first else ",\n") + json.dumps(row, ensure_ascii=False, indent=2)
+        first = False
+    yield "\n]" if not first else "]"
+
+
+async def _ndjson_chunks(rows: AsyncIterator[Dict[str, Any]]) -> AsyncGenerator[str, None]:
+    async for row in rows:
+        yield json.dumps(row, ensure_ascii=False) + "\n"
+
+
+async def _csv_chunks(rows: AsyncIterator[Dict[str, Any]], specific_keys: List[str]) -> AsyncGenerator[str, None]:
+    fieldnames = sorted(CSV_BASE_FIELDS + [f"specific_{k}" for k in specific_keys])
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fieldnames=fieldnames, extrasaction='ignore')
+    writer.writeheader()
+
+    async for result in rows:
+        flat_result = {
+            "id": result["id"],
+            "task_id": result["task_id"],
+            "platform": result["platform"],
+            "platform_id": result["platform_id"],
+            "username": result.get("username", ""),
+            "display_name": result.get("display_name", ""),
+            "author_phone": result.get("author_phone", ""),
+            "created_at": result["created_at"],
+        }
+
+        # Add platform-specific data as separate columns
+        specific = result.get("platform_specific_data")
+        if isinstance(specific, dict):
+            for k, v in specific.items():
+                flat_result[f"specific_{k}"] = str(v) if v is not None else ""
+
+        writer.writerow(flat_result)
+        if output.tell() >= EXPORT_CHUNK_BYTES:
+            yield output.getvalue()
+            output.seek(0)
+            output.truncate(0)
+
+    yield output.getvalue()
+
+
+async def _encode(chunks: AsyncIterator[str]) -> AsyncGenerator[bytes, None]:
+    """Encode text chunks and coalesce them into EXPORT_CHUNK_BYTES pieces."""
+    buffer = bytearray()
+    async for chunk in chunks:
+        buffer += chunk.encode('utf-8')
+        if len(buffer) >= EXPORT_CHUNK_BYTES:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+
+async def gzip_stream(chunks: AsyncIterator[bytes]) -> AsyncGenerator[bytes, None]:
+    """Gzip a byte stream on the fly."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+async def stream_export(task_db_id: int, format: str, gzip: bool = False) -> AsyncGenerator[bytes, None]:
+    """Byte stream of all results of a task in a STREAMING_FORMATS format."""
+    format = format.lower()
+    rows = iter_export_rows(task_db_id)
+
+    if format == "json":
+        chunks = _json_array_chunks(rows)
+    elif format == "ndjson":
+        chunks = _ndjson_chunks(rows)
+    elif format == "csv":
+        chunks = _csv_chunks(rows, await get_platform_data_keys(task_db_id))
+    else:
+        raise ValueError(f"Unsupported streaming format: {format}")
+
+    stream = _encode(chunks)
+    if gzip:
+        stream = gzip_stream(stream)
+
+    async for chunk in stream:
+        yield chunk
+
+
+def export_headers(task_id: str, format: str, gzip: bool = False) -> Tuple[str, Dict[str, str]]:
+    """Media type and Content-Disposition headers for an export download."""
+    media_type, extension = STREAMING_FORMATS[format.lower()]
+    filename = f"parsing_results_{task_id}.{extension}"
+    if gzip:
+        media_type = "application/gzip"
+        filename += ".gz"
+    return media_type, {"Content-Disposition": f"attachment; filename={filename}"}
+
+
+# ---------------------------------------------------------------------------
+# Columnar export (Parquet / Arrow IPC)
+# ---------------------------------------------------------------------------
+
+# format -> (media type, file extension)
+COLUMNAR_FORMATS = {
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.file", "arrow"),
+}
+
+# Rows per Parquet row group / Arrow record batch
+COLUMNAR_BATCH_ROWS = 50000
+
+COLUMNAR_COLUMNS = (
+    ParseResult.id,
+    ParseResult.task_id,
+    ParseResult.platform,
+    ParseResult.source_id,
+    ParseResult.source_name,
+    ParseResult.source_type,
+    ParseResult.content_id,
+    ParseResult.content_type,
+    ParseResult.author_id,
+    ParseResult.author_username,
+    ParseResult.author_name,
+    ParseResult.author_phone,
+    ParseResult.views_count,
+    ParseResult.reactions_count,
+    ParseResult.comments_count,
+    ParseResult.content_created_at,
+    ParseResult.created_at,
+    ParseResult.platform_data,
+)
+
+# platform_data key -> arrow type name; keys not listed here stay in the JSON columns of the DB
+PLATFORM_DATA_FIELDS = {
+    "user_type": "dictionary",
+    "first_name": "string",
+    "last_name": "string",
+    "is_bot": "bool",
+    "is_verified": "bool",
+    "is_premium": "bool",
+    "language_code": "dictionary",
+    "chat_id": "int64",
+    "participants_count": "int64",
+    "is_broadcast": "bool",
+    "is_megagroup": "bool",
+}
+
+
+def _to_int(value) -> Optional[int]:
+    if value is None:
+        return None
+    if isinstance(value, int):
+        return value
+    value = str(value)
+    return int(value) if value.lstrip('-').isdigit() else None
+
+
+def _to_bool(value) -> Optional[bool]:
+    return None if value is None else bool(value)
+
+
+def _columnar_schema(dictionary_encode: bool = True):
+    """
+    Typed schema of the columnar export.
+
+    Low-cardinality columns are dictionary-encoded for Parquet only: the Arrow
+    IPC file format cannot replace a dictionary between batches, and every
+    batch carries its own dictionary, so Arrow gets plain string columns.
+    """
+    import pyarrow as pa
+
+    dictionary = pa.dictionary(pa.int32(), pa.string()) if dictionary_encode else pa.string()
+    types = {"string": pa.string(), "dictionary": dictionary, "int64": pa.int64(), "bool": pa.bool_()}
+
+    fields = [
+        pa.field("id", pa.int64()),
+        pa.field("task_id", pa.int64()),
+        pa.field("platform", dictionary),
+        pa.field("source_id", dictionary),
+        pa.field("source_name", dictionary),
+        pa.field("source_type", dictionary),
+        pa.field("content_id", pa.string()),
+        pa.field("content_type", dictionary),
+        pa.field("author_id", pa.int64()),
+        pa.field("username", pa.string()),
+        pa.field("display_name", pa.string()),
+        pa.field("author_phone", pa.string()),
+        pa.field("views_count", pa.int64()),
+        pa.field("reactions_count", pa.int64()),
+        pa.field("comments_count", pa.int64()),
+        pa.field("content_created_at", pa.timestamp("us")),
+        pa.field("created_at", pa.timestamp("us")),
+    ]
+    fields += [pa.field(f"pd_{key}", types[kind]) for key, kind in PLATFORM_DATA_FIELDS.items()]
+    return pa.schema(fields)
+
+
+def _rows_to_columns(rows: List[Any]) -> Dict[str, List[Any]]:
+    """Transpose DB rows into typed column lists."""
+    columns: Dict[str, List[Any]] = {
+        "id": [r.id for r in rows],
+        "task_id": [r.task_id for r in rows],
+        "platform": [r.platform.value if hasattr(r.platform, 'value') else r.platform for r in rows],
+        "source_id": [r.source_id for r in rows],
+        "source_name": [r.source_name for r in rows],
+        "source_type": [r.source_type for r in rows],
+        "content_id": [r.content_id for r in rows],
+        "content_type": [r.content_type for r in rows],
+        "author_id": [_to_int(r.author_id) for r in rows],
+        "username": [r.author_username for r in rows],
+        "display_name": [r.author_name for r in rows],
+        "author_phone": [r.author_phone for r in rows],
+        "views_count": [r.views_count for r in rows],
+        "reactions_count": [r.reactions_count for r in rows],
+        "comments_count": [r.comments_count for r in rows],
+        "content_created_at": [r.content_created_at for r in rows],
+        "created_at": [r.created_at for r in rows],
+    }
+
+    platform_data = [r.platform_data if isinstance(r.platform_data, dict) else {} for r in rows]
+    for key, kind in PLATFORM_DATA_FIELDS.items():
+        values = [data.get(key) for data in platform_data]
+        if kind == "int64":
+            values = [_to_int(v) for v in values]
+        elif kind == "bool":
+            values = [_to_bool(v) for v in values]
+        else:
+            values = [None if v is None else str(v) for v in values]
+        columns[f"pd_{key}"] = values
+    return columns
+
+
+async def stream_columnar_export(task_db_id: int, format: str) -> AsyncGenerator[bytes, None]:
+    """
+    Parquet / Arrow IPC file of all results of a task.
+
+    Batches are written to a spooled temporary file (the Parquet footer and the
+    Arrow file index are only known at the end) and then streamed in chunks.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    format = format.lower()
+    schema = _columnar_schema(dictionary_encode=(format == "parquet"))
+
+    with tempfile.SpooledTemporaryFile(max_size=16 * 1024 * 1024) as sink:
+        if format == "parquet":
+            writer = pq.ParquetWriter(sink, schema, compression="zstd")
+        elif format == "arrow":
+            writer = pa.ipc.new_file(sink, schema, options=pa.ipc.IpcWriteOptions(compression="zstd"))
+        else:
+            raise ValueError(f"Unsupported columnar format: {format}")
+
+        async def write_rows(rows: List[Any]):
+            batch = pa.RecordBatch.from_pydict(_rows_to_columns(rows), schema=schema)
+            # Encoding/compression is CPU-bound - keep it off the event loop
+            if format == "parquet":
+                await asyncio.to_thread(writer.write_table, pa.Table.from_batches([batch]))
+            else:
+                await asyncio.to_thread(writer.write_batch, batch)
+
+        try:
+            pending: List[Any] = []
+            async for row in iter_result_rows(task_db_id, columns=COLUMNAR_COLUMNS):
+                pending.append(row)
+                if len(pending) >= COLUMNAR_BATCH_ROWS:
+                    await write_rows(pending)
+                    pending = []
+            if pending:
+                await write_rows(pending)
+        finally:
+            writer.close()
+
+        sink.seek(0)
+        while True:
+            chunk = sink.read(EXPORT_CHUNK_BYTES)
+            if not chunk:
+                break
+            yield chunk
+
+
+def columnar_export_headers(task_id: str, format: str) -> Tuple[str, Dict[str, str]]:
+    """Media type and Content-Disposition headers for a Parquet/Arrow download."""
+    media_type, extension = COLUMNAR_FORMATS[format.lower()]
+    return media_type, {"Content-Disposition": f"attachment; filename=parsing_results_{task_id}.{extension}"}
@@ -0,0 +1,236 @@
+"""
+Partition maintenance and retention of parse_results.
+
+parse_results is partitioned by RANGE (task_id) (migration 010): the dedupe key
+(task_id, source_id, author_id) must contain the partition key, and every
+export/result query filters by task_id, so it touches a single partition.
+Task ids grow with time, so old partitions hold old tasks only.
+
+ResultPartitionMaintainer keeps partitions created ahead of the newest task
+(rows of tasks beyond them land in parse_results_default and are moved into
+the range partition once it is created) and, when
+PARSE_RESULTS_RETENTION_DAYS is set, detaches or drops partitions whose tasks
+are all finished and older than the retention period - one DDL statement per
+partition instead of row-by-row DELETEs.
+"""
+
+import asyncio
+import logging
+import re
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import text, bindparam
+
+from ..database import AsyncSessionLocal
+from ..core.config import settings, TaskStatus
+
+logger = logging.getLogger(__name__)
+
+PARENT_TABLE = "parse_results"
+PARTITION_PREFIX = "parse_results_t"
+ARCHIVE_PREFIX = "parse_results_archive_t"
+DEFAULT_PARTITION = "parse_results_default"
+
+# Partitions kept ready beyond the newest task id
+PARTITIONS_AHEAD = 2
+
+# Maintenance pass interval
+MAINTENANCE_INTERVAL_SECONDS = 600
+
+# Tasks in these states keep their partition attached (taskstatus enum labels are lowercase)
+ACTIVE_STATUSES = tuple(s.value for s in (TaskStatus.PENDING, TaskStatus.RUNNING, TaskStatus.PAUSED, TaskStatus.WAITING))
+
+_BOUNDS_RE = re.compile(r"FROM \('?(\d+)'?\) TO \('?(\d+)'?\)")
+
+
+def partition_name(lower: int) -> str:
+    return f"{PARTITION_PREFIX}{lower}"
+
+
+async def list_partitions(db_session) -> List[Tuple[str, int, int]]:
+    """Attached range partitions of parse_results as (name, lower, upper), ordered by lower bound."""
+    rows = (await db_session.execute(text(
+        """
+        SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = CAST(:parent AS regclass)
+        """
+    ), {"parent": PARENT_TABLE})).all()
+
+    partitions = []
+    for name, bound in rows:
+        match = _BOUNDS_RE.search(bound or "")
+        if match:
+            partitions.append((name, int(match.group(1)), int(match.group(2))))
+    return sorted(partitions, key=lambda p: p[1])
+
+
+async def _create_partition_from_default(db_session, lower: int, upper: int) -> int:
+    """
+    Create the [lower, upper) partition when parse_results_default already holds rows
+    of that range: detach the default partition, create the range partition, move the
+    rows into it and attach the default back - all in one transaction. Returns rows moved.
+    """
+    name = partition_name(lower)
+    await db_session.execute(text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {DEFAULT_PARTITION}"))
+    await db_session.execute(text(
+        f"CREATE TABLE {name} PARTITION OF {PARENT_TABLE} FOR VALUES FROM ({lower}) TO ({upper})"
+    ))
+    moved = (await db_session.execute(text(
+        f"""
+        WITH moved AS (
+            DELETE FROM {DEFAULT_PARTITION}
+            WHERE task_id >= :lower AND task_id < :upper
+            RETURNING *
+        )
+        INSERT INTO {name} SELECT * FROM moved
+        """
+    ), {"lower": lower, "upper": upper})).rowcount
+    await db_session.execute(text(f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT"))
+    await db_session.commit()
+    return moved
+
+
+async def ensure_partitions(span: Optional[int] = None, ahead: int = PARTITIONS_AHEAD) -> int:
+    """Create range partitions up to `ahead` spans past the newest task id. Returns partitions created."""
+    span = max(1, span or settings.PARSE_RESULTS_PARTITION_TASKS)
+    created = 0
+    async with AsyncSessionLocal() as db_session:
+        partitions = await list_partitions(db_session)
+        max_task_id = (await db_session.execute(text("SELECT coalesce(max(id), 0) FROM parse_tasks"))).scalar()
+        lower = partitions[-1][2] if partitions else (max_task_id // span) * span
+        target = max_task_id + ahead * span
+
+        while lower <= target:
+            upper = lower + span
+            try:
+                await db_session.execute(text(
+                    f"CREATE TABLE IF NOT EXISTS {partition_name(lower)} "
+                    f"PARTITION OF {PARENT_TABLE} FOR VALUES FROM ({lower}) TO ({upper})"
+                ))
+                await db_session.commit()
+            except Exception as e:
+                # Rows of this range are already in parse_results_default
+                await db_session.rollback()
+                logger.warning(f"⚠️ Partition {partition_name(lower)} [{lower}, {upper}) overlaps default rows, moving them: {e}")
+                try:
+                    moved = await _create_partition_from_default(db_session, lower, upper)
+                    logger.info(f"🗂️ parse_results: moved {moved} rows from {DEFAULT_PARTITION} to {partition_name(lower)}")
+                except Exception as move_error:
+                    await db_session.rollback()
+                    logger.error(
+                        f"❌ Cannot create partition {partition_name(lower)} for task ids [{lower}, {upper}), "
+                        f"their rows stay in {DEFAULT_PARTITION}: {move_error}"
+                    )
+                    break
+            created += 1
+            lower = upper
+
+    if created:
+        logger.info(f"🗂️ parse_results: created {created} partitions (task ids up to {lower})")
+    return created
+
+
+async def apply_retention(
+    days: Optional[int] = None,
+    action: Optional[str] = None
+) -> List[str]:
+    """
+    Detach or drop partitions whose tasks are all finished and created more than
+    `days` ago. Counters of the affected tasks are reset. Returns partition names.
+    """
+    days = days if days is not None else settings.PARSE_RESULTS_RETENTION_DAYS
+    action = (action or settings.PARSE_RESULTS_RETENTION_ACTION).lower()
+    if not days:
+        return []
+    if action not in ("detach", "drop"):
+        raise ValueError(f"Unknown retention action: {action}")
+
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    removed = []
+    async with AsyncSessionLocal() as db_session:
+        max_task_id = (await db_session.execute(text("SELECT coalesce(max(id), 0) FROM parse_tasks"))).scalar()
+        for name, lower, upper in await list_partitions(db_session):
+            # Only closed ranges: new tasks can still get ids in the newest partition
+            if upper - 1 > max_task_id:
+                break
+            blocking = (await db_session.execute(text(
+                """
+                SELECT count(*) FROM parse_tasks
+                WHERE id >= :lower AND id < :upper
+                  AND (created_at >= :cutoff OR lower(CAST(status AS text)) IN :active)
+                """
+            ).bindparams(bindparam("active", expanding=True)), {
+                "lower": lower, "upper": upper, "cutoff": cutoff, "active": list(ACTIVE_STATUSES)
+            })).scalar()
+            if blocking:
+                # Partitions are ordered by task id, newer ones are not older than this one
+                break
+
+            if action == "drop":
+                await db_session.execute(text(f"DROP TABLE {name}"))
+            else:
+                await db_session.execute(text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}"))
+                await db_session.execute(text(f"ALTER TABLE {name} RENAME TO {ARCHIVE_PREFIX}{lower}"))
+            await db_session.execute(text(
+                """
+                UPDATE parse_tasks
+                SET result_count = 0, results_with_username = 0, results_with_phone = 0
+                WHERE id >= :lower AND id < :upper
+                """
+            ), {"lower": lower, "upper": upper})
+            await db_session.commit()
+            removed.append(name)
+            logger.info(f"🧹 parse_results: {action} partition {name} (tasks {lower}-{upper - 1}, older than {days} days)")
+    return removed
+
+
+class ResultPartitionMaintainer:
+    """Background loop creating parse_results partitions ahead and applying retention."""
+
+    def __init__(self, interval: float = MAINTENANCE_INTERVAL_SECONDS):
+        self.interval = interval
+        self._runner: Optional[asyncio.Task] = None
+        self.partitions_created = 0
+        self.partitions_removed = 0
+        self.last_run_at: Optional[datetime] = None
+
+    async def start(self):
+        self._runner = asyncio.create_task(self._run())
+        logger.info("🗂️ parse_results partition maintainer started")
+
+    async def stop(self):
+        if self._runner:
+            self._runner.cancel()
+            try:
+                await self._runner
+            except asyncio.CancelledError:
+                pass
+            self._runner = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.run_once()
+                await asyncio.sleep(self.interval)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Ошибка обслуживания партиций parse_results: {e}")
+                await asyncio.sleep(self.interval)
+
+    async def run_once(self):
+        self.partitions_created += await ensure_partitions()
+        self.partitions_removed += len(await apply_retention())
+        self.last_run_at = datetime.utcnow()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._runner is not None,
+            "partitions_created": self.partitions_created,
+            "partitions_removed": self.partitions_removed,
+            "retention_days": settings.PARSE_RESULTS_RETENTION_DAYS,
+            "last_run_at": self.last_run_at.isoformat() if self.last_run_at else None
+        }
@@ -0,0 +1,216 @@
+"""
+Chunked persistence stage for parse_results.
+
+Rows are buffered and written in chunks with a multi-row
+INSERT ... ON CONFLICT DO NOTHING on (task_id, source_id, author_id),
+so a parse can be persisted while it is still running and re-sent rows
+are silently skipped instead of duplicated.
+
+The task's result counters (result_count, results_with_username,
+results_with_phone, last_result_at) are bumped in the same transaction
+as each chunk insert, so list views never have to scan parse_results.
+"""
+
+import logging
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import select, update, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from ..database import AsyncSessionLocal
+from ..models.parse_result import ParseResult
+from ..models.parse_task import ParseTask
+from ..core.config import Platform
+from ..core.metrics import get_metrics_collector
+from .community_index import index_communities, community_from_metadata
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 500
+
+# Columns that identify a row for ON CONFLICT deduplication
+CONFLICT_COLUMNS = ['task_id', 'source_id', 'author_id']
+
+# Rows describing the parsed target itself
+METADATA_CONTENT_TYPES = ('channel_metadata', 'group_metadata')
+
+
+def build_result_row(task_db_id: int, result_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Map a TelegramAdapter result dict to a parse_results row."""
+    now = datetime.utcnow()
+    return {
+        'task_id': task_db_id,
+        'platform': result_data.get('platform', Platform.TELEGRAM),
+        'source_id': result_data.get('source_id', 'unknown'),
+        'source_name': result_data.get('source_name', 'unknown'),
+        'source_type': result_data.get('source_type', 'channel'),
+        'content_id': result_data.get('content_id', 'unknown'),
+        'content_type': result_data.get('content_type', 'user'),
+        'content_text': result_data.get('content_text', ''),
+        'author_id': result_data.get('author_id'),
+        'author_username': result_data.get('author_username'),
+        'author_name': result_data.get('author_name', ''),
+        'author_phone': result_data.get('author_phone'),
+        'phone_checked_at': result_data.get('phone_checked_at'),
+        'content_created_at': result_data.get('content_created_at') or now,
+        'views_count': result_data.get('views_count', 0) or 0,
+        'has_media': result_data.get('has_media', False) or False,
+        'media_count': result_data.get('media_count', 0) or 0,
+        'media_types': result_data.get('media_types', []),
+        'is_forwarded': result_data.get('is_forwarded', False) or False,
+        'is_reply': result_data.get('is_reply', False) or False,
+        'platform_data': result_data.get('platform_data', {}),
+        'raw_data': result_data.get('raw_data', {}),
+        'created_at': now,
+        'updated_at': now,
+    }
+
+
+class ParseResultWriter:
+    """
+    Buffered writer for parse_results.
+
+    Usage:
+        async with ParseResultWriter(task_id) as writer:
+            await writer.write(batch)   # flushes every chunk_size rows
+        writer.rows_written             # rows actually inserted
+    """
+
+    def __init__(self, task_id: str, chunk_size: int = DEFAULT_CHUNK_SIZE, platform: Platform = Platform.TELEGRAM):
+        self.task_id = task_id
+        self.chunk_size = max(1, chunk_size)
+        self.platform = platform
+        self.task_db_id: Optional[int] = None
+        self.rows_written = 0
+        self.rows_skipped = 0
+        self.rows_failed = 0
+        self._buffer: List[Dict[str, Any]] = []
+        self._write_seconds = 0.0
+        self._metrics = get_metrics_collector()
+
+    async def __aenter__(self) -> "ParseResultWriter":
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            await self.close()
+            return
+        # Keep the original error; a failing final flush is only logged
+        try:
+            await self.close()
+        except Exception as close_error:
+            logger.error(f"❌ Final flush for task {self.task_id} failed: {close_error}")
+
+    async def open(self) -> Optional[int]:
+        """Resolve the database ID of the task; rows are dropped if it is missing."""
+        if self.task_db_id is None:
+            async with AsyncSessionLocal() as db_session:
+                result = await db_session.execute(
+                    select(ParseTask.id).where(ParseTask.task_id == self.task_id)
+                )
+                self.task_db_id = result.scalar_one_or_none()
+            if not self.task_db_id:
+                logger.error(f"❌ Task {self.task_id} not found in database, results will not be saved")
+        return self.task_db_id
+
+    async def write(self, results: Iterable[Dict[str, Any]]) -> int:
+        """Buffer results and flush every full chunk. Returns rows inserted by this call."""
+        if not self.task_db_id:
+            return 0
+
+        inserted = 0
+        metadata_rows = []
+        for result_data in results:
+            if result_data.get('content_type') in METADATA_CONTENT_TYPES:
+                metadata_rows.append(result_data)
+            try:
+                self._buffer.append(build_result_row(self.task_db_id, result_data))
+            except Exception as e:
+                self.rows_failed += 1
+                logger.error(f"❌ Error preparing result row: {e}")
+                continue
+
+            if len(self._buffer) >= self.chunk_size:
+                inserted += await self.flush()
+        
+        if metadata_rows:
+            # The parsed channel/group also goes into the community index
+            await index_communities(community_from_metadata(row) for row in metadata_rows)
+        return inserted
+
+    async def flush(self) -> int:
+        """
+        Write buffered rows in one INSERT ... ON CONFLICT DO NOTHING and update task counters.
+
+        Database errors are raised: callers checkpoint only after a successful flush,
+        so a resume re-parses the rows that were not saved.
+        """
+        if not self._buffer:
+            return 0
+
+        rows, self._buffer = self._buffer, []
+        table = ParseResult.__table__
+        stmt = (
+            pg_insert(table)
+            .on_conflict_do_nothing(index_elements=CONFLICT_COLUMNS)
+            .returning(table.c.author_id, table.c.author_username, table.c.author_phone, table.c.created_at)
+        )
+
+        started = time.monotonic()
+        try:
+            async with AsyncSessionLocal() as db_session:
+                result = await db_session.execute(stmt, rows)
+                inserted_rows = result.all()
+                inserted = len(inserted_rows)
+                if inserted:
+                    await db_session.execute(self._counters_update(inserted_rows))
+                await db_session.commit()
+        except Exception as e:
+            self.rows_failed += len(rows)
+            logger.error(f"❌ Error writing {len(rows)} parse results for task {self.task_id}: {e}")
+            raise
+
+        elapsed = time.monotonic() - started
+        duplicates = len(rows) - inserted
+        self._write_seconds += elapsed
+        self.rows_written += inserted
+        self.rows_skipped += duplicates
+
+        try:
+            self._metrics.record_persist_rate(self.platform, inserted, duplicates, elapsed)
+        except Exception as metrics_error:
+            logger.debug(f"Persist metrics error: {metrics_error}")
+
+        logger.info(
+            f"💾 Task {self.task_id}: wrote {inserted} rows ({duplicates} duplicates) "
+            f"in {elapsed:.2f}s, total {self.rows_written}"
+        )
+        return inserted
+
+    def _counters_update(self, inserted_rows):
+        """UPDATE bumping ParseTask counters by the rows this chunk actually inserted."""
+        user_rows = [r for r in inserted_rows if r.author_id is not None]
+        with_username = sum(1 for r in user_rows if r.author_username)
+        with_phone = sum(1 for r in user_rows if r.author_phone)
+        last_created = max(r.created_at for r in inserted_rows)
+        return (
+            update(ParseTask)
+            .where(ParseTask.id == self.task_db_id)
+            .values(
+                result_count=ParseTask.result_count + len(inserted_rows),
+                results_with_username=ParseTask.results_with_username + with_username,
+                results_with_phone=ParseTask.results_with_phone + with_phone,
+                last_result_at=func.greatest(func.coalesce(ParseTask.last_result_at, last_created), last_created)
+            )
+        )
+
+    async def close(self) -> int:
+        """Flush the remaining rows and return total rows inserted."""
+        await self.flush()
+        if self._write_seconds > 0:
+            rate = (self.rows_written + self.rows_skipped) / self._write_seconds
+            logger.info(f"💾 Task {self.task_id}: persisted {self.rows_written} results ({rate:.0f} rows/s)")
+        return self.rows_written
@@ -0,0 +1,258 @@
+"""
+Sharded multi-account parsing of a single large channel.
+
+The searched message history is split into message-id ranges, one per
+allocated account. Shards run in parallel and stream their batches into one
+ParseResultWriter; seen users are shared across shards and the
+(task_id, source_id, author_id) unique index drops anything that slips through.
+
+Only channel history is sharded. Group participants are not split by
+ChannelParticipantsSearch prefixes: megagroups already take the channel
+(message-id range) path and basic groups return all of their at most 200
+members in one request, so groups are parsed on a single account.
+"""
+
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+
+from telethon.tl.types import Channel
+
+from ..adapters.telegram import TelegramAdapter, ParseCheckpoint
+from ..clients.account_manager_client import AccountManagerClient
+from .result_writer import ParseResultWriter
+
+logger = logging.getLogger(__name__)
+
+# Ranges smaller than this are not worth an extra account
+SHARD_MIN_MESSAGES = 500
+
+# Same search depth as the single-account channel parser
+SEARCH_DEPTH_PER_USER = 10
+MIN_SEARCH_DEPTH = 1000
+
+RELEASE_STATS = {
+    "invites_sent": 0,
+    "messages_sent": 0,
+    "contacts_added": 0,
+    "channels_used": [],
+    "success": True,
+    "error_type": None,
+    "error_message": None
+}
+
+
+def plan_message_shards(top_message_id: int, search_depth: int, shard_count: int) -> List[Dict[str, int]]:
+    """
+    Split message ids (top_message_id - search_depth, top_message_id] into contiguous ranges.
+
+    Each shard uses Telethon's exclusive bounds: min_id < message.id < max_id.
+    """
+    lowest = max(0, top_message_id - search_depth)
+    span = top_message_id - lowest
+    count = max(1, min(shard_count, span // SHARD_MIN_MESSAGES))
+    bounds = [top_message_id + 1 - (span * i) // count for i in range(count + 1)]
+    return [
+        {'index': i, 'max_id': bounds[i], 'min_id': bounds[i + 1] - 1}
+        for i in range(count)
+    ]
+
+
+async def _allocate_extra_adapters(user_id: int, extra_accounts: int, account_manager: AccountManagerClient):
+    """Allocate up to extra_accounts free accounts; returns [(allocation, adapter)]."""
+    from .real_parser import create_allocated_adapter
+
+    extras = []
+    for _ in range(extra_accounts):
+        allocation = await account_manager.allocate_account(
+            user_id=user_id,
+            purpose="parsing",
+            timeout_minutes=120
+        )
+        if not allocation:
+            break
+        try:
+            adapter = await create_allocated_adapter(allocation)
+            extras.append((allocation, adapter))
+        except Exception as e:
+            logger.warning(f"⚠️ Shard account {allocation.get('account_id')} unusable: {e}")
+            await account_manager.release_account(allocation['account_id'], usage_stats=RELEASE_STATS)
+    return extras
+
+
+def _restore_shard_state(resume_data: Optional[Dict], top_message_id: int, shard_count: int, search_depth: int):
+    """Reuse the saved shard plan if it is for the same history, otherwise plan from scratch."""
+    resume_data = resume_data or {}
+    saved = resume_data.get("shards")
+    if saved and resume_data.get("top_message_id") and len(saved) == shard_count:
+        shards = [{'index': s['index'], 'max_id': s['max_id'], 'min_id': s['min_id']} for s in saved]
+        return resume_data["top_message_id"], shards, saved
+    shards = plan_message_shards(top_message_id, search_depth, shard_count)
+    return top_message_id, shards, [None] * len(shards)
+
+
+async def perform_sharded_parsing(
+    task_id: str,
+    task,
+    task_db_id: Optional[int],
+    link: str,
+    primary_adapter: TelegramAdapter,
+    user_id: int,
+    extra_accounts: int,
+    checkpoint: ParseCheckpoint,
+    progress_callback=None,
+    message_limit: int = 100,
+    speed_config=None
+) -> Optional[int]:
+    """
+    Parse one channel on the primary account plus up to extra_accounts more.
+
+    Returns the number of rows inserted by the writer, or None when the target
+    cannot be sharded (not a channel, history too short, no free accounts) so the
+    caller parses it on a single account.
+    """
+    from .real_parser import save_parse_checkpoint
+
+    account_manager = AccountManagerClient()
+    target = primary_adapter.normalize_target(link)
+    entity = await primary_adapter.client.get_entity(target)
+    if not isinstance(entity, Channel):
+        return None
+
+    latest = await primary_adapter.client.get_messages(entity, limit=1)
+    if not latest:
+        return None
+
+    search_depth = max(message_limit * SEARCH_DEPTH_PER_USER, MIN_SEARCH_DEPTH)
+    wanted = len(plan_message_shards(latest[0].id, search_depth, extra_accounts + 1))
+    if wanted < 2:
+        return None
+
+    extras = await _allocate_extra_adapters(user_id, wanted - 1, account_manager)
+    if not extras:
+        logger.info(f"🧩 No free accounts for extra shards of {target}")
+        return None
+
+    adapters = [primary_adapter] + [adapter for _, adapter in extras]
+    top_message_id, shards, saved_states = _restore_shard_state(
+        getattr(task, 'resume_data', None), latest[0].id, len(adapters), search_depth
+    )
+    adapters = adapters[:len(shards)]
+
+    # One seen-users set shared by all shards (rebuilt from saved results on resume)
+    seen_user_ids = checkpoint.seen_user_ids
+    checkpoints: List[ParseCheckpoint] = []
+    for shard, state in zip(shards, saved_states):
+        shard_checkpoint = ParseCheckpoint.from_resume_data(state)
+        shard_checkpoint.seen_user_ids = seen_user_ids
+        # Channel metadata is emitted by the first shard only
+        shard_checkpoint.metadata_saved = shard_checkpoint.metadata_saved or shard['index'] > 0 or checkpoint.metadata_saved
+        checkpoints.append(shard_checkpoint)
+
+    logger.info(
+        f"🧩 Sharded parsing of {target}: {len(shards)} accounts, "
+        f"messages {shards[-1]['min_id'] + 1}..{top_message_id}"
+    )
+
+    # Checkpoint of each shard as of its last flushed batch. The live checkpoints run
+    # ahead of batches still waiting in the queue, so only these snapshots are saved.
+    flushed_states: List[Optional[Dict[str, Any]]] = [
+        {k: v for k, v in state.items() if k not in ('index', 'max_id', 'min_id')} if state else None
+        for state in saved_states
+    ]
+
+    def resume_data() -> Dict[str, Any]:
+        return {
+            "top_message_id": top_message_id,
+            "shards": [{**shard, **(state or {})} for shard, state in zip(shards, flushed_states)]
+        }
+
+    queue: asyncio.Queue = asyncio.Queue(maxsize=len(shards) * 2)
+    errors: List[Exception] = []
+
+    async def run_shard(adapter: TelegramAdapter, shard: Dict[str, int], shard_checkpoint: ParseCheckpoint):
+        config = {
+            'message_limit': message_limit,
+            'progress_callback': None,  # Progress is reported for the merged stream
+            'speed_config': speed_config,
+            'checkpoint': shard_checkpoint,
+            'shard': shard
+        }
+        try:
+            async for batch in adapter.iter_target_batches(task, link, config):
+                # The adapter advances the checkpoint before each yield: snapshot it with its batch
+                await queue.put((shard['index'], batch, shard_checkpoint.to_resume_data()))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"❌ Shard {shard['index']} of {target} failed on account {adapter.current_account_id}: {e}")
+            errors.append(e)
+        # End-of-shard marker (not sent on cancellation - the consumer is gone by then)
+        await queue.put((shard['index'], None, None))
+
+    runners = [
+        asyncio.create_task(run_shard(adapter, shard, shard_checkpoint))
+        for adapter, shard, shard_checkpoint in zip(adapters, shards, checkpoints)
+    ]
+
+    users_found = len(seen_user_ids)
+    finished = 0
+    try:
+        async with ParseResultWriter(task_id) as writer:
+            while finished < len(runners):
+                shard_index, batch, snapshot = await queue.get()
+                if batch is None:
+                    finished += 1
+                    continue
+
+                # Enforce the user limit over the merged stream
+                accepted = []
+                for item in batch:
+                    if item.get('author_id') is not None:
+                        if users_found >= message_limit:
+                            continue
+                        users_found += 1
+                    accepted.append(item)
+
+                await writer.write(accepted)
+                await writer.flush()
+                flushed_states[shard_index] = snapshot
+                if task_db_id:
+                    await save_parse_checkpoint(task_db_id, resume_data())
+
+                if progress_callback:
+                    try:
+                        await progress_callback(users_found, message_limit)
+                    except Exception as e:
+                        logger.debug(f"Progress callback error: {e}")
+
+                if users_found >= message_limit:
+                    logger.info(f"🛑 LIMIT REACHED: {users_found}/{message_limit} users over {len(runners)} shards")
+                    break
+    finally:
+        for runner in runners:
+            runner.cancel()
+        await asyncio.gather(*runners, return_exceptions=True)
+
+        for allocation, adapter in extras:
+            try:
+                await adapter.cleanup()
+            except Exception as cleanup_error:
+                logger.warning(f"⚠️ Shard adapter cleanup error: {cleanup_error}")
+            await account_manager.release_account(
+                allocation['account_id'],
+                usage_stats={**RELEASE_STATS, "channels_used": [link]}
+            )
+
+    if errors and users_found < message_limit:
+        # Ranges of the failed shards are not fully parsed: keep the per-shard checkpoints for the resume
+        logger.error(f"❌ {len(errors)} of {len(runners)} shards of {target} failed, task is left resumable")
+        if task_db_id:
+            await save_parse_checkpoint(task_db_id, resume_data())
+        raise errors[0]
+
+    if task_db_id:
+        await save_parse_checkpoint(task_db_id, None)
+
+    logger.info(f"✅ Sharded parsing of {target} completed: {users_found} users from {len(runners)} accounts")
+    return writer.rows_written
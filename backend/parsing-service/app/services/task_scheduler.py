@@ -0,0 +1,406 @@
+"""
+Durable parsing task scheduler.
+
+parse_tasks is the queue: pending rows are picked by priority (high > normal > low)
+and created_at (FIFO), and every free Account Manager allocation is filled in a
+single pass. Dispatch is event-driven - notify() is called when a task is created
+or resumed and when an account is released.
+
+Several replicas can share the queue: a claimed task carries a lease
+(lease_owner, lease_expires_at) that its process renews while the task runs.
+Only RUNNING tasks whose lease has expired are put back to PENDING. Pausing does
+not stop a running parse, so the lease is kept while the parse is alive and a
+resume of such a task returns it to RUNNING instead of queueing a second run.
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from sqlalchemy import select, update, case, or_
+
+from ..database import AsyncSessionLocal
+from ..models.parse_task import ParseTask
+from ..core.config import settings, Platform, TaskStatus, TaskPriority
+from ..core.progress_bus import publish_task_progress_nowait
+from ..clients.account_manager_client import AccountManagerClient
+
+logger = logging.getLogger(__name__)
+
+# Higher weight is dispatched first
+PRIORITY_WEIGHTS = {
+    TaskPriority.HIGH: 3,
+    TaskPriority.NORMAL: 2,
+    TaskPriority.LOW: 1
+}
+
+# Pending rows read per query while filling the account pool
+DISPATCH_BATCH_SIZE = 50
+
+# Accounts can also be released by other services (Invite Service), which do not
+# notify us - re-check a non-empty queue at this interval
+IDLE_RECHECK_SECONDS = 60
+
+
+def task_dict_from_db(db_task: ParseTask) -> Dict[str, Any]:
+    """Build the in-memory task dict (same shape as POST /tasks) from a parse_tasks row."""
+    config = db_task.config or {}
+    settings = dict(config.get("settings") or {})
+    settings.setdefault("message_limit", config.get("message_limit", 100))
+    settings.setdefault("parsing_speed", config.get("parsing_speed", "medium"))
+    created_at = (db_task.created_at or datetime.utcnow()).isoformat()
+
+    return {
+        "id": db_task.task_id,
+        "db_id": db_task.id,
+        "user_id": db_task.user_id,
+        "platform": db_task.platform.value if hasattr(db_task.platform, 'value') else str(db_task.platform),
+        "link": config.get("target"),
+        "task_type": db_task.task_type,
+        "priority": db_task.priority.value if hasattr(db_task.priority, 'value') else str(db_task.priority),
+        "status": db_task.status.value if hasattr(db_task.status, 'value') else str(db_task.status),
+        "progress": db_task.progress or 0,
+        "created_at": created_at,
+        "updated_at": (db_task.updated_at or datetime.utcnow()).isoformat(),
+        "settings": settings,
+        "result_count": db_task.result_count or 0
+    }
+
+
+async def update_task_state(task_id: str, **values) -> bool:
+    """Persist task state (status, progress, timestamps...) to parse_tasks."""
+    try:
+        values.setdefault("updated_at", datetime.utcnow())
+        async with AsyncSessionLocal() as db_session:
+            await db_session.execute(
+                update(ParseTask).where(ParseTask.task_id == task_id).values(**values)
+            )
+            await db_session.commit()
+        return True
+    except Exception as e:
+        logger.error(f"❌ Failed to update task {task_id} state: {e}")
+        return False
+
+
+class TaskScheduler:
+    """
+    Event-driven dispatcher of pending parse_tasks onto Account Manager allocations.
+
+    Args:
+        task_cache: in-memory task list served to the frontend (main.created_tasks)
+        launcher: coroutine function (task, allocation) that runs the task
+    """
+
+    def __init__(
+        self,
+        task_cache: List[Dict[str, Any]],
+        launcher: Callable[[Dict[str, Any], Dict[str, Any]], Awaitable[Any]],
+        platform: Platform = Platform.TELEGRAM
+    ):
+        self.task_cache = task_cache
+        self.launcher = launcher
+        self.platform = platform
+        self.account_manager = AccountManagerClient()
+        self._wakeup = asyncio.Event()
+        self._runner: Optional[asyncio.Task] = None
+        self._heartbeat: Optional[asyncio.Task] = None
+        self._running: Dict[str, asyncio.Task] = {}
+        self._lease_releases: Set[asyncio.Task] = set()
+        self._pool_saturated = False
+        # Lease owner id of this process
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    def notify(self):
+        """Request a dispatch pass (task created/resumed, account released)."""
+        self._wakeup.set()
+
+    async def start(self):
+        """Recover queue state from the database and start the dispatch loop."""
+        await self.recover()
+        self._runner = asyncio.create_task(self._run())
+        self._heartbeat = asyncio.create_task(self._renew_leases())
+        self.notify()
+        logger.info("🔄 Task scheduler started (event-driven)")
+
+    async def stop(self):
+        for runner in (self._runner, self._heartbeat):
+            if runner:
+                runner.cancel()
+                try:
+                    await runner
+                except asyncio.CancelledError:
+                    pass
+        self._runner = None
+        self._heartbeat = None
+
+    async def requeue_expired(self) -> List[str]:
+        """
+        Move RUNNING tasks whose lease has expired back to PENDING.
+        Tasks still leased by a live process (this one or another replica) are left alone;
+        interrupted tasks continue from their resume_data checkpoint.
+        """
+        now = datetime.utcnow()
+        async with AsyncSessionLocal() as db_session:
+            interrupted = await db_session.execute(
+                update(ParseTask)
+                .where(
+                    ParseTask.status == TaskStatus.RUNNING,
+                    ParseTask.platform == self.platform,
+                    or_(ParseTask.lease_expires_at.is_(None), ParseTask.lease_expires_at < now)
+                )
+                .values(
+                    status=TaskStatus.PENDING,
+                    current_account_id=None,
+                    lease_owner=None,
+                    lease_expires_at=None,
+                    updated_at=now
+                )
+                .returning(ParseTask.task_id)
+            )
+            requeued = interrupted.scalars().all()
+            await db_session.commit()
+        if requeued:
+            logger.info(f"♻️ Re-queued {len(requeued)} tasks with expired leases: {requeued}")
+        return requeued
+
+    async def recover(self):
+        """Re-queue tasks whose lease has expired and load queued tasks into the cache."""
+        try:
+            await self.requeue_expired()
+            async with AsyncSessionLocal() as db_session:
+                result = await db_session.execute(
+                    select(ParseTask)
+                    .where(ParseTask.status.in_([TaskStatus.PENDING, TaskStatus.PAUSED]), ParseTask.platform == self.platform)
+                    .order_by(ParseTask.created_at)
+                )
+                queued = result.scalars().all()
+
+            cached_ids = {t["id"] for t in self.task_cache}
+            for db_task in queued:
+                if db_task.task_id not in cached_ids:
+                    self.task_cache.append(task_dict_from_db(db_task))
+
+            logger.info(f"📥 Task queue restored: {len(queued)} queued tasks")
+        except Exception as e:
+            logger.error(f"❌ Failed to recover task queue: {e}")
+
+    async def resume(self, task_id: str) -> Optional[TaskStatus]:
+        """
+        PAUSED -> RUNNING if the task's parse is still alive (live lease, on any replica),
+        otherwise PAUSED -> PENDING and a dispatch pass. None if the task is not paused.
+        """
+        now = datetime.utcnow()
+        lease_alive = ParseTask.lease_expires_at > now
+        async with AsyncSessionLocal() as db_session:
+            result = await db_session.execute(
+                update(ParseTask)
+                .where(ParseTask.task_id == task_id, ParseTask.status == TaskStatus.PAUSED)
+                .values(
+                    status=case((lease_alive, TaskStatus.RUNNING), else_=TaskStatus.PENDING),
+                    updated_at=now
+                )
+                .returning(ParseTask.status)
+            )
+            status = result.scalar_one_or_none()
+            await db_session.commit()
+        if status == TaskStatus.PENDING:
+            self.notify()
+        return status
+
+    async def _release_lease(self, task_id: str):
+        """Drop the lease of a finished run so a resume or retry can claim the task right away."""
+        try:
+            async with AsyncSessionLocal() as db_session:
+                await db_session.execute(
+                    update(ParseTask)
+                    .where(ParseTask.task_id == task_id, ParseTask.lease_owner == self.owner)
+                    .values(lease_owner=None, lease_expires_at=None)
+                )
+                await db_session.commit()
+        except Exception as e:
+            logger.error(f"❌ Failed to release lease of task {task_id}: {e}")
+        self.notify()
+
+    async def _renew_leases(self):
+        """Keep the leases of tasks run by this process alive and pick up expired ones."""
+        while True:
+            await asyncio.sleep(settings.TASK_LEASE_RENEW_SECONDS)
+            try:
+                if self._running:
+                    async with AsyncSessionLocal() as db_session:
+                        await db_session.execute(
+                            update(ParseTask)
+                            .where(
+                                # Paused tasks too: their parse is still running here
+                                ParseTask.task_id.in_(list(self._running.keys())),
+                                ParseTask.lease_owner == self.owner
+                            )
+                            .values(lease_expires_at=self._lease_deadline())
+                        )
+                        await db_session.commit()
+                # A replica that died leaves its tasks RUNNING until their lease runs out
+                if await self.requeue_expired():
+                    self.notify()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Failed to renew task leases: {e}")
+
+    @staticmethod
+    def _lease_deadline() -> datetime:
+        return datetime.utcnow() + timedelta(seconds=settings.TASK_LEASE_SECONDS)
+
+    async def _run(self):
+        while True:
+            try:
+                try:
+                    timeout = IDLE_RECHECK_SECONDS if self._pool_saturated else None
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                await self.dispatch()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Ошибка в task scheduler: {e}")
+                # Retry on the idle timer instead of waiting for the next event
+                self._pool_saturated = True
+
+    async def _next_pending(self, exclude: List[int]) -> List[ParseTask]:
+        priority_order = case(
+            {priority: weight for priority, weight in PRIORITY_WEIGHTS.items()},
+            value=ParseTask.priority,
+            else_=PRIORITY_WEIGHTS[TaskPriority.NORMAL]
+        )
+        stmt = (
+            select(ParseTask)
+            .where(ParseTask.status == TaskStatus.PENDING, ParseTask.platform == self.platform)
+            .order_by(priority_order.desc(), ParseTask.created_at, ParseTask.id)
+            .limit(DISPATCH_BATCH_SIZE)
+        )
+        if exclude:
+            stmt = stmt.where(ParseTask.id.notin_(exclude))
+        async with AsyncSessionLocal() as db_session:
+            result = await db_session.execute(stmt)
+            return result.scalars().all()
+
+    async def _claim(self, db_task: ParseTask, allocation: Dict[str, Any]) -> bool:
+        """
+        Atomically move the task PENDING -> RUNNING; False if it was paused/claimed meanwhile
+        or an earlier run of it still holds a live lease.
+        """
+        now = datetime.utcnow()
+        async with AsyncSessionLocal() as db_session:
+            result = await db_session.execute(
+                update(ParseTask)
+                .where(
+                    ParseTask.id == db_task.id,
+                    ParseTask.status == TaskStatus.PENDING,
+                    or_(ParseTask.lease_expires_at.is_(None), ParseTask.lease_expires_at < now)
+                )
+                .values(
+                    status=TaskStatus.RUNNING,
+                    started_at=now,
+                    updated_at=now,
+                    current_account_id=str(allocation.get('account_id')),
+                    lease_owner=self.owner,
+                    lease_expires_at=self._lease_deadline()
+                )
+                .returning(ParseTask.id)
+            )
+            claimed = result.scalar_one_or_none() is not None
+            await db_session.commit()
+        return claimed
+
+    async def dispatch(self) -> int:
+        """Fill every available account with pending tasks. Returns number of tasks started."""
+        started = 0
+        skipped: List[int] = []
+        self._pool_saturated = False
+
+        while True:
+            candidates = await self._next_pending(skipped)
+            if not candidates:
+                break
+
+            for db_task in candidates:
+                if db_task.task_id in self._running:
+                    # An earlier run of this task is still alive in this process
+                    skipped.append(db_task.id)
+                    continue
+
+                allocation = await self.account_manager.allocate_account(
+                    user_id=db_task.user_id or 1,
+                    purpose="parsing",
+                    timeout_minutes=120  # 2 часа для парсинга
+                )
+                if not allocation:
+                    self._pool_saturated = True
+                    logger.info(f"⚠️ AccountManager: Нет свободных аккаунтов, в работе {len(self._running)} задач")
+                    return started
+
+                if not await self._claim(db_task, allocation):
+                    skipped.append(db_task.id)
+                    await self.account_manager.release_account(
+                        account_id=allocation['account_id'],
+                        usage_stats={
+                            "invites_sent": 0,
+                            "messages_sent": 0,
+                            "contacts_added": 0,
+                            "channels_used": [],
+                            "success": True,
+                            "error_type": None,
+                            "error_message": None
+                        }
+                    )
+                    continue
+
+                self._launch(db_task, allocation)
+                started += 1
+
+            skipped.extend(t.id for t in candidates if t.id not in skipped)
+
+        if started:
+            logger.info(f"🚀 Scheduler: запущено {started} задач, в работе {len(self._running)}")
+        return started
+
+    def _launch(self, db_task: ParseTask, allocation: Dict[str, Any]):
+        task = next((t for t in self.task_cache if t["id"] == db_task.task_id), None)
+        if task is None:
+            task = task_dict_from_db(db_task)
+            self.task_cache.append(task)
+
+        task["status"] = "running"
+        task["progress"] = task.get("progress") or 0
+        task["updated_at"] = datetime.utcnow().isoformat()
+        task["assigned_account_id"] = allocation['account_id']
+        task["allocated_account"] = allocation
+        publish_task_progress_nowait(task)
+
+        logger.info(
+            f"🚀 AccountManager: Запущена задача {task['id']} "
+            f"(приоритет: {task.get('priority', 'normal').upper()}) на аккаунте {allocation['account_id']}"
+        )
+
+        runner = asyncio.create_task(self.launcher(task, allocation))
+        self._running[task["id"]] = runner
+        runner.add_done_callback(lambda _: self._on_finished(task["id"]))
+
+    def _on_finished(self, task_id: str):
+        self._running.pop(task_id, None)
+        # Account was released by the launcher - refill the pool once the lease is dropped
+        release = asyncio.create_task(self._release_lease(task_id))
+        self._lease_releases.add(release)
+        release.add_done_callback(self._lease_releases.discard)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": len(self._running),
+            "running_task_ids": list(self._running.keys()),
+            "pool_saturated": self._pool_saturated
+        }
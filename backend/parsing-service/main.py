@@ -19,6 +19,11 @@ from app.database import AsyncSessionLocal
 # Temporarily disable metrics to fix CollectorRegistry duplication error
 # from app.core.metrics import start_metrics_server, get_metrics_collector
 from app.database import init_database
+from app.services.task_scheduler import TaskScheduler, update_task_state
+from app.services.phone_enrichment import PhoneEnrichmentWorker
+from app.services.progress_writer import ProgressWriter
+from app.services.result_partitions import ResultPartitionMaintainer
+from app.core.progress_bus import publish_task_progress
 from app.schemas.base import HealthResponse
 
 # API routers
@@ -73,24 +78,22 @@ async def lifespan(app: FastAPI):
     # Initialize metrics
     # metrics = get_metrics_collector()  # Временно отключено
     
-    # ✅ ЗАПУСК ПЕРИОДИЧЕСКОГО ОБРАБОТЧИКА ЗАДАЧ
-    async def periodic_task_processor():
-        """Периодический обработчик pending задач каждые 10 секунд."""
-        while True:
-            try:
-                await asyncio.sleep(10)  # Проверяем каждые 10 секунд
-                await process_pending_tasks()
-            except Exception as e:
-                logger.error(f"❌ Ошибка в periodic_task_processor: {e}")
-    
-    # Запускаем периодический обработчик в фоне
-    processor_task = asyncio.create_task(periodic_task_processor())
-    logger.info("🔄 Запущен периодический обработчик задач (каждые 10 секунд)")
+    # ✅ ЗАПУСК ПЛАНИРОВЩИКА ЗАДАЧ: очередь в parse_tasks, диспетчеризация по событиям
+    await task_scheduler.start()
+    # Дообогащение телефонами на свободных аккаунтах (отдельно от сбора пользователей)
+    await phone_enrichment_worker.start()
+    # Прогресс задач пишется в БД пачками раз в несколько секунд
+    await progress_writer.start()
+    # Партиции parse_results: создание наперёд и retention старых
+    await result_partition_maintainer.start()
     
     yield
     
-    # Останавливаем периодический обработчик при завершении
-    processor_task.cancel()
+    # Останавливаем планировщик при завершении
+    await phone_enrichment_worker.stop()
+    await task_scheduler.stop()
+    await progress_writer.stop()
+    await result_partition_maintainer.stop()
     logger.info("🛑 Shutting down Multi-Platform Parser Service")
 
 
@@ -348,7 +351,7 @@ async def v1_list_results():
     """List parsing results."""
     return {"results": [], "total": 0, "status": "coming_soon"}
 
-# In-memory storage for created tasks (for demo purposes)
+# In-memory view of tasks for the frontend; the durable queue is parse_tasks (see task_scheduler)
 created_tasks = []
 
 # Function to check available Telegram accounts using AccountManager
@@ -392,84 +395,8 @@ async def check_telegram_accounts():
 
 # Background task to process pending tasks with Account Manager
 async def process_pending_tasks():
-    """Process pending tasks using Account Manager for proper account distribution."""
-    try:
-        from app.clients.account_manager_client import AccountManagerClient
-        
-        account_manager = AccountManagerClient()
-        
-        # ✅ ДИАГНОСТИКА: Проверяем общее состояние
-        total_tasks = len(created_tasks)
-        pending_tasks_all = [task for task in created_tasks if task["status"] == "pending"]
-        running_tasks = [task for task in created_tasks if task["status"] == "running"]
-        
-        logger.debug(f"🔍 Всего задач: {total_tasks}, pending: {len(pending_tasks_all)}, running: {len(running_tasks)}")
-        
-        # Get pending tasks for Telegram
-        pending_tasks = [task for task in created_tasks if task["status"] == "pending" and task["platform"] == "telegram"]
-        
-        if not pending_tasks:
-            logger.debug("📝 Нет pending Telegram задач для обработки")
-            return
-        
-        # ✅ PRIORITY MAPPING для правильной сортировки
-        PRIORITY_WEIGHTS = {
-            "high": 3,    # Высокий приоритет
-            "normal": 2,  # Обычный приоритет  
-            "low": 1      # Низкий приоритет
-        }
-        
-        # ✅ СОРТИРОВКА ПО ПРИОРИТЕТУ: сначала high, потом normal, потом low
-        # Среди одинаковых приоритетов - по времени создания (FIFO)
-        pending_tasks.sort(key=lambda t: (
-            -PRIORITY_WEIGHTS.get(t.get("priority", "normal"), 2),  # По убыванию приоритета
-            t.get("created_at", "")  # По возрастанию времени создания
-        ))
-        
-        logger.info(f"🎯 AccountManager: {len(pending_tasks)} задач в очереди")
-        
-        # Log priority distribution for debugging
-        priority_counts = {}
-        for task in pending_tasks:
-            priority = task.get("priority", "normal")
-            priority_counts[priority] = priority_counts.get(priority, 0) + 1
-        
-        if priority_counts:
-            priority_info = ", ".join([f"{p}:{c}" for p, c in priority_counts.items()])
-            logger.info(f"📊 Приоритеты в очереди: {priority_info}")
-        
-        # Обрабатываем задачи по одной, используя Account Manager для выделения аккаунтов
-        for task in pending_tasks:
-            try:
-                # Пытаемся выделить аккаунт через Account Manager
-                allocation = await account_manager.allocate_account(
-                    user_id=task.get("user_id", 1),
-                    purpose="parsing",
-                    timeout_minutes=120  # 2 часа для парсинга
-                )
-                
-                if allocation:
-                    task["status"] = "running"
-                    task["progress"] = 0
-                    task["updated_at"] = datetime.utcnow().isoformat()
-                    task["assigned_account_id"] = allocation['account_id']  # Track account assignment
-                    task["allocated_account"] = allocation  # Сохраняем полную информацию об аллокации
-                    
-                    logger.info(f"🚀 AccountManager: Запущена задача {task['id']} (приоритет: {task.get('priority', 'normal').upper()}) на аккаунте {allocation['account_id']}")
-                    
-                    # Start parsing in background
-                    asyncio.create_task(execute_real_parsing_with_account_manager(task, allocation))
-                    
-                    # Обрабатываем по одной задаче за раз, чтобы не перегружать Account Manager
-                    break
-                else:
-                    logger.warning(f"⚠️ AccountManager: Нет доступных аккаунтов для задачи {task['id']}")
-                    
-            except Exception as task_error:
-                logger.error(f"❌ Ошибка обработки задачи {task['id']}: {task_error}")
-                
-    except Exception as e:
-        logger.error(f"❌ Ошибка обработки задач через AccountManager: {e}")
+    """Request a dispatch pass: the scheduler fills every free Account Manager allocation."""
+    task_scheduler.notify()
 
 async def execute_real_parsing_with_account_manager(task, allocation):
     """Execute REAL parsing with Account Manager and Parsing Speed support."""
@@ -510,6 +437,9 @@ async def execute_real_parsing_with_account_manager(task, allocation):
         message_limit = settings.get("message_limit") or settings.get("max_depth", 100)
         logger.info(f"🎯 Using message limit: {message_limit} (from settings: {settings})")
         
+        # Sharded mode: one large channel split across several accounts
+        shard_accounts = max(1, int(settings.get("shard_accounts") or 1))
+        
         # Create progress callback with account context
         last_progress_reported = 0
         
@@ -533,22 +463,11 @@ async def execute_real_parsing_with_account_manager(task, allocation):
                     task["estimated_total"] = estimated_total
                     last_progress_reported = total_progress
                     
-                    # Update database task
-                    try:
-                        from app.database import AsyncSessionLocal
-                        from app.models.parse_task import ParseTask
-                        from sqlalchemy import select
-                        
-                        async with AsyncSessionLocal() as db_session:
-                            stmt = select(ParseTask).where(ParseTask.task_id == task["id"])
-                            result = await db_session.execute(stmt)
-                            db_task = result.scalar_one_or_none()
-                            if db_task:
-                                db_task.progress = total_progress
-                                db_task.updated_at = datetime.utcnow()
-                                await db_session.commit()
-                    except Exception as db_error:
-                        logger.debug(f"DB progress update error: {db_error}")
+                    # Push to SSE subscribers on every replica
+                    await publish_task_progress(task)
+                    
+                    # parse_tasks.progress is written in batches by progress_writer
+                    progress_writer.record(task["id"], total_progress)
                     
                     logger.info(f"📊 Account {assigned_account_id}: Progress {total_progress}% ({current_users}/{estimated_total} users)")
             except Exception as e:
@@ -563,12 +482,14 @@ async def execute_real_parsing_with_account_manager(task, allocation):
             progress_callback=update_progress,
             message_limit=message_limit,
             speed_config=speed_config,
-            allocated_account=allocation  # Используем уже выделенный аккаунт — без повторного allocate
+            allocated_account=allocation,  # Используем уже выделенный аккаунт — без повторного allocate
+            shard_accounts=shard_accounts
         )
         
         # Step 2: Saving phase (95-100%)
         task["progress"] = 95
         task["updated_at"] = datetime.utcnow().isoformat()
+        await publish_task_progress(task)
         logger.info(f"📊 Account {assigned_account_id}: Saving {num_results} results to database...")
         
         await asyncio.sleep(1)  # Brief save time
@@ -579,6 +500,17 @@ async def execute_real_parsing_with_account_manager(task, allocation):
         task["completed_at"] = datetime.utcnow().isoformat()
         task["result_count"] = num_results
         task["updated_at"] = datetime.utcnow().isoformat()
+        await publish_task_progress(task)
+        
+        # Final state is written directly; a buffered older value must not follow it
+        await progress_writer.discard(task["id"])
+        await update_task_state(
+            task["id"],
+            status=TaskStatus.COMPLETED,
+            progress=100,
+            completed_at=datetime.utcnow(),
+            current_account_id=None
+        )
         
         # Calculate statistics
         duration = (datetime.fromisoformat(task["completed_at"]) - datetime.fromisoformat(task["created_at"])).total_seconds()
@@ -613,14 +545,25 @@ async def execute_real_parsing_with_account_manager(task, allocation):
             account_id=assigned_account_id,
             usage_stats=usage_stats
         )
-        
-        # Process next pending tasks
-        await process_pending_tasks()
+        # Next pending tasks are dispatched by task_scheduler once this coroutine finishes;
+        # phones of the collected users are backfilled by the enrichment stage
+        phone_enrichment_worker.notify()
         
     except Exception as e:
         task["status"] = "failed"
         task["error_message"] = str(e)
         task["updated_at"] = datetime.utcnow().isoformat()
+        await publish_task_progress(task)
+        
+        # Keep the last reached progress, then write the final state
+        await progress_writer.flush(task["id"])
+        await update_task_state(
+            task["id"],
+            status=TaskStatus.FAILED,
+            error_message=str(e),
+            failed_at=datetime.utcnow(),
+            current_account_id=None
+        )
         
         logger.error(f"❌ AccountManager: Task {task['id']} failed on account {assigned_account_id}: {e}")
         
@@ -640,6 +583,18 @@ async def execute_real_parsing_with_account_manager(task, allocation):
             context={"service": "parsing-service", "task_id": task["id"]}
         )
 
+# Durable scheduler: dispatches pending parse_tasks onto every free Account Manager allocation
+task_scheduler = TaskScheduler(created_tasks, execute_real_parsing_with_account_manager)
+
+# Deferred phone lookup (users.getFullUser) for parsed users, on spare accounts only
+phone_enrichment_worker = PhoneEnrichmentWorker()
+
+# Batched write-behind of parse_tasks.progress for all running tasks
+progress_writer = ProgressWriter()
+
+# parse_results partitions ahead of new tasks + retention of old ones
+result_partition_maintainer = ResultPartitionMaintainer()
+
 # Legacy function kept for compatibility
 async def execute_real_parsing(task):
     """Legacy function - redirects to new Account Manager version."""
@@ -873,7 +828,7 @@ async def create_task(task_data: dict, request: Request):
         await db_session.commit()
     
     # Автоматически запускаем обработку pending задач через AccountManager
-    asyncio.create_task(process_pending_tasks())
+    task_scheduler.notify()
     
     return {
         "task_ids": created_task_ids,
@@ -1019,6 +974,14 @@ async def delete_task(task_id: str, request: Request):
         raise HTTPException(status_code=404, detail="Task not found")  # 404 вместо 403 для безопасности
     
     deleted_task = created_tasks.pop(task_index)
+    if deleted_task.get("status") in ["pending", "paused"]:
+        # Снимаем задачу с очереди в БД, результаты сохраняются
+        await update_task_state(task_id, status=TaskStatus.FAILED, error_message="Task deleted by user")
+        # Подписчики SSE получают тот же статус, что записан в БД
+        deleted_task["status"] = TaskStatus.FAILED.value
+        deleted_task["error_message"] = "Task deleted by user"
+        deleted_task["updated_at"] = datetime.utcnow().isoformat()
+        await publish_task_progress(deleted_task)
     logger.info(f"🗑️ Удалена задача парсинга: {task_id} (user_id: {user_id})")
     
     return {"message": "Task deleted successfully", "task_id": task_id}
@@ -1048,6 +1011,8 @@ async def pause_task(task_id: str, request: Request):
     
     task["status"] = "paused"
     task["updated_at"] = datetime.utcnow().isoformat()
+    await update_task_state(task_id, status=TaskStatus.PAUSED)
+    await publish_task_progress(task)
     
     logger.info(f"⏸️ Приостановлена задача парсинга: {task_id} (user_id: {user_id})")
     return {"message": "Task paused successfully", "task_id": task_id, "status": "paused"}
@@ -1075,11 +1040,17 @@ async def resume_task(task_id: str, request: Request):
     if task["status"] != "paused":
         raise HTTPException(status_code=400, detail="Cannot resume task that is not paused")
     
-    task["status"] = "pending"
+    # A parse that is still running (pause does not stop it) goes back to RUNNING, not to the queue
+    new_status = await task_scheduler.resume(task_id)
+    if new_status is None:
+        raise HTTPException(status_code=409, detail="Task is no longer paused")
+    
+    task["status"] = new_status.value
     task["updated_at"] = datetime.utcnow().isoformat()
+    await publish_task_progress(task)
     
-    logger.info(f"▶️ Возобновлена задача парсинга: {task_id} (user_id: {user_id})")
-    return {"message": "Task resumed successfully", "task_id": task_id, "status": "pending"}
+    logger.info(f"▶️ Возобновлена задача парсинга: {task_id} (user_id: {user_id}, status: {new_status.value})")
+    return {"message": "Task resumed successfully", "task_id": task_id, "status": new_status.value}
 
 # Direct results endpoints (without v1 prefix) for frontend compatibility
 @app.get("/results/{task_id}", tags=["Results API"])
@@ -1152,10 +1123,13 @@ async def get_task_results(
             if platform_filter:
                 query = query.where(ParseResult.platform == platform_filter)
             
-            # Get total count
-            count_query = select(func.count()).select_from(query.subquery())
-            total_result = await db_session.execute(count_query)
-            total = total_result.scalar() or 0
+            # Get total count (result_count is maintained on insert, count only filtered views)
+            if platform_filter:
+                count_query = select(func.count()).select_from(query.subquery())
+                total_result = await db_session.execute(count_query)
+                total = total_result.scalar() or 0
+            else:
+                total = db_task.result_count or 0
             
             # Apply pagination and ordering
             query = query.order_by(ParseResult.created_at.desc()).offset(offset).limit(limit)
@@ -1213,7 +1187,7 @@ async def get_task_results(
         raise HTTPException(status_code=500, detail=error_detail)
 
 @app.get("/results/{task_id}/export", tags=["Results API"])
-async def export_task_results(task_id: str, request: Request, format: str = "json"):
+async def export_task_results(task_id: str, request: Request, format: str = "json", gzip: bool = False):
     """Export parsing results in specified format (frontend compatible endpoint)."""
     
     # ✅ JWT АВТОРИЗАЦИЯ: Получаем user_id из JWT токена
@@ -1226,12 +1200,13 @@ async def export_task_results(task_id: str, request: Request, format: str = "jso
     
     try:
         from app.database import AsyncSessionLocal
-        from app.models.parse_result import ParseResult
         from app.models.parse_task import ParseTask
+        from app.services.result_export import (
+            STREAMING_FORMATS, COLUMNAR_FORMATS, export_headers, columnar_export_headers,
+            has_results, iter_export_rows, stream_export, stream_columnar_export
+        )
         from sqlalchemy import select
         from fastapi.responses import StreamingResponse
-        import json
-        import csv
         import io
         
         async with AsyncSessionLocal() as db_session:
@@ -1249,166 +1224,113 @@ async def export_task_results(task_id: str, request: Request, format: str = "jso
             
             # Use the database primary key for results lookup
             task_db_id = db_task.id
+        
+        if not await has_results(task_db_id):
+            raise HTTPException(status_code=404, detail="No results found for this task")
+        
+        # JSON / NDJSON / CSV: keyset-paginated stream, memory stays flat for any result count
+        if format.lower() in STREAMING_FORMATS:
+            media_type, headers = export_headers(task_id, format, gzip)
+            return StreamingResponse(
+                stream_export(task_db_id, format, gzip=gzip),
+                media_type=media_type,
+                headers=headers
+            )
+        
+        # Parquet / Arrow IPC: typed columns, platform_data flattened, for analytics
+        if format.lower() in COLUMNAR_FORMATS:
+            media_type, headers = columnar_export_headers(task_id, format)
+            return StreamingResponse(
+                stream_columnar_export(task_db_id, format),
+                media_type=media_type,
+                headers=headers
+            )
+        
+        # Export in Excel
+        if format.lower() in ["excel", "xlsx"]:
+            # Excel workbook is built in memory (sheet size is capped by Excel itself)
+            formatted_results = [row async for row in iter_export_rows(task_db_id)]
             
-            # Get all results for the task
-            query = select(ParseResult).where(ParseResult.task_id == task_db_id).order_by(ParseResult.created_at.desc())
-            result = await db_session.execute(query)
-            results = result.scalars().all()
-            
-            if not results:
-                raise HTTPException(status_code=404, detail="No results found for this task")
-            
-            # Format results for export
-            formatted_results = []
-            for r in results:
-                formatted_results.append({
-                    "id": str(r.id),
-                    "task_id": str(r.task_id),
-                    "platform": r.platform.value if hasattr(r.platform, 'value') else str(r.platform),
-                    "platform_id": r.author_id or r.content_id,
-                    "username": r.author_username,
-                    "display_name": r.author_name or r.content_text[:50] if r.content_text else "Unknown",
-                    "author_phone": r.author_phone,
-                    "created_at": r.created_at.isoformat() if r.created_at else None,
-                    "platform_specific_data": r.platform_data or {}
-                })
+            from openpyxl import Workbook
+            from openpyxl.styles import Font, PatternFill
             
-            # Export in JSON
-            if format.lower() == "json":
-                json_content = json.dumps(formatted_results, ensure_ascii=False, indent=2)
-                return StreamingResponse(
-                    io.BytesIO(json_content.encode('utf-8')),
-                    media_type="application/json",
-                    headers={"Content-Disposition": f"attachment; filename=parsing_results_{task_id}.json"}
-                )
+            # Create workbook and worksheet
+            wb = Workbook()
+            ws = wb.active
+            ws.title = f"Parsing Results {task_id}"
             
-            # Export in CSV
-            elif format.lower() == "csv":
-                output = io.StringIO()
-                if formatted_results:
-                    # Flatten the data for CSV
-                    flattened_results = []
-                    for result in formatted_results:
-                        flat_result = {
-                            "id": result["id"],
-                            "task_id": result["task_id"],
-                            "platform": result["platform"],
-                            "platform_id": result["platform_id"],
-                            "username": result.get("username", ""),
-                            "display_name": result.get("display_name", ""),
-                            "author_phone": result.get("author_phone", ""),
-                            "created_at": result["created_at"],
-                        }
-                        
-                        # Add platform-specific data as separate columns
-                        if result.get("platform_specific_data"):
-                            for k, v in result["platform_specific_data"].items():
-                                flat_result[f"specific_{k}"] = str(v) if v is not None else ""
-                        
-                        flattened_results.append(flat_result)
+            if formatted_results:
+                # Flatten the data for Excel
+                flattened_results = []
+                for result in formatted_results:
+                    flat_result = {
+                        "ID": result["id"],
+                        "Task ID": result["task_id"],
+                        "Platform": result["platform"],
+                        "Platform ID": result["platform_id"],
+                        "Username": result.get("username", ""),
+                        "Display Name": result.get("display_name", ""),
+                        "Phone": result.get("author_phone", ""),
+                        "Created At": result["created_at"],
+                    }
                     
-                    if flattened_results:
-                        # Collect all unique field names from all records
-                        all_fieldnames = set()
-                        for result in flattened_results:
-                            all_fieldnames.update(result.keys())
-                        
-                        # Sort fieldnames for consistent output
-                        sorted_fieldnames = sorted(all_fieldnames)
-                        
-                        writer = csv.DictWriter(output, fieldnames=sorted_fieldnames)
-                        writer.writeheader()
-                        writer.writerows(flattened_results)
-                
-                csv_content = output.getvalue()
-                return StreamingResponse(
-                    io.BytesIO(csv_content.encode('utf-8')),
-                    media_type="text/csv",
-                    headers={"Content-Disposition": f"attachment; filename=parsing_results_{task_id}.csv"}
-                )
-            
-            # Export in Excel
-            elif format.lower() in ["excel", "xlsx"]:
-                from openpyxl import Workbook
-                from openpyxl.styles import Font, PatternFill
-                
-                # Create workbook and worksheet
-                wb = Workbook()
-                ws = wb.active
-                ws.title = f"Parsing Results {task_id}"
+                    # Add platform-specific data as separate columns
+                    if result.get("platform_specific_data"):
+                        for k, v in result["platform_specific_data"].items():
+                            flat_result[f"Extra {k}"] = str(v) if v is not None else ""
+                    
+                    flattened_results.append(flat_result)
                 
-                if formatted_results:
-                    # Flatten the data for Excel
-                    flattened_results = []
-                    for result in formatted_results:
-                        flat_result = {
-                            "ID": result["id"],
-                            "Task ID": result["task_id"],
-                            "Platform": result["platform"],
-                            "Platform ID": result["platform_id"],
-                            "Username": result.get("username", ""),
-                            "Display Name": result.get("display_name", ""),
-                            "Phone": result.get("author_phone", ""),
-                            "Created At": result["created_at"],
-                        }
-                        
-                        # Add platform-specific data as separate columns
-                        if result.get("platform_specific_data"):
-                            for k, v in result["platform_specific_data"].items():
-                                flat_result[f"Extra {k}"] = str(v) if v is not None else ""
-                        
-                        flattened_results.append(flat_result)
+                if flattened_results:
+                    # Get all unique field names
+                    all_fieldnames = set()
+                    for result in flattened_results:
+                        all_fieldnames.update(result.keys())
+                    
+                    # Sort fieldnames for consistent output
+                    sorted_fieldnames = sorted(all_fieldnames)
+                    
+                    # Write header row with styling
+                    header_font = Font(bold=True, color="FFFFFF")
+                    header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
                     
-                    if flattened_results:
-                        # Get all unique field names
-                        all_fieldnames = set()
-                        for result in flattened_results:
-                            all_fieldnames.update(result.keys())
-                        
-                        # Sort fieldnames for consistent output
-                        sorted_fieldnames = sorted(all_fieldnames)
-                        
-                        # Write header row with styling
-                        header_font = Font(bold=True, color="FFFFFF")
-                        header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
-                        
+                    for col_idx, fieldname in enumerate(sorted_fieldnames, 1):
+                        cell = ws.cell(row=1, column=col_idx, value=fieldname)
+                        cell.font = header_font
+                        cell.fill = header_fill
+                    
+                    # Write data rows
+                    for row_idx, result in enumerate(flattened_results, 2):
                         for col_idx, fieldname in enumerate(sorted_fieldnames, 1):
-                            cell = ws.cell(row=1, column=col_idx, value=fieldname)
-                            cell.font = header_font
-                            cell.fill = header_fill
-                        
-                        # Write data rows
-                        for row_idx, result in enumerate(flattened_results, 2):
-                            for col_idx, fieldname in enumerate(sorted_fieldnames, 1):
-                                ws.cell(row=row_idx, column=col_idx, value=result.get(fieldname, ""))
-                        
-                        # Auto-adjust column widths
-                        for column in ws.columns:
-                            max_length = 0
-                            column_letter = column[0].column_letter
-                            for cell in column:
-                                try:
-                                    if len(str(cell.value)) > max_length:
-                                        max_length = len(str(cell.value))
-                                except:
-                                    pass
-                            adjusted_width = min(max_length + 2, 50)  # Max width 50
-                            ws.column_dimensions[column_letter].width = adjusted_width
-                
-                # Save to BytesIO
-                excel_buffer = io.BytesIO()
-                wb.save(excel_buffer)
-                excel_buffer.seek(0)
-                
-                return StreamingResponse(
-                    excel_buffer,
-                    media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                    headers={"Content-Disposition": f"attachment; filename=parsing_results_{task_id}.xlsx"}
-                )
+                            ws.cell(row=row_idx, column=col_idx, value=result.get(fieldname, ""))
+                    
+                    # Auto-adjust column widths
+                    for column in ws.columns:
+                        max_length = 0
+                        column_letter = column[0].column_letter
+                        for cell in column:
+                            try:
+                                if len(str(cell.value)) > max_length:
+                                    max_length = len(str(cell.value))
+                            except:
+                                pass
+                        adjusted_width = min(max_length + 2, 50)  # Max width 50
+                        ws.column_dimensions[column_letter].width = adjusted_width
             
-            else:
-                raise HTTPException(status_code=400, detail="Unsupported format. Use 'json', 'csv', or 'excel'")
+            # Save to BytesIO
+            excel_buffer = io.BytesIO()
+            wb.save(excel_buffer)
+            excel_buffer.seek(0)
             
+            return StreamingResponse(
+                excel_buffer,
+                media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                headers={"Content-Disposition": f"attachment; filename=parsing_results_{task_id}.xlsx"}
+            )
+        
+        else:
+            raise HTTPException(status_code=400, detail="Unsupported format. Use 'json', 'ndjson', 'csv', 'excel', 'parquet' or 'arrow'")
+        
     except HTTPException:
         raise  # Re-raise HTTP exceptions as-is
     except Exception as e:
@@ -1469,7 +1391,13 @@ async def get_task_queue():
                 'running_tasks': len(running_tasks),
                 'busy_accounts': 0,  # Управляется централизованным Account Manager
                 'pending_task_ids': [task["id"] for task in pending_tasks],
-                'running_assignments': {},
+                'running_assignments': {
+                    task["id"]: task.get("assigned_account_id") for task in running_tasks
+                },
+                'scheduler': task_scheduler.stats(),
+                'phone_enrichment': phone_enrichment_worker.stats(),
+                'progress_writer': progress_writer.stats(),
+                'result_partitions': result_partition_maintainer.stats(),
                 'updated_at': datetime.utcnow().isoformat(),
                 'note': 'Account management delegated to Integration Service Account Manager'
             },
@@ -0,0 +1,40 @@
+"""Add unique dedupe index on parse_results (task_id, source_id, author_id)
+
+Revision ID: 004_add_parse_results_dedupe_index
+Revises: 003_add_account_states
+Create Date: 2026-10-16 10:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '004_add_parse_results_dedupe_index'
+down_revision = '003_add_account_states'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Remove duplicate users per task/source and add the unique index used by ON CONFLICT."""
+    # Keep the earliest row for every (task_id, source_id, author_id) triple
+    op.execute("""
+        DELETE FROM parse_results pr
+        USING parse_results dup
+        WHERE pr.task_id = dup.task_id
+          AND pr.source_id = dup.source_id
+          AND pr.author_id = dup.author_id
+          AND pr.id > dup.id
+    """)
+
+    op.create_index(
+        'uq_parse_results_task_source_author',
+        'parse_results',
+        ['task_id', 'source_id', 'author_id'],
+        unique=True
+    )
+
+
+def downgrade() -> None:
+    """Drop the dedupe index."""
+    op.drop_index('uq_parse_results_task_source_author', table_name='parse_results')
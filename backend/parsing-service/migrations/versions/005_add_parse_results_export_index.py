@@ -0,0 +1,29 @@
+"""Add (task_id, created_at, id) index on parse_results for keyset-paginated export
+
+Revision ID: 005_add_parse_results_export_index
+Revises: 004_add_parse_results_dedupe_index
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '005_add_parse_results_export_index'
+down_revision = '004_add_parse_results_dedupe_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Add the index used by streaming export pages."""
+    op.create_index(
+        'ix_parse_results_task_created_id',
+        'parse_results',
+        ['task_id', 'created_at', 'id']
+    )
+
+
+def downgrade() -> None:
+    """Drop the export index."""
+    op.drop_index('ix_parse_results_task_created_id', table_name='parse_results')
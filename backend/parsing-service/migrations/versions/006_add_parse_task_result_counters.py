@@ -0,0 +1,48 @@
+"""Add materialized result counters to parse_tasks
+
+Revision ID: 006_add_parse_task_result_counters
+Revises: 005_add_parse_results_export_index
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '006_add_parse_task_result_counters'
+down_revision = '005_add_parse_results_export_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Add counter columns and backfill them from existing parse_results."""
+    op.add_column('parse_tasks', sa.Column('results_with_username', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('parse_tasks', sa.Column('results_with_phone', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('parse_tasks', sa.Column('last_result_at', sa.DateTime(), nullable=True))
+
+    op.execute("""
+        UPDATE parse_tasks AS t
+        SET result_count = s.total,
+            results_with_username = s.with_username,
+            results_with_phone = s.with_phone,
+            last_result_at = s.last_result_at
+        FROM (
+            SELECT task_id,
+                   COUNT(*) AS total,
+                   COUNT(*) FILTER (WHERE author_id IS NOT NULL AND COALESCE(author_username, '') <> '') AS with_username,
+                   COUNT(*) FILTER (WHERE author_id IS NOT NULL AND COALESCE(author_phone, '') <> '') AS with_phone,
+                   MAX(created_at) AS last_result_at
+            FROM parse_results
+            GROUP BY task_id
+        ) AS s
+        WHERE t.id = s.task_id
+    """)
+
+
+def downgrade() -> None:
+    """Drop the counter columns (result_count predates this revision)."""
+    op.drop_column('parse_tasks', 'last_result_at')
+    op.drop_column('parse_tasks', 'results_with_phone')
+    op.drop_column('parse_tasks', 'results_with_username')
@@ -0,0 +1,37 @@
+"""Add phone_checked_at and the phone enrichment queue index to parse_results
+
+Revision ID: 007_add_parse_results_phone_checked
+Revises: 006_add_parse_task_result_counters
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '007_add_parse_results_phone_checked'
+down_revision = '006_add_parse_task_result_counters'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """
+    Add phone_checked_at. Every existing user row is marked as checked: before this
+    revision phones were resolved inline with GetFullUser, so a missing phone is hidden.
+    """
+    op.add_column('parse_results', sa.Column('phone_checked_at', sa.DateTime(), nullable=True))
+    op.execute("UPDATE parse_results SET phone_checked_at = created_at WHERE author_id IS NOT NULL")
+    op.create_index(
+        'ix_parse_results_phone_enrichment',
+        'parse_results',
+        ['id'],
+        postgresql_where=sa.text("author_id IS NOT NULL AND author_phone IS NULL AND phone_checked_at IS NULL")
+    )
+
+
+def downgrade() -> None:
+    """Drop the enrichment index and column."""
+    op.drop_index('ix_parse_results_phone_enrichment', table_name='parse_results')
+    op.drop_column('parse_results', 'phone_checked_at')
@@ -0,0 +1,47 @@
+"""Turn platform_chats into the community search index
+
+Revision ID: 008_add_community_index
+Revises: 007_add_parse_results_phone_checked
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '008_add_community_index'
+down_revision = '007_add_parse_results_phone_checked'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Add community flags and trigram indexes for local title/username search."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    op.add_column('platform_chats', sa.Column('is_broadcast', sa.Boolean(), nullable=False, server_default=sa.false()))
+    op.add_column('platform_chats', sa.Column('is_megagroup', sa.Boolean(), nullable=False, server_default=sa.false()))
+    op.add_column('platform_chats', sa.Column('has_comments', sa.Boolean(), nullable=True))
+    op.add_column('platform_chats', sa.Column('last_verified_at', sa.DateTime(), nullable=True))
+
+    op.create_index('ix_platform_chats_last_verified_at', 'platform_chats', ['last_verified_at'])
+    op.create_index(
+        'ix_platform_chats_title_trgm', 'platform_chats', ['title'],
+        postgresql_using='gin', postgresql_ops={'title': 'gin_trgm_ops'}
+    )
+    op.create_index(
+        'ix_platform_chats_username_trgm', 'platform_chats', ['username'],
+        postgresql_using='gin', postgresql_ops={'username': 'gin_trgm_ops'}
+    )
+
+
+def downgrade() -> None:
+    """Drop the community index columns and trigram indexes (pg_trgm is left installed)."""
+    op.drop_index('ix_platform_chats_username_trgm', table_name='platform_chats')
+    op.drop_index('ix_platform_chats_title_trgm', table_name='platform_chats')
+    op.drop_index('ix_platform_chats_last_verified_at', table_name='platform_chats')
+    op.drop_column('platform_chats', 'last_verified_at')
+    op.drop_column('platform_chats', 'has_comments')
+    op.drop_column('platform_chats', 'is_megagroup')
+    op.drop_column('platform_chats', 'is_broadcast')
@@ -0,0 +1,44 @@
+"""Full-text search vector and stored engagement total on parse_results
+
+Revision ID: 009_add_parse_results_search
+Revises: 008_add_community_index
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '009_add_parse_results_search'
+down_revision = '008_add_community_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Replace the unused text search_vector with generated tsvector/engagement columns and index them."""
+    # Never populated: the column was plain text without a trigger
+    op.drop_column('parse_results', 'search_vector')
+
+    op.add_column('parse_results', sa.Column(
+        'search_vector', postgresql.TSVECTOR(),
+        sa.Computed("to_tsvector('russian', coalesce(content_text, ''))", persisted=True)
+    ))
+    op.add_column('parse_results', sa.Column(
+        'engagement_total', sa.BigInteger(),
+        sa.Computed("likes_count + shares_count + comments_count + reactions_count", persisted=True)
+    ))
+
+    op.create_index('ix_parse_results_search_vector', 'parse_results', ['search_vector'], postgresql_using='gin')
+    op.create_index('ix_parse_results_engagement_total', 'parse_results', ['engagement_total'])
+
+
+def downgrade() -> None:
+    """Drop the search columns and restore the plain text search_vector."""
+    op.drop_index('ix_parse_results_engagement_total', table_name='parse_results')
+    op.drop_index('ix_parse_results_search_vector', table_name='parse_results')
+    op.drop_column('parse_results', 'engagement_total')
+    op.drop_column('parse_results', 'search_vector')
+    op.add_column('parse_results', sa.Column('search_vector', sa.Text(), nullable=True))
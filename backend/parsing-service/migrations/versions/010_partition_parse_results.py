@@ -0,0 +1,104 @@
+"""Partition parse_results by RANGE (task_id)
+
+Revision ID: 010_partition_parse_results
+Revises: 009_add_parse_results_search
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '010_partition_parse_results'
+down_revision = '009_add_parse_results_search'
+branch_labels = None
+depends_on = None
+
+# Task ids per partition created here (later ones follow PARSE_RESULTS_PARTITION_TASKS)
+PARTITION_SPAN = 1000
+
+# Partitions created beyond the newest task id
+PARTITIONS_AHEAD = 2
+
+
+def _copy_columns(bind, table: str) -> str:
+    """Comma-separated non-generated columns of a table (generated ones are recomputed on insert)."""
+    rows = bind.execute(sa.text(
+        "SELECT column_name FROM information_schema.columns "
+        "WHERE table_name = :table AND is_generated = 'NEVER' ORDER BY ordinal_position"
+    ), {"table": table}).all()
+    return ", ".join(row[0] for row in rows)
+
+
+def _index_definitions(bind, table: str):
+    """CREATE INDEX statements of a table's plain indexes (not backing constraints)."""
+    rows = bind.execute(sa.text(
+        "SELECT indexdef FROM pg_indexes WHERE tablename = :table "
+        "AND indexname NOT IN (SELECT conname FROM pg_constraint WHERE conrelid = CAST(:table AS regclass))"
+    ), {"table": table}).all()
+    return [row[0] for row in rows]
+
+
+def _rebuild(partitioned: bool) -> None:
+    """Recreate parse_results (partitioned or plain) and move every row into it."""
+    bind = op.get_bind()
+    old_table = 'parse_results_unpartitioned' if partitioned else 'parse_results_partitioned'
+
+    op.execute(f"ALTER TABLE parse_results RENAME TO {old_table}")
+    indexes = _index_definitions(bind, old_table)
+    columns = _copy_columns(bind, old_table)
+    sequence = bind.execute(sa.text("SELECT pg_get_serial_sequence(:table, 'id')"), {"table": old_table}).scalar()
+
+    op.execute(
+        f"CREATE TABLE parse_results (LIKE {old_table} INCLUDING DEFAULTS INCLUDING GENERATED)"
+        + (" PARTITION BY RANGE (task_id)" if partitioned else "")
+    )
+    if partitioned:
+        max_task_id = bind.execute(sa.text("SELECT coalesce(max(id), 0) FROM parse_tasks")).scalar()
+        for lower in range(0, max_task_id + PARTITIONS_AHEAD * PARTITION_SPAN + 1, PARTITION_SPAN):
+            op.execute(
+                f"CREATE TABLE parse_results_t{lower} PARTITION OF parse_results "
+                f"FOR VALUES FROM ({lower}) TO ({lower + PARTITION_SPAN})"
+            )
+        op.execute("CREATE TABLE parse_results_default PARTITION OF parse_results DEFAULT")
+
+    # Bulk copy before indexes are built
+    op.execute(f"INSERT INTO parse_results ({columns}) SELECT {columns} FROM {old_table}")
+    if sequence:
+        op.execute(f"ALTER SEQUENCE {sequence} OWNED BY parse_results.id")
+    op.execute(f"DROP TABLE {old_table}")
+
+    if partitioned:
+        op.execute("ALTER TABLE parse_results ADD CONSTRAINT parse_results_pkey PRIMARY KEY (id, task_id)")
+    else:
+        op.execute("ALTER TABLE parse_results ADD CONSTRAINT parse_results_pkey PRIMARY KEY (id)")
+    op.execute(
+        "ALTER TABLE parse_results ADD CONSTRAINT parse_results_task_id_fkey "
+        "FOREIGN KEY (task_id) REFERENCES parse_tasks (id)"
+    )
+    for definition in indexes:
+        # Indexes of a partitioned parent are reported as "ON ONLY <table>"
+        op.execute(re.sub(rf" ON (ONLY )?(public\.)?{old_table} ", " ON parse_results ", definition))
+
+
+def upgrade() -> None:
+    """
+    Move parse_results into a table partitioned by task_id ranges.
+
+    The dedupe key (task_id, source_id, author_id) has to contain the partition
+    key, so task ranges are used rather than created_at months. The foreign key
+    from parse_result_media (unused) is dropped: it cannot reference id alone.
+    """
+    op.execute("ALTER TABLE parse_result_media DROP CONSTRAINT IF EXISTS parse_result_media_result_id_fkey")
+    _rebuild(partitioned=True)
+
+
+def downgrade() -> None:
+    """Move the rows back into a plain table (detached archive partitions are left as they are)."""
+    _rebuild(partitioned=False)
+    op.create_foreign_key(
+        'parse_result_media_result_id_fkey', 'parse_result_media', 'parse_results', ['result_id'], ['id']
+    )
@@ -0,0 +1,30 @@
+"""Add scheduler lease columns to parse_tasks
+
+Revision ID: 011_add_parse_task_lease
+Revises: 010_partition_parse_results
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '011_add_parse_task_lease'
+down_revision = '010_partition_parse_results'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Add lease_owner/lease_expires_at; RUNNING rows without a lease count as expired."""
+    op.add_column('parse_tasks', sa.Column('lease_owner', sa.String(length=100), nullable=True))
+    op.add_column('parse_tasks', sa.Column('lease_expires_at', sa.DateTime(), nullable=True))
+    op.create_index('ix_parse_tasks_lease_expires_at', 'parse_tasks', ['lease_expires_at'])
+
+
+def downgrade() -> None:
+    """Drop the lease columns."""
+    op.drop_index('ix_parse_tasks_lease_expires_at', table_name='parse_tasks')
+    op.drop_column('parse_tasks', 'lease_expires_at')
+    op.drop_column('parse_tasks', 'lease_owner')
@@ -0,0 +1,103 @@
+"""Tests for deferred phone enrichment lookups."""
+
+import asyncio
+from types import SimpleNamespace
+
+from telethon.errors import FloodWaitError
+from telethon.tl.types import InputUser
+
+from app.adapters.telegram import ACCESS_HASH_ACCOUNT_KEY
+from app.services.phone_enrichment import PhoneEnrichmentWorker, hash_account_of
+
+
+def _row(row_id, author_id, username=None, account_id=None):
+    raw_data = {'access_hash': 777}
+    if account_id:
+        raw_data[ACCESS_HASH_ACCOUNT_KEY] = account_id
+    return SimpleNamespace(id=row_id, task_id=1, author_id=str(author_id), author_username=username, raw_data=raw_data)
+
+
+class _FakeCache:
+    async def get_many(self, user_ids):
+        return {}
+
+
+class _FakeAdapter:
+    def __init__(self, phones, flood_after=None):
+        self.phones = phones
+        self.flood_after = flood_after
+        self.peers = []
+        self.user_profile_cache = _FakeCache()
+
+    async def fetch_user_phone(self, peer):
+        if self.flood_after is not None and len(self.peers) >= self.flood_after:
+            raise FloodWaitError(request=None, capture=30)
+        self.peers.append(peer)
+        key = peer.user_id if isinstance(peer, InputUser) else peer
+        return self.phones.get(key)
+
+
+def test_hash_account_of():
+    assert hash_account_of(_row(1, 10, account_id='acc-1')) == 'acc-1'
+    assert hash_account_of(_row(1, 10)) is None
+
+
+def test_foreign_access_hash_is_not_used_and_row_stays_queued():
+    worker = PhoneEnrichmentWorker()
+    adapter = _FakeAdapter({10: '+100'})
+
+    checked, phone = asyncio.run(worker._lookup_one(adapter, _row(1, 10, account_id='acc-1'), 'acc-2'))
+
+    assert (checked, phone) == (False, None)
+    assert adapter.peers == []
+
+
+def test_own_access_hash_and_username_lookups():
+    worker = PhoneEnrichmentWorker()
+    adapter = _FakeAdapter({10: '+100', 'bob': '+200'})
+
+    assert asyncio.run(worker._lookup_one(adapter, _row(1, 10, account_id='acc-1'), 'acc-1')) == (True, '+100')
+    # Hashed by another account, but reachable by username
+    assert asyncio.run(worker._lookup_one(adapter, _row(2, 20, 'bob', 'acc-1'), 'acc-2')) == (True, '+200')
+    assert isinstance(adapter.peers[0], InputUser)
+    assert adapter.peers[1] == 'bob'
+
+
+def test_flood_wait_keeps_phones_fetched_before_it():
+    worker = PhoneEnrichmentWorker()
+    adapter = _FakeAdapter({10: '+100', 20: '+200', 30: '+300'}, flood_after=2)
+    batch = [_row(i, author_id, account_id='acc-1') for i, author_id in enumerate((10, 20, 30), start=1)]
+
+    phones, used, flood_wait = asyncio.run(worker._lookup_batch(adapter, batch, budget=10, account_id='acc-1'))
+
+    assert phones == {'10': '+100', '20': '+200'}
+    assert used == 3
+    assert isinstance(flood_wait, FloodWaitError)
+
+
+def test_unreachable_rows_are_left_out_of_checked_phones():
+    worker = PhoneEnrichmentWorker()
+    adapter = _FakeAdapter({10: None})
+    batch = [_row(1, 10, account_id='acc-1'), _row(2, 20, account_id='acc-9')]
+
+    phones, used, flood_wait = asyncio.run(worker._lookup_batch(adapter, batch, budget=10, account_id='acc-1'))
+
+    # 10 was answered (phone hidden) and is marked checked; 20 could not be reached
+    assert phones == {'10': None}
+    assert flood_wait is None
+
+
+def test_drain_runs_passes_until_one_leaves_budget_unused():
+    worker = PhoneEnrichmentWorker(budget=10)
+    passes = []
+
+    async def run_once():
+        passes.append(len(passes))
+        # Two full passes, then the queue runs dry
+        worker._budget_used_up = len(passes) < 3
+        return 0
+
+    worker.run_once = run_once
+    asyncio.run(worker._drain())
+
+    assert len(passes) == 3
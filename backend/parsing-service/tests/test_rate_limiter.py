@@ -0,0 +1,45 @@
+"""Tests for the per-account token bucket."""
+
+import asyncio
+import time
+
+from app.core.rate_limiter import TokenBucket
+
+
+def test_burst_up_to_capacity_is_immediate():
+    bucket = TokenBucket(rate_per_minute=60, capacity=3)
+
+    async def take_three():
+        return [await bucket.acquire() for _ in range(3)]
+
+    assert asyncio.run(take_three()) == [0.0, 0.0, 0.0]
+
+
+def test_acquire_waits_for_refill_when_empty():
+    bucket = TokenBucket(rate_per_minute=600, capacity=1)  # one token per 0.1 s
+
+    async def take_two():
+        await bucket.acquire()
+        return await bucket.acquire()
+
+    waited = asyncio.run(take_two())
+    assert 0.05 <= waited <= 0.5
+
+
+def test_penalize_blocks_until_pause_ends():
+    bucket = TokenBucket(rate_per_minute=6000, capacity=5)
+
+    async def take_after_penalty():
+        bucket.penalize(0.2)
+        started = time.monotonic()
+        await bucket.acquire()
+        return time.monotonic() - started
+
+    assert asyncio.run(take_after_penalty()) >= 0.15
+
+
+def test_rate_and_capacity_have_lower_bounds():
+    bucket = TokenBucket(rate_per_minute=0, capacity=0)
+
+    assert bucket.rate == 1.0 / 60.0
+    assert bucket.capacity == 1
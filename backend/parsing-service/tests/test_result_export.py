@@ -0,0 +1,150 @@
+"""Tests for the streaming and columnar results export."""
+
+import asyncio
+import csv
+import gzip
+import io
+import json
+from datetime import datetime
+from types import SimpleNamespace
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from app.services import result_export
+
+
+async def _aiter(items):
+    for item in items:
+        yield item
+
+
+async def _collect(chunks):
+    return [chunk async for chunk in chunks]
+
+
+def _export_row(row_id, **platform_data):
+    return {
+        "id": str(row_id), "task_id": "1", "platform": "telegram", "platform_id": str(1000 + row_id),
+        "username": f"user{row_id}", "display_name": f"User {row_id}", "author_phone": None,
+        "created_at": "2026-01-01T00:00:00", "platform_specific_data": platform_data,
+    }
+
+
+def test_json_array_chunks_form_valid_json():
+    rows = [_export_row(1), _export_row(2)]
+
+    text = ''.join(asyncio.run(_collect(result_export._json_array_chunks(_aiter(rows)))))
+
+    assert json.loads(text) == rows
+    assert json.loads(''.join(asyncio.run(_collect(result_export._json_array_chunks(_aiter([])))))) == []
+
+
+def test_ndjson_chunks_one_row_per_line():
+    rows = [_export_row(1), _export_row(2, language_code='ru')]
+
+    text = ''.join(asyncio.run(_collect(result_export._ndjson_chunks(_aiter(rows)))))
+
+    assert [json.loads(line) for line in text.splitlines()] == rows
+
+
+def test_csv_chunks_flatten_platform_data(monkeypatch):
+    monkeypatch.setattr(result_export, 'EXPORT_CHUNK_BYTES', 64)
+    rows = [_export_row(i, is_bot=False, language_code=None) for i in range(20)]
+
+    chunks = asyncio.run(_collect(result_export._csv_chunks(_aiter(rows), ['is_bot', 'language_code'])))
+
+    assert len(chunks) > 1
+    parsed = list(csv.DictReader(io.StringIO(''.join(chunks))))
+    assert len(parsed) == 20
+    assert parsed[0]['specific_is_bot'] == 'False'
+    assert parsed[0]['specific_language_code'] == ''
+    assert parsed[3]['username'] == 'user3'
+
+
+def test_encode_coalesces_into_chunk_sized_pieces(monkeypatch):
+    monkeypatch.setattr(result_export, 'EXPORT_CHUNK_BYTES', 10)
+
+    chunks = asyncio.run(_collect(result_export._encode(_aiter(['абв', 'defgh', 'ijklmnop', 'q']))))
+
+    assert b''.join(chunks).decode('utf-8') == 'абвdefghijklmnopq'
+    assert all(len(chunk) >= 10 for chunk in chunks[:-1])
+
+
+def test_gzip_stream_round_trip():
+    payload = [b'{"id": 1}\n' * 1000, b'{"id": 2}\n']
+
+    compressed = b''.join(asyncio.run(_collect(result_export.gzip_stream(_aiter(payload)))))
+
+    assert gzip.decompress(compressed) == b''.join(payload)
+
+
+def test_export_headers():
+    assert result_export.export_headers('abc', 'csv') == (
+        'text/csv', {'Content-Disposition': 'attachment; filename=parsing_results_abc.csv'}
+    )
+    media_type, headers = result_export.export_headers('abc', 'ndjson', gzip=True)
+    assert media_type == 'application/gzip'
+    assert headers['Content-Disposition'].endswith('parsing_results_abc.ndjson.gz')
+
+
+def _columnar_row(row_id, language_code, user_type):
+    return SimpleNamespace(
+        id=row_id, task_id=1, platform='telegram', source_id='@chan', source_name='Chan',
+        source_type='channel', content_id=str(row_id), content_type='user', author_id=str(1000 + row_id),
+        author_username=f'user{row_id}', author_name=f'User {row_id}', author_phone=None,
+        views_count=0, reactions_count=0, comments_count=0,
+        content_created_at=datetime(2026, 1, 1), created_at=datetime(2026, 1, 1),
+        platform_data={'language_code': language_code, 'user_type': user_type, 'is_bot': False},
+    )
+
+
+def _export_columnar(monkeypatch, rows, format):
+    async def fake_rows(task_db_id, columns=None):
+        for row in rows:
+            yield row
+
+    async def collect():
+        return b''.join([chunk async for chunk in result_export.stream_columnar_export(1, format)])
+
+    monkeypatch.setattr(result_export, 'iter_result_rows', fake_rows)
+    monkeypatch.setattr(result_export, 'COLUMNAR_BATCH_ROWS', 2)
+    return asyncio.run(collect())
+
+
+# Each batch of two rows brings dictionary values the previous batch did not have
+MULTI_BATCH_ROWS = [
+    _columnar_row(1, 'en', 'user'),
+    _columnar_row(2, 'en', 'user'),
+    _columnar_row(3, 'ru', 'bot'),
+    _columnar_row(4, None, 'premium'),
+    _columnar_row(5, 'de', 'user'),
+]
+
+
+def test_arrow_export_with_changing_values_across_batches(monkeypatch):
+    data = _export_columnar(monkeypatch, MULTI_BATCH_ROWS, 'arrow')
+
+    table = pa.ipc.open_file(pa.BufferReader(data)).read_all()
+    assert table.num_rows == 5
+    assert table.column('pd_language_code').to_pylist() == ['en', 'en', 'ru', None, 'de']
+    assert table.column('pd_user_type').to_pylist() == ['user', 'user', 'bot', 'premium', 'user']
+    assert table.column('author_id').to_pylist() == [1001, 1002, 1003, 1004, 1005]
+
+
+def test_parquet_export_keeps_dictionary_columns(monkeypatch):
+    data = _export_columnar(monkeypatch, MULTI_BATCH_ROWS, 'parquet')
+
+    table = pq.read_table(io.BytesIO(data))
+    assert table.num_rows == 5
+    assert pa.types.is_dictionary(table.schema.field('pd_language_code').type)
+    assert table.column('pd_language_code').to_pylist() == ['en', 'en', 'ru', None, 'de']
+
+
+def test_columnar_schema_dictionary_encoding_is_optional():
+    encoded = result_export._columnar_schema()
+    plain = result_export._columnar_schema(dictionary_encode=False)
+
+    assert pa.types.is_dictionary(encoded.field('source_id').type)
+    assert plain.field('source_id').type == pa.string()
+    assert encoded.names == plain.names
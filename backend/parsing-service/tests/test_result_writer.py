@@ -0,0 +1,34 @@
+"""Tests for the chunked parse_results writer."""
+
+import importlib
+
+from app.core.config import Platform
+from app.services.result_writer import build_result_row
+
+
+def test_parser_modules_import():
+    # Both parse entry points import the writer (and with it app.core.metrics);
+    # a metrics registry clash here used to fail every parse task at startup.
+    for module in ('app.services.result_writer', 'app.services.real_parser', 'app.services.sharded_parser'):
+        importlib.import_module(module)
+
+
+def test_build_result_row_defaults():
+    row = build_result_row(7, {'source_id': '@chan', 'author_id': '42'})
+
+    assert row['task_id'] == 7
+    assert row['platform'] == Platform.TELEGRAM
+    assert row['source_id'] == '@chan'
+    assert row['author_id'] == '42'
+    assert row['views_count'] == 0
+    assert row['has_media'] is False
+    assert row['media_types'] == []
+    assert row['content_created_at'] == row['created_at']
+
+
+def test_build_result_row_coerces_none_counters():
+    row = build_result_row(1, {'views_count': None, 'media_count': None, 'is_reply': None})
+
+    assert row['views_count'] == 0
+    assert row['media_count'] == 0
+    assert row['is_reply'] is False
@@ -0,0 +1,54 @@
+"""Tests for the shared community search cache."""
+
+import asyncio
+
+from app.api.v1.endpoints import search
+from app.core.search_cache import search_cache_key
+
+
+def test_search_cache_key_normalizes_query():
+    assert search_cache_key('telegram', ' Футбол ') == search_cache_key('telegram', 'futbol')
+    assert search_cache_key('telegram', '@Futbol') == search_cache_key('telegram', 'futbol')
+
+
+class _FakeAdapter:
+    def __init__(self, results):
+        self.results = results
+        self.discovered_communities = {}
+
+    async def collect_communities(self, query, progress_callback=None, speed_config=None):
+        return self.results
+
+    async def cleanup(self):
+        pass
+
+
+class _FakeCache:
+    def __init__(self):
+        self.stored = None
+
+    async def put(self, platform, query, results):
+        self.stored = results
+        return {'query': query, 'results': results, 'cached_at': 0}
+
+
+def test_private_dialog_matches_are_not_cached(monkeypatch):
+    public = {'platform_id': '1', 'username': 'football', 'members_count': 10}
+    private = {'platform_id': '2', 'username': None, 'link': 't.me/c/2', 'members_count': 50}
+    cache = _FakeCache()
+
+    async def open_adapter(user_id):
+        return _FakeAdapter([private, public])
+
+    async def no_index(communities):
+        return 0
+
+    monkeypatch.setattr(search, '_open_search_adapter', open_adapter)
+    monkeypatch.setattr(search, 'index_communities', no_index)
+    monkeypatch.setattr(search, 'get_search_cache', lambda: cache)
+
+    entry = asyncio.run(search._collect_and_cache(1, 'telegram', 'football', 'medium'))
+
+    assert cache.stored == [public]
+    # The searching user still sees their own private match
+    assert entry['results'] == [private, public]
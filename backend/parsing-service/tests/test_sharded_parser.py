@@ -0,0 +1,175 @@
+"""Tests for sharded multi-account channel parsing."""
+
+import asyncio
+from types import SimpleNamespace
+
+from app.adapters.telegram import ParseCheckpoint
+from app.services import real_parser, sharded_parser
+from app.services.sharded_parser import SHARD_MIN_MESSAGES, plan_message_shards
+
+
+def test_plan_message_shards_covers_range_without_overlap():
+    shards = plan_message_shards(top_message_id=10000, search_depth=4000, shard_count=4)
+
+    assert [s['index'] for s in shards] == [0, 1, 2, 3]
+    # Exclusive bounds: shard i covers (min_id, max_id)
+    assert shards[0]['max_id'] == 10001
+    assert shards[-1]['min_id'] == 6000
+    for upper, lower in zip(shards, shards[1:]):
+        assert upper['min_id'] == lower['max_id'] - 1
+    covered = sum(s['max_id'] - s['min_id'] - 1 for s in shards)
+    assert covered == 4000
+
+
+def test_plan_message_shards_caps_count_by_minimum_shard_size():
+    shards = plan_message_shards(top_message_id=1200, search_depth=5000, shard_count=8)
+
+    # Only 1200 messages exist: two shards of at least SHARD_MIN_MESSAGES each
+    assert len(shards) == 1200 // SHARD_MIN_MESSAGES
+    assert shards[-1]['min_id'] == 0
+
+
+def test_plan_message_shards_short_history_is_one_shard():
+    assert len(plan_message_shards(top_message_id=100, search_depth=1000, shard_count=4)) == 1
+
+
+def test_restore_shard_state_reuses_saved_plan():
+    saved = [
+        {'index': 0, 'max_id': 5001, 'min_id': 2500, 'last_message_id': 4000},
+        {'index': 1, 'max_id': 2501, 'min_id': 0, 'last_message_id': None},
+    ]
+    top, shards, states = sharded_parser._restore_shard_state(
+        {'top_message_id': 5000, 'shards': saved}, top_message_id=9000, shard_count=2, search_depth=5000
+    )
+
+    assert top == 5000
+    assert shards == [{'index': 0, 'max_id': 5001, 'min_id': 2500}, {'index': 1, 'max_id': 2501, 'min_id': 0}]
+    assert states == saved
+
+
+class _FakeChannel:
+    pass
+
+
+class _FakeShardAdapter:
+    """Emits one batch per message, advancing the checkpoint before each yield like TelegramAdapter."""
+
+    def __init__(self, message_ids):
+        self.message_ids = message_ids
+        self.current_account_id = 'fake'
+        self.client = SimpleNamespace(
+            get_entity=self._get_entity,
+            get_messages=self._get_messages,
+        )
+
+    async def _get_entity(self, target):
+        return _FakeChannel()
+
+    async def _get_messages(self, entity, limit=1):
+        return [SimpleNamespace(id=10000)]
+
+    def normalize_target(self, link):
+        return link
+
+    async def iter_target_batches(self, task, link, config):
+        checkpoint = config['checkpoint']
+        for message_id in self.message_ids:
+            checkpoint.last_message_id = message_id
+            yield [{'author_id': message_id, 'message_id': message_id}]
+
+    async def cleanup(self):
+        pass
+
+
+class _FakeWriter:
+    def __init__(self, task_id):
+        self.written = []
+        self.rows_written = 0
+        _FakeWriter.instance = self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def write(self, rows):
+        self.written.extend(rows)
+
+    async def flush(self):
+        await asyncio.sleep(0)  # let the producers run ahead of the consumer
+        self.rows_written = len(self.written)
+        return self.rows_written
+
+
+def test_sharded_checkpoints_only_cover_flushed_batches(monkeypatch):
+    primary = _FakeShardAdapter([9000, 8000, 7000, 6000])
+    extra = _FakeShardAdapter([4000, 3000, 2000, 1000])
+    saved = []
+
+    async def fake_allocate(user_id, extra_accounts, account_manager):
+        return [({'account_id': 'extra'}, extra)]
+
+    async def fake_release(self, account_id, usage_stats=None):
+        return True
+
+    async def fake_save(task_db_id, resume_data):
+        flushed = {row['message_id'] for row in _FakeWriter.instance.written}
+        saved.append((resume_data, flushed))
+
+    monkeypatch.setattr(sharded_parser, 'Channel', _FakeChannel)
+    monkeypatch.setattr(sharded_parser, 'ParseResultWriter', _FakeWriter)
+    monkeypatch.setattr(sharded_parser, '_allocate_extra_adapters', fake_allocate)
+    monkeypatch.setattr(sharded_parser.AccountManagerClient, 'release_account', fake_release)
+    monkeypatch.setattr(real_parser, 'save_parse_checkpoint', fake_save)
+
+    result_count = asyncio.run(sharded_parser.perform_sharded_parsing(
+        task_id='t', task=SimpleNamespace(resume_data=None), task_db_id=1, link='@chan',
+        primary_adapter=primary, user_id=1, extra_accounts=1, checkpoint=ParseCheckpoint(),
+        message_limit=1000
+    ))
+
+    progress_saves = [(data, flushed) for data, flushed in saved if data]
+    assert progress_saves
+    for resume_data, flushed in progress_saves:
+        for shard in resume_data['shards']:
+            if shard.get('last_message_id') is not None:
+                assert shard['last_message_id'] in flushed
+    assert saved[-1][0] is None
+    assert result_count == _FakeWriter.instance.rows_written == 8
+
+
+def test_sharded_parse_reports_inserted_rows(monkeypatch):
+    # The same user in both shards is inserted once; the result count must match parse_results
+    primary = _FakeShardAdapter([9000, 8000])
+    extra = _FakeShardAdapter([4000, 9000])
+
+    async def fake_allocate(user_id, extra_accounts, account_manager):
+        return [({'account_id': 'extra'}, extra)]
+
+    async def fake_release(self, account_id, usage_stats=None):
+        return True
+
+    async def fake_save(task_db_id, resume_data):
+        pass
+
+    async def dedupe_flush(self):
+        unique = {row['author_id'] for row in self.written}
+        self.rows_written = len(unique)
+        return self.rows_written
+
+    monkeypatch.setattr(sharded_parser, 'Channel', _FakeChannel)
+    monkeypatch.setattr(sharded_parser, 'ParseResultWriter', _FakeWriter)
+    monkeypatch.setattr(_FakeWriter, 'flush', dedupe_flush)
+    monkeypatch.setattr(sharded_parser, '_allocate_extra_adapters', fake_allocate)
+    monkeypatch.setattr(sharded_parser.AccountManagerClient, 'release_account', fake_release)
+    monkeypatch.setattr(real_parser, 'save_parse_checkpoint', fake_save)
+
+    result_count = asyncio.run(sharded_parser.perform_sharded_parsing(
+        task_id='t', task=SimpleNamespace(resume_data=None), task_db_id=1, link='@chan',
+        primary_adapter=primary, user_id=1, extra_accounts=1, checkpoint=ParseCheckpoint(),
+        message_limit=1000
+    ))
+
+    assert len(_FakeWriter.instance.written) == 4
+    assert result_count == 3
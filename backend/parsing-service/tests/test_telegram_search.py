@@ -0,0 +1,105 @@
+"""Tests for pacing of search and comment thread requests."""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from telethon.errors import FloodWaitError
+from telethon.tl.types import PeerUser
+
+from app.adapters.telegram import REPLY_THREAD_FLOOD_RETRIES, TelegramAdapter
+
+
+class _CountingBucket:
+    def __init__(self):
+        self.acquired = 0
+        self.penalties = []
+
+    async def acquire(self, tokens: float = 1.0) -> float:
+        self.acquired += 1
+        return 0.0
+
+    def penalize(self, seconds: float):
+        self.penalties.append(seconds)
+
+
+class _FloodOnceClient:
+    """Raises FloodWait on the first request, then answers with no chats."""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def __call__(self, request):
+        self.calls += 1
+        if self.calls == 1:
+            raise FloodWaitError(request=None, capture=5)
+        return SimpleNamespace(chats=[])
+
+
+def _adapter():
+    adapter = TelegramAdapter()
+    adapter.client = _FloodOnceClient()
+    adapter.api_rate_limiter = _CountingBucket()
+    return adapter
+
+
+def test_contacts_search_retry_after_flood_wait_takes_a_bucket_token():
+    adapter = _adapter()
+
+    assert asyncio.run(adapter._search_global_channels_with_progress('crypto')) == []
+    assert adapter.client.calls == 2
+    assert adapter.api_rate_limiter.acquired == 2
+    assert adapter.api_rate_limiter.penalties == [6]
+
+
+def test_global_search_retry_after_flood_wait_takes_a_bucket_token():
+    adapter = _adapter()
+
+    assert asyncio.run(adapter._search_global_new_with_progress('crypto')) == []
+    assert adapter.client.calls == 2
+    assert adapter.api_rate_limiter.acquired == 2
+
+
+class _FloodingThreadClient:
+    """Iterates a comment thread, raising FloodWait mid-thread on the first `floods` attempts."""
+
+    def __init__(self, floods: int):
+        self.floods = floods
+        self.attempts = 0
+
+    async def iter_messages(self, channel, reply_to=None, limit=None):
+        self.attempts += 1
+        yield SimpleNamespace(from_id=PeerUser(user_id=1))
+        if self.attempts <= self.floods:
+            raise FloodWaitError(request=None, capture=5)
+        yield SimpleNamespace(from_id=PeerUser(user_id=2))
+
+
+def _thread_adapter(floods: int):
+    adapter = TelegramAdapter()
+    adapter.client = _FloodingThreadClient(floods)
+    adapter.api_rate_limiter = _CountingBucket()
+    return adapter
+
+
+def _post():
+    return SimpleNamespace(id=10, replies=SimpleNamespace(replies=2))
+
+
+def test_reply_thread_is_refetched_through_the_bucket_after_flood_wait():
+    adapter = _thread_adapter(floods=1)
+
+    senders = asyncio.run(adapter._fetch_reply_senders(channel=None, message=_post()))
+
+    assert list(senders) == [1, 2]
+    assert adapter.client.attempts == 2
+    assert adapter.api_rate_limiter.acquired == 2
+    assert adapter.api_rate_limiter.penalties == [6]
+
+
+def test_reply_thread_flood_wait_is_raised_once_retries_are_exhausted():
+    adapter = _thread_adapter(floods=REPLY_THREAD_FLOOD_RETRIES)
+
+    with pytest.raises(FloodWaitError):
+        asyncio.run(adapter._fetch_reply_senders(channel=None, message=_post()))
+    assert adapter.client.attempts == REPLY_THREAD_FLOOD_RETRIES